@@ -1,11 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
-from groq import Groq
-from langchain_groq import ChatGroq
-import os
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Type, TypeVar
 from dotenv import load_dotenv
+from pydantic import BaseModel, ValidationError
+import os
 import logging
 from datetime import datetime
+from .llm_client import LLMClient, get_llm_client
+from .concurrency import bounded_map
+from .document import DocumentChunk, LegalDocument
+from .structured_output import (
+    StructuredOutputError,
+    answer_shape,
+    extract_json,
+    format_instructions,
+    parse_stats,
+    parse_structured,
+    repair_prompt
+)
 
 load_dotenv()
 
@@ -16,17 +27,27 @@ logging.basicConfig(
     datefmt='%H:%M:%S'
 )
 
+T = TypeVar('T', bound=BaseModel)
+
 class BaseAgent(ABC):
     def __init__(self):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-        self.llm = ChatGroq(
-            groq_api_key=os.getenv("GROQ_API_KEY"),
-            model_name="llama-3-8b-8192"
-        )
         self.memory: Dict[str, Any] = {}
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "5"))
+        self.batch_size = int(os.getenv("LLM_BATCH_SIZE", "8"))
+        self.chunk_tokens = int(os.getenv("LLM_CHUNK_TOKENS", "3000"))
+        self.retrieval_tokens = int(os.getenv("LLM_RETRIEVAL_TOKENS", "1500"))
+        self.retrieval_chunk_tokens = int(os.getenv("LLM_RETRIEVAL_CHUNK_TOKENS", "400"))
+        self.structured_retries = int(os.getenv("LLM_STRUCTURED_RETRIES", "1"))
         self.agent_name = self.__class__.__name__
         self.logger = logging.getLogger(self.agent_name)
 
+    @property
+    def llm_client(self) -> LLMClient:
+        """
+        The shared LLM client, resolved lazily on first use.
+        """
+        return get_llm_client()
+
     def log_activity(self, message: str, status: str = "INFO") -> None:
         """Log agent activity with timestamp and formatting."""
         timestamp = datetime.now().strftime("%H:%M:%S")
@@ -50,19 +71,201 @@ class BaseAgent(ABC):
         """
         pass
 
-    async def _call_llm(self, prompt: str, temperature: float = 0.7) -> str:
+    def digest(self, results: Dict[str, Any]) -> List[str]:
+        """
+        Short lines summarising this agent's `results` for the prompts of
+        later stages. Agents whose results nothing reads return none.
+        """
+        return []
+
+    def _analysis_digest(self, context: Optional[Dict[str, Any]] = None) -> str:
+        """
+        The digest of earlier stages' findings, rendered for a prompt.
+        """
+        digest = (context or {}).get('analysis_digest')
+        return digest.render() if digest else 'No additional context provided'
+
+    def _get_document(self, document_text: str, context: Optional[Dict[str, Any]] = None) -> LegalDocument:
+        """
+        Return the shared LegalDocument from the context, or build one when
+        the agent is run on its own.
+        """
+        document = (context or {}).get('document')
+        if isinstance(document, LegalDocument) and document.text == document_text:
+            return document
+        return LegalDocument(document_text)
+
+    def _relevant_text(self, document: LegalDocument, query: str) -> str:
+        """
+        The parts of the document most relevant to `query`, within the
+        retrieval budget. Short documents are returned whole.
+        """
+        if document.fits(self.retrieval_tokens):
+            return document.text
+        return document.index(self.retrieval_chunk_tokens).relevant_text(query, self.retrieval_tokens)
+
+    async def _call_llm(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        timeout: Optional[float] = None,
+        json_mode: bool = False
+    ) -> str:
         """
-        Make a call to the Groq LLM with the given prompt.
+        Make a non-blocking call to the Groq LLM with the given prompt.
         """
         try:
             self.log_activity(f"Calling LLM with prompt: {prompt[:100]}...")
-            response = self.llm.invoke(prompt)
+            response = await self.llm_client.call_llm(prompt, temperature=temperature, timeout=timeout, json_mode=json_mode)
             self.log_activity("LLM call completed successfully", "SUCCESS")
-            return response.content
+            return response
         except Exception as e:
             self.log_activity(f"Error calling LLM: {str(e)}", "ERROR")
             raise Exception(f"Error calling LLM: {str(e)}")
 
+    async def _map_concurrent(self, func: Callable[[Any], Awaitable[Any]], items: Iterable[Any]) -> List[Any]:
+        """
+        Run `func` over `items` with at most `max_concurrency` calls in flight,
+        returning the results in input order.
+        """
+        return await bounded_map(func, items, self.max_concurrency)
+
+    async def _call_llm_structured(self, prompt: str, schema: Type[T], temperature: float = 0.0) -> T:
+        """
+        Ask for a JSON answer shaped like `schema` and return it validated.
+        An invalid answer is sent back for repair up to `structured_retries`
+        times before StructuredOutputError is raised.
+        """
+        prompt = f"{prompt.rstrip()}\n\n{format_instructions(schema)}"
+        request = prompt
+        for attempt in range(self.structured_retries + 1):
+            response = await self._call_llm(request, temperature=temperature, json_mode=True)
+            try:
+                return parse_structured(response, schema)
+            except (ValueError, ValidationError) as e:
+                error = e
+            if attempt < self.structured_retries:
+                parse_stats.record(schema, 'retried')
+                request = repair_prompt(prompt, response, error)
+        parse_stats.record(schema, 'failed')
+        raise StructuredOutputError(f"{schema.__name__} response did not validate: {error}")
+
+    async def _call_llm_structured_or_none(self, prompt: str, schema: Type[T]) -> Optional[T]:
+        try:
+            return await self._call_llm_structured(prompt, schema)
+        except StructuredOutputError as e:
+            self.log_activity(str(e), "WARNING")
+            return None
+
+    async def _call_llm_structured_batched(self, prompts: List[str], schema: Type[T]) -> List[Optional[T]]:
+        """
+        Answer independent prompts using one LLM call per `batch_size` prompts.
+        Returns one validated answer per prompt, in order. Answers missing from
+        or invalid in a batched response are fetched with a call of their own;
+        None marks one that still failed.
+        """
+        if self.batch_size <= 1:
+            return await self._map_concurrent(lambda prompt: self._call_llm_structured_or_none(prompt, schema), prompts)
+
+        batches = [prompts[i:i + self.batch_size] for i in range(0, len(prompts), self.batch_size)]
+
+        async def run_batch(batch: List[str]) -> List[Optional[T]]:
+            if len(batch) == 1:
+                return [await self._call_llm_structured_or_none(batch[0], schema)]
+
+            response = await self._call_llm(self._pack_prompts(batch, schema), temperature=0.0, json_mode=True)
+            answers = self._split_batched_response(response, batch, schema)
+            missing = [index for index, answer in enumerate(answers) if answer is None]
+            if missing:
+                self.log_activity(f"Batched response missed {len(missing)} of {len(batch)} answers, retrying them individually", "WARNING")
+                parse_stats.record(schema, 'retried', len(missing))
+                retried = await self._map_concurrent(
+                    lambda prompt: self._call_llm_structured_or_none(prompt, schema),
+                    [batch[index] for index in missing]
+                )
+                for index, answer in zip(missing, retried):
+                    answers[index] = answer
+            return answers
+
+        results = await self._map_concurrent(run_batch, batches)
+        return [answer for batch in results for answer in batch]
+
+    @staticmethod
+    def _pack_prompts(prompts: List[str], schema: Type[BaseModel]) -> str:
+        """
+        Combine several independent prompts into a single numbered request.
+        """
+        sections = [f"### REQUEST {number}\n{prompt.strip()}" for number, prompt in enumerate(prompts, 1)]
+        return (
+            f"You will receive {len(prompts)} independent requests, each starting with a line "
+            f"\"### REQUEST <number>\".\n"
+            "Answer every request exactly as if it had been sent on its own.\n\n"
+            + "\n\n".join(sections)
+            + f"\n\nRespond with only a JSON object {{\"answers\": [...]}} holding one answer per request, "
+            f"in request order, each of this shape:\n{answer_shape(schema)}"
+        )
+
+    @staticmethod
+    def _split_batched_response(response: str, prompts: List[str], schema: Type[T]) -> List[Optional[T]]:
+        """
+        Validate each answer of a batched response; missing or invalid ones are None.
+        """
+        answers: List[Optional[T]] = [None] * len(prompts)
+        try:
+            data = extract_json(response)
+        except ValueError:
+            return answers
+        raw_answers = data.get('answers') if isinstance(data, dict) else None
+        if not isinstance(raw_answers, list):
+            return answers
+        for index, raw_answer in enumerate(raw_answers[:len(prompts)]):
+            try:
+                answers[index] = schema.model_validate(raw_answer)
+            except ValidationError:
+                continue
+            parse_stats.record(schema, 'parsed')
+        return answers
+
+    async def _map_reduce(
+        self,
+        document: LegalDocument,
+        func: Callable[[DocumentChunk], Awaitable[List[Dict[str, Any]]]],
+        key: Callable[[Dict[str, Any]], Any],
+        clause_ids: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run `func` on each chunk of at most `chunk_tokens` and merge the
+        per-chunk lists, dropping items whose `key` was already seen.
+        A document that fits the budget is a single chunk, i.e. one call.
+        `clause_ids` restricts the chunks to those clauses.
+        """
+        chunks = document.chunks(self.chunk_tokens, clause_ids)
+        if len(chunks) > 1:
+            self.log_activity(f"Document exceeds the {self.chunk_tokens}-token budget, processing {len(chunks)} chunks")
+
+        results = await self._map_concurrent(func, chunks)
+        return self._merge_unique(results, key)
+
+    @staticmethod
+    def _merge_unique(results: List[List[Dict[str, Any]]], key: Callable[[Dict[str, Any]], Any]) -> List[Dict[str, Any]]:
+        """
+        Concatenate per-chunk lists, dropping items whose `key` was already seen.
+        """
+        merged = []
+        seen = set()
+        for items in results:
+            for item in items:
+                item_key = BaseAgent._merge_key(item, key)
+                if item_key and item_key in seen:
+                    continue
+                seen.add(item_key)
+                merged.append(item)
+        return merged
+
+    @staticmethod
+    def _merge_key(item: Dict[str, Any], key: Callable[[Dict[str, Any]], Any]) -> str:
+        return ' '.join(str(key(item) or '').lower().split())
+
     def store_in_memory(self, key: str, value: Any) -> None:
         """
         Store a value in the agent's memory.
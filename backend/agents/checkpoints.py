@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import orjson
+
+from .payload import dumps
+
+DEFAULT_CHECKPOINT_PATH = Path(__file__).resolve().parent.parent / ".cache" / "checkpoints.sqlite3"
+
+
+def document_hash(document_text: str, context: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Key of one analysis: the document text and the request context, which
+    also shapes the prompts.
+    """
+    payload = json.dumps(
+        {
+            'document': hashlib.sha256(document_text.encode('utf-8')).hexdigest(),
+            'context': context or {}
+        },
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CheckpointStore:
+    """
+    Results of completed pipeline stages in a SQLite file, keyed by document
+    hash, pipeline version and stage name, so an analysis that failed part
+    way can resume after its last completed stage.
+
+    The file runs in WAL mode so several uvicorn workers can share it.
+    Checkpoints expire after `ttl` seconds.
+    """
+
+    def __init__(self, path: Optional[Path] = None, ttl: Optional[float] = None):
+        self.path = Path(path or os.getenv("CHECKPOINT_PATH", str(DEFAULT_CHECKPOINT_PATH)))
+        self.ttl = ttl if ttl is not None else float(os.getenv("CHECKPOINT_TTL", str(24 * 3600)))
+
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "document_hash TEXT NOT NULL, version TEXT NOT NULL, stage TEXT NOT NULL, "
+            "results BLOB NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (document_hash, version, stage))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS checkpoints_created ON checkpoints (created_at)")
+
+    async def load(self, document_hash: str, version: str) -> Dict[str, Any]:
+        """
+        Results of the stages completed for this document and version, keyed
+        by stage name.
+        """
+        return await asyncio.to_thread(self._load, document_hash, version, time.time())
+
+    async def save(self, document_hash: str, version: str, stage: str, results: Any) -> None:
+        await asyncio.to_thread(self._save, document_hash, version, stage, dumps(results), time.time())
+
+    async def clear(self, document_hash: str, version: str) -> None:
+        """
+        Drop this document's checkpoints (once its analysis has completed)
+        along with any expired ones.
+        """
+        await asyncio.to_thread(self._clear, document_hash, version, time.time())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _load(self, document_hash: str, version: str, now: float) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, results FROM checkpoints WHERE document_hash = ? AND version = ? AND created_at >= ?",
+                (document_hash, version, now - self.ttl)
+            ).fetchall()
+        return {stage: orjson.loads(results) for stage, results in rows}
+
+    def _save(self, document_hash: str, version: str, stage: str, results: bytes, now: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (document_hash, version, stage, results, created_at) VALUES (?, ?, ?, ?, ?)",
+                (document_hash, version, stage, results, now)
+            )
+
+    def _clear(self, document_hash: str, version: str, now: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM checkpoints WHERE (document_hash = ? AND version = ?) OR created_at < ?",
+                (document_hash, version, now - self.ttl)
+            )
+
+
+_store: Optional[CheckpointStore] = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store() -> Optional[CheckpointStore]:
+    """
+    Return the process-wide checkpoint store, or None when CHECKPOINT_ENABLED is off.
+    """
+    global _store
+    if os.getenv("CHECKPOINT_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CheckpointStore()
+    return _store
\ No newline at end of file
@@ -1,36 +1,33 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from .base_agent import BaseAgent
-import json
+from .document import LegalDocument
+from .knowledge_pack import get_knowledge_pack
+from .schemas import AlignmentRecommendation, ClauseComparison
+from .template_index import TemplateIndex, template_text
 import os
-from pathlib import Path
 
 class ClauseComparisonAgent(BaseAgent):
     def __init__(self):
         super().__init__()
-        self.templates_dir = Path("backend/data/clause_templates")
-        self.templates_dir.mkdir(parents=True, exist_ok=True)
-        self.templates = self._load_templates()
+        self.match_threshold = float(os.getenv("TEMPLATE_MATCH_THRESHOLD", "0.35"))
+        self.exact_match_threshold = float(os.getenv("TEMPLATE_EXACT_MATCH_THRESHOLD", "0.92"))
+        self.match_top_k = int(os.getenv("TEMPLATE_MATCH_TOP_K", "3"))
 
-    def _load_templates(self) -> Dict[str, Dict[str, Any]]:
-        """
-        Load clause templates from JSON files in the templates directory.
-        """
-        templates = {}
-        for template_file in self.templates_dir.glob("*.json"):
-            try:
-                with open(template_file, 'r') as f:
-                    template_data = json.load(f)
-                    templates[template_file.stem] = template_data
-            except Exception as e:
-                print(f"Error loading template {template_file}: {str(e)}")
-        return templates
+    @property
+    def templates(self) -> Dict[str, Dict[str, Any]]:
+        return get_knowledge_pack().templates
+
+    @property
+    def template_index(self) -> TemplateIndex:
+        # Built from the pack's precomputed embeddings and swapped with it on reload
+        return get_knowledge_pack().template_index
 
     async def process(self, document_text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Compare document clauses against standard templates.
         """
-        # Extract clauses from the document
-        clauses = await self._extract_clauses(document_text)
+        # Take the clauses from the shared segmentation
+        clauses = self._extract_clauses(self._get_document(document_text, context))
         
         # Compare each clause with templates
         comparisons = await self._compare_clauses(clauses)
@@ -44,64 +41,70 @@ class ClauseComparisonAgent(BaseAgent):
             'recommendations': recommendations
         }
 
-    async def _extract_clauses(self, text: str) -> List[Dict[str, Any]]:
-        prompt = f"""
-        Extract all distinct clauses from the following legal document.
-        For each clause, identify:
-        1. The clause text
-        2. The clause type (e.g., definition, obligation, limitation, termination)
-        3. The section or context where it appears
-        4. Any key terms or conditions
-
-        Document text:
-        {text}
-
-        Return the information in a structured format.
+    def digest(self, results: Dict[str, Any]) -> List[str]:
+        items = []
+        unmatched = 0
+        for comparison in results.get('comparisons', []):
+            if not comparison.get('template_match'):
+                unmatched += 1
+            elif not comparison.get('exact_match') and comparison.get('differences'):
+                template = comparison.get('template') or {}
+                items.append(
+                    f"[{comparison['clause'].get('id', '')}] differs from the {template.get('name', 'standard')} template: "
+                    + '; '.join(comparison['differences'][:2])
+                )
+        if unmatched:
+            items.append(f"{unmatched} clauses have no matching standard template")
+        return items
+
+    def _extract_clauses(self, document: LegalDocument) -> List[Dict[str, Any]]:
         """
-        
-        response = await self._call_llm(prompt)
-        clauses = []
-        
-        # Parse the response and structure it
-        current_clause = {}
-        for line in response.split('\n'):
-            if line.strip():
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    current_clause[key.strip().lower()] = value.strip()
-                elif current_clause:
-                    clauses.append(current_clause)
-                    current_clause = {}
-        
-        if current_clause:
-            clauses.append(current_clause)
-            
-        return clauses
+        Return the document's clauses with their IDs, types and offsets.
+        """
+        return [clause.to_dict() for clause in document.clauses]
 
     async def _compare_clauses(self, clauses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        comparisons = []
-        
-        for clause in clauses:
-            clause_type = clause.get('type', '').lower()
-            matching_templates = [
-                template for name, template in self.templates.items()
-                if name.lower() in clause_type or clause_type in name.lower()
-            ]
-            
-            if matching_templates:
-                for template in matching_templates:
-                    comparison = await self._compare_single_clause(clause, template)
-                    comparisons.append(comparison)
+        # Find the most similar templates for every clause in one vector search
+        matches = self.template_index.search(
+            [f"{clause.get('type', '')} {clause.get('heading', '')} {clause.get('text', '')}" for clause in clauses],
+            k=self.match_top_k,
+            threshold=self.match_threshold
+        )
+
+        # Pair every clause with its matching templates (or None) so the LLM
+        # comparisons can run concurrently while keeping the original order
+        pairs = []
+        for clause, clause_matches in zip(clauses, matches):
+            if clause_matches:
+                pairs.extend((clause, template, similarity) for _, template, similarity in clause_matches)
             else:
+                pairs.append((clause, None, 0.0))
+
+        async def compare(pair: Tuple[Dict[str, Any], Optional[Dict[str, Any]], float]) -> Dict[str, Any]:
+            clause, template, similarity = pair
+            if template is None:
                 # If no matching template found, mark for review
-                comparisons.append({
+                return {
                     'clause': clause,
                     'template_match': False,
                     'differences': ['No matching template found'],
                     'recommendation': 'Review clause for standardization'
-                })
+                }
+            if similarity >= self.exact_match_threshold:
+                # Near-verbatim use of the template, nothing for the LLM to compare
+                return {
+                    'clause': clause,
+                    'template': template,
+                    'template_match': True,
+                    'exact_match': True,
+                    'similarity': similarity,
+                    'differences': []
+                }
+            comparison = await self._compare_single_clause(clause, template)
+            comparison['similarity'] = similarity
+            return comparison
         
-        return comparisons
+        return await self._map_concurrent(compare, pairs)
 
     async def _compare_single_clause(self, clause: Dict[str, Any], template: Dict[str, Any]) -> Dict[str, Any]:
         prompt = f"""
@@ -111,7 +114,7 @@ class ClauseComparisonAgent(BaseAgent):
         {clause.get('text', '')}
 
         Template:
-        {template.get('text', '')}
+        {template_text(template)}
 
         Please identify:
         1. Key differences between the clause and template
@@ -119,65 +122,48 @@ class ClauseComparisonAgent(BaseAgent):
         3. Additional elements not in the template
         4. Potential issues or concerns
         5. Recommendations for alignment
-
-        Return the information in a structured format.
         """
-        
-        response = await self._call_llm(prompt)
-        
-        # Parse the response and structure it
-        comparison = {
+
+        result = await self._call_llm_structured_or_none(prompt, ClauseComparison)
+        return {
             'clause': clause,
             'template': template,
-            'template_match': True
+            'template_match': True,
+            **(result or ClauseComparison()).model_dump()
         }
-        
-        for line in response.split('\n'):
-            if ':' in line:
-                key, value = line.split(':', 1)
-                comparison[key.strip().lower()] = value.strip()
-        
-        return comparison
 
     async def _generate_recommendations(self, comparisons: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        recommendations = []
-        
-        for comparison in comparisons:
-            if not comparison.get('template_match', False):
-                prompt = f"""
-                Generate specific recommendations to align the following clause with its standard template:
-
-                Clause:
-                {comparison['clause'].get('text', '')}
-
-                Template:
-                {comparison['template'].get('text', '')}
-
-                Differences:
-                {comparison.get('differences', [])}
-
-                Please provide:
-                1. Specific language changes needed
-                2. Elements to add or remove
-                3. Structural changes required
-                4. Any additional considerations
-
-                Return the information in a structured format.
-                """
-                
-                response = await self._call_llm(prompt)
-                
-                # Parse the response and structure it
-                recommendation = {
-                    'clause': comparison['clause'],
-                    'template': comparison['template']
-                }
-                
-                for line in response.split('\n'):
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        recommendation[key.strip().lower()] = value.strip()
-                
-                recommendations.append(recommendation)
-        
-        return recommendations 
\ No newline at end of file
+        # Only clauses that have a template to align with and deviate from it
+        to_align = [
+            comparison for comparison in comparisons
+            if comparison.get('template_match', False) and not comparison.get('exact_match', False)
+        ]
+
+        async def recommend(comparison: Dict[str, Any]) -> Dict[str, Any]:
+            prompt = f"""
+            Generate specific recommendations to align the following clause with its standard template:
+
+            Clause:
+            {comparison['clause'].get('text', '')}
+
+            Template:
+            {template_text(comparison['template'])}
+
+            Differences:
+            {comparison.get('differences', [])}
+
+            Please provide:
+            1. Specific language changes needed
+            2. Elements to add or remove
+            3. Structural changes required
+            4. Any additional considerations
+            """
+
+            result = await self._call_llm_structured_or_none(prompt, AlignmentRecommendation)
+            return {
+                'clause': comparison['clause'],
+                'template': comparison['template'],
+                **(result or AlignmentRecommendation()).model_dump()
+            }
+
+        return await self._map_concurrent(recommend, to_align)
\ No newline at end of file
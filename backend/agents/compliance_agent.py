@@ -1,38 +1,26 @@
 from typing import Dict, List, Any, Optional
 from .base_agent import BaseAgent
-import json
-from pathlib import Path
+from .document import LegalDocument
+from .knowledge_pack import get_knowledge_pack
+from .schemas import ComplianceCheck, ComplianceReport, JurisdictionList
 
 class ComplianceAgent(BaseAgent):
-    def __init__(self):
-        super().__init__()
-        self.compliance_rules_dir = Path("backend/data/compliance_rules")
-        self.compliance_rules_dir.mkdir(parents=True, exist_ok=True)
-        self.compliance_rules = self._load_compliance_rules()
-
-    def _load_compliance_rules(self) -> Dict[str, Dict[str, Any]]:
-        """
-        Load compliance rules from JSON files in the compliance_rules directory.
-        """
-        rules = {}
-        for rule_file in self.compliance_rules_dir.glob("*.json"):
-            try:
-                with open(rule_file, 'r') as f:
-                    rule_data = json.load(f)
-                    rules[rule_file.stem] = rule_data
-            except Exception as e:
-                print(f"Error loading compliance rule {rule_file}: {str(e)}")
-        return rules
+    @property
+    def compliance_rules(self) -> Dict[str, Dict[str, Any]]:
+        return get_knowledge_pack().rules
 
     async def process(self, document_text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Check the document for compliance with relevant laws and regulations.
         """
+        # Prompts only carry the passages relevant to each question
+        document = self._get_document(document_text, context)
+
         # Identify applicable jurisdictions and regulations
-        jurisdictions = await self._identify_jurisdictions(document_text, context)
+        jurisdictions = await self._identify_jurisdictions(document, context)
         
         # Check compliance with each jurisdiction's rules
-        compliance_checks = await self._check_compliance(document_text, jurisdictions)
+        compliance_checks = await self._check_compliance(document, jurisdictions)
         
         # Generate compliance report
         compliance_report = await self._generate_compliance_report(compliance_checks)
@@ -43,7 +31,21 @@ class ComplianceAgent(BaseAgent):
             'compliance_report': compliance_report
         }
 
-    async def _identify_jurisdictions(self, text: str, context: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    def digest(self, results: Dict[str, Any]) -> List[str]:
+        report = results.get('compliance_report', {})
+        items = [f"Overall compliance: {report['overall_status']}"] if report.get('overall_status') else []
+        for check in results.get('compliance_checks', []):
+            name = check['jurisdiction'].get('name', '')
+            items += [f"{name} violation: {violation}" for violation in check.get('violations', [])]
+        items += [f"Critical compliance issue: {issue}" for issue in report.get('critical_issues', [])]
+        return items
+
+    async def _identify_jurisdictions(self, document: LegalDocument, context: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        text = self._relevant_text(
+            document,
+            "governing law jurisdiction courts venue located incorporated country state province "
+            "regulation regulatory data protection privacy export cross-border"
+        )
         prompt = f"""
         Identify all relevant jurisdictions and regulations that apply to this legal document.
         Consider:
@@ -57,36 +59,19 @@ class ComplianceAgent(BaseAgent):
         {text}
 
         Additional context:
-        {context if context else 'No additional context provided'}
-
-        Return the information in a structured format.
+        {self._analysis_digest(context)}
         """
-        
-        response = await self._call_llm(prompt)
-        jurisdictions = []
-        
-        # Parse the response and structure it
-        current_jurisdiction = {}
-        for line in response.split('\n'):
-            if line.strip():
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    current_jurisdiction[key.strip().lower()] = value.strip()
-                elif current_jurisdiction:
-                    jurisdictions.append(current_jurisdiction)
-                    current_jurisdiction = {}
-        
-        if current_jurisdiction:
-            jurisdictions.append(current_jurisdiction)
-            
-        return jurisdictions
 
-    async def _check_compliance(self, text: str, jurisdictions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        compliance_checks = []
-        
-        for jurisdiction in jurisdictions:
+        result = await self._call_llm_structured_or_none(prompt, JurisdictionList)
+        return [jurisdiction.model_dump() for jurisdiction in result.jurisdictions] if result else []
+
+    async def _check_compliance(self, document: LegalDocument, jurisdictions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        async def check(jurisdiction: Dict[str, Any]) -> Dict[str, Any]:
             # Get applicable rules for this jurisdiction
-            jurisdiction_rules = self.compliance_rules.get(jurisdiction.get('name', '').lower(), {})
+            jurisdiction_rules = get_knowledge_pack().rules_for(jurisdiction.get('name', ''))
+
+            # Only send the passages that bear on this jurisdiction and its rules
+            text = self._relevant_text(document, f"{' '.join(map(str, jurisdiction.values()))} {jurisdiction_rules}")
             
             prompt = f"""
             Check the following legal document for compliance with {jurisdiction.get('name', '')} regulations.
@@ -106,42 +91,12 @@ class ComplianceAgent(BaseAgent):
             3. Required changes for compliance
             4. Potential penalties for non-compliance
             5. Recommendations for achieving compliance
-
-            Return the information in a structured format.
             """
-            
-            response = await self._call_llm(prompt)
-            
-            # Parse the response and structure it
-            compliance_check = {
-                'jurisdiction': jurisdiction,
-                'status': {},
-                'violations': [],
-                'required_changes': [],
-                'penalties': [],
-                'recommendations': []
-            }
-            
-            for line in response.split('\n'):
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    key = key.strip().lower()
-                    value = value.strip()
-                    
-                    if 'status' in key:
-                        compliance_check['status'][key] = value
-                    elif 'violation' in key:
-                        compliance_check['violations'].append(value)
-                    elif 'change' in key:
-                        compliance_check['required_changes'].append(value)
-                    elif 'penalty' in key:
-                        compliance_check['penalties'].append(value)
-                    elif 'recommendation' in key:
-                        compliance_check['recommendations'].append(value)
-            
-            compliance_checks.append(compliance_check)
-        
-        return compliance_checks
+
+            result = await self._call_llm_structured_or_none(prompt, ComplianceCheck)
+            return {'jurisdiction': jurisdiction, **(result or ComplianceCheck()).model_dump()}
+
+        return await self._map_concurrent(check, jurisdictions)
 
     async def _generate_compliance_report(self, compliance_checks: List[Dict[str, Any]]) -> Dict[str, Any]:
         prompt = f"""
@@ -157,39 +112,7 @@ class ComplianceAgent(BaseAgent):
         4. Compliance risk assessment
         5. Action items and priorities
         6. Long-term compliance strategy
-
-        Return the information in a structured format.
         """
-        
-        response = await self._call_llm(prompt)
-        
-        # Parse the response and structure it
-        report = {
-            'overall_status': '',
-            'key_findings': [],
-            'critical_issues': [],
-            'risk_assessment': {},
-            'action_items': [],
-            'long_term_strategy': []
-        }
-        
-        for line in response.split('\n'):
-            if ':' in line:
-                key, value = line.split(':', 1)
-                key = key.strip().lower()
-                value = value.strip()
-                
-                if 'status' in key:
-                    report['overall_status'] = value
-                elif 'finding' in key:
-                    report['key_findings'].append(value)
-                elif 'issue' in key:
-                    report['critical_issues'].append(value)
-                elif 'risk' in key:
-                    report['risk_assessment'][key] = value
-                elif 'action' in key:
-                    report['action_items'].append(value)
-                elif 'strategy' in key:
-                    report['long_term_strategy'].append(value)
-        
-        return report 
\ No newline at end of file
+
+        result = await self._call_llm_structured_or_none(prompt, ComplianceReport)
+        return (result or ComplianceReport()).model_dump()
\ No newline at end of file
@@ -0,0 +1,177 @@
+import asyncio
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def bounded_map(func: Callable[[T], Awaitable[R]], items: Iterable[T], limit: int) -> List[R]:
+    """
+    Await `func(item)` for every item with at most `limit` calls in flight.
+
+    Results are returned in the same order as `items`. If any call raises,
+    the remaining calls are cancelled and the error is re-raised.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await func(item)
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def bounded_as_completed(func: Callable[[T], Awaitable[R]], items: Iterable[T], limit: int) -> AsyncIterator[R]:
+    """
+    Yield `func(item)` for every item as each call finishes, with at most
+    `limit` calls in flight. If a call raises, or the consumer stops early,
+    the remaining calls are cancelled.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await func(item)
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def bounded_map_stream(func: Callable[[T], Awaitable[R]], items: AsyncIterable[T], limit: int) -> List[R]:
+    """
+    Await `func(item)` for every item of an async stream, starting each call
+    as soon as its item arrives, with at most `limit` calls in flight.
+
+    Results are returned in arrival order. If any call raises, the remaining
+    calls are cancelled and the error is re-raised.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+    tasks: List[asyncio.Future] = []
+
+    async def run(item: T) -> R:
+        try:
+            return await func(item)
+        finally:
+            semaphore.release()
+
+    try:
+        async for item in items:
+            await semaphore.acquire()
+            # Stop taking items as soon as an earlier call has failed
+            failed = next(
+                (task for task in tasks if task.done() and not task.cancelled() and task.exception() is not None),
+                None
+            )
+            if failed is not None:
+                raise failed.exception()
+            tasks.append(asyncio.ensure_future(run(item)))
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+_CLOSED = object()
+
+
+class Channel(Generic[T]):
+    """
+    Hands items from a producing stage to a consuming one as they are made.
+
+    The producer calls `send` for each item and `close` when it is done; the
+    consumer iterates with `async for` until the channel is closed.
+    `on_send`, if given, is also called with every item (e.g. to report
+    progress).
+    """
+
+    def __init__(self, on_send: Optional[Callable[[T], Any]] = None):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+        self.on_send = on_send
+
+    def send(self, item: T) -> None:
+        if self.closed:
+            raise RuntimeError("Cannot send on a closed channel")
+        self._queue.put_nowait(item)
+        if self.on_send is not None:
+            self.on_send(item)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._queue.put_nowait(_CLOSED)
+
+    async def __aiter__(self) -> AsyncIterator[T]:
+        while True:
+            item = await self._queue.get()
+            if item is _CLOSED:
+                return
+            yield item
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight task.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same result instead of starting their own. The
+    shared work is only cancelled once every caller waiting on it is cancelled.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[R]]) -> R:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            self._waiters[key] = 0
+            future.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._inflight.get(key) is future:
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0 and not future.done():
+                    # Forget the key now, not in the done callback, so a caller
+                    # arriving before the cancellation lands starts fresh work
+                    del self._inflight[key]
+                    del self._waiters[key]
+                    future.cancel()
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+            del self._waiters[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not future.cancelled():
+            future.exception()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
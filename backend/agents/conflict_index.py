@@ -0,0 +1,216 @@
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from .document import LegalDocument
+from .entities import Entity
+from .references import CrossReferenceGraph
+from .segmentation import Clause
+
+SENTENCE_BREAK = re.compile(r'(?<=[.;:])\s+(?=["“(]?[A-Z0-9])|\n\s*\n')
+OBLIGATION_WORDS = re.compile(r'\b(?:shall|must|will|may|agrees?\s+to|is\s+(?:required|entitled)\s+to)\b', re.IGNORECASE)
+
+# Subjects an obligation's parameters can be about. A parameter conflicts with
+# another when they share a subject and kind but differ in value.
+OBLIGATION_TOPICS: List[Tuple[str, Tuple[str, ...]]] = [
+    ('notice', ('notice', 'notify')),
+    ('termination', ('terminat',)),
+    ('renewal', ('renew',)),
+    ('cure period', ('cure', 'remedy')),
+    ('late interest', ('interest', 'late')),
+    ('payment', ('pay', 'invoice', 'fee')),
+    ('delivery', ('deliver',)),
+    ('confidentiality', ('confidential',)),
+    ('warranty', ('warrant',)),
+    ('liability', ('liab', 'indemn')),
+    ('return of materials', ('return', 'destroy')),
+    ('effective date', ('effective', 'commence')),
+    ('expiry', ('expir',)),
+    ('term', ('term of', 'remain in effect', 'duration')),
+]
+PARAMETER_TYPES = ('date', 'duration', 'money', 'percentage')
+
+
+@dataclass
+class ParameterSite:
+    """
+    Where an indexed value occurs: the entity, its clause and the sentence
+    (or, for a defined term, the definition) around it.
+    """
+    entity: Entity
+    label: str
+    clause_id: Optional[str]
+    sentence: str
+
+
+@dataclass
+class ConflictCandidate:
+    """
+    Two or more places in the document that look like they disagree.
+    """
+    type: str
+    subject: str
+    sites: List[Tuple[str, Optional[str], str]]
+    cross_referenced: bool = False
+
+    @property
+    def clause_ids(self) -> List[str]:
+        return list(dict.fromkeys(clause_id for _, clause_id, _ in self.sites if clause_id))
+
+    def to_dict(self) -> Dict[str, Any]:
+        elements = ' vs '.join(
+            f'"{value}" ({clause_id or "unnumbered"}: "{excerpt}")' for value, clause_id, excerpt in self.sites
+        )
+        return {
+            'type': self.type,
+            'subject': self.subject,
+            'elements': elements,
+            'location': ', '.join(self.clause_ids),
+            'clause_ids': self.clause_ids,
+            'cross_referenced': self.cross_referenced,
+            'source': 'conflict_index'
+        }
+
+
+@dataclass
+class ConflictIndex:
+    """
+    Deterministic index of the facts two provisions can disagree on:
+    defined terms and their definition sites, obligation parameters (dates,
+    durations, amounts, percentages) keyed by subject, and section
+    cross-references. Built in one pass over the document's entities.
+    """
+    definitions: Dict[str, List[ParameterSite]] = field(default_factory=lambda: defaultdict(list))
+    parameters: Dict[Tuple[str, str, str], List[ParameterSite]] = field(default_factory=lambda: defaultdict(list))
+    references: Optional[CrossReferenceGraph] = None
+
+    @classmethod
+    def build(cls, document: LegalDocument) -> "ConflictIndex":
+        index = cls()
+        for entity in document.entities.get('defined_term', []):
+            clause = document.clause_at(entity.start)
+            meaning = entity.value.get('definition') or f"refers to {entity.value.get('refers_to', '')}"
+            index.definitions[' '.join(entity.value['term'].lower().split())].append(
+                ParameterSite(entity, entity.value['term'], clause.id if clause else None, meaning)
+            )
+
+        entities = sorted(
+            (entity for entity_type in PARAMETER_TYPES for entity in document.entities.get(entity_type, [])),
+            key=lambda entity: entity.start
+        )
+        position = 0
+        for clause in document.clauses:
+            for sentence_start, sentence_end in _sentences(document.text, _body_start(document.text, clause), clause.end):
+                sentence_entities = []
+                while position < len(entities) and entities[position].start < sentence_end:
+                    if entities[position].start >= sentence_start:
+                        sentence_entities.append(entities[position])
+                    position += 1
+                sentence = document.text[sentence_start:sentence_end]
+                if not sentence_entities or not OBLIGATION_WORDS.search(sentence):
+                    continue
+                for topic in _topics(sentence):
+                    for entity in sentence_entities:
+                        index.parameters[(topic, entity.type, _unit(entity))].append(
+                            ParameterSite(entity, entity.text, clause.id, ' '.join(sentence.split()))
+                        )
+
+        index.references = document.references
+        return index
+
+    def _cross_referenced(self, clause_ids: List[str]) -> bool:
+        if self.references is None:
+            return False
+        return any(
+            self.references.refers_to(clause_id, other)
+            for clause_id in clause_ids for other in clause_ids if other != clause_id
+        )
+
+    def _candidate(self, conflict_type: str, subject: str, sites: List[ParameterSite], max_excerpt: int) -> ConflictCandidate:
+        candidate = ConflictCandidate(
+            type=conflict_type,
+            subject=subject,
+            sites=[(site.label, site.clause_id, _excerpt(site.sentence, max_excerpt)) for site in sites]
+        )
+        candidate.cross_referenced = self._cross_referenced(candidate.clause_ids)
+        return candidate
+
+    def candidates(self, max_excerpt: int = 240) -> List[ConflictCandidate]:
+        """
+        Terms defined more than once with different wording, and obligation
+        subjects given different values of the same kind in different places.
+        """
+        candidates = []
+        seen = set()
+        for sites in self.definitions.values():
+            distinct = _distinct(sites, lambda site: ' '.join(site.sentence.lower().split()))
+            if len(distinct) > 1:
+                candidates.append(self._candidate('definition', distinct[0].entity.value['term'], distinct, max_excerpt))
+
+        for (topic, entity_type, _), sites in self.parameters.items():
+            distinct = _distinct(sites, lambda site: repr(site.entity.value))
+            # Different values in one sentence are usually two separate obligations
+            if len(distinct) < 2 or len({(site.clause_id, site.sentence) for site in distinct}) < 2:
+                continue
+            # A sentence matching several subjects yields the same conflict once
+            key = frozenset((site.entity.start, site.entity.end) for site in distinct)
+            if key in seen:
+                continue
+            seen.add(key)
+            candidates.append(self._candidate(
+                'temporal' if entity_type in ('date', 'duration') else 'obligation',
+                f"{topic} {entity_type}",
+                distinct,
+                max_excerpt
+            ))
+        return candidates
+
+
+def _body_start(text: str, clause: Clause) -> int:
+    """
+    Skip a title-only heading line so it does not run into the first sentence.
+    """
+    line_end = text.find('\n', clause.start, clause.end)
+    if clause.number is None or line_end == -1:
+        return clause.start
+    heading = text[clause.start:line_end].rstrip()
+    if len(heading) > 100 or heading.endswith(('.', ';', ',')) or OBLIGATION_WORDS.search(heading):
+        return clause.start
+    return line_end + 1
+
+
+def _sentences(text: str, start: int, end: int) -> List[Tuple[int, int]]:
+    spans = []
+    for match in SENTENCE_BREAK.finditer(text, start, end):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, end))
+    return spans
+
+
+def _topics(sentence: str) -> List[str]:
+    lowered = sentence.lower()
+    return [topic for topic, keywords in OBLIGATION_TOPICS if any(keyword in lowered for keyword in keywords)]
+
+
+def _unit(entity: Entity) -> str:
+    if entity.type == 'duration':
+        return entity.value['unit']
+    if entity.type == 'money':
+        return entity.value['currency']
+    return ''
+
+
+def _distinct(items: List[Any], key) -> List[Any]:
+    """
+    The first item for each distinct key, in document order.
+    """
+    seen = {}
+    for item in items:
+        seen.setdefault(key(item), item)
+    return list(seen.values())
+
+
+def _excerpt(text: str, limit: int) -> str:
+    text = ' '.join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + '...'
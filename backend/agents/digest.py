@@ -0,0 +1,78 @@
+from dataclasses import dataclass, field
+from typing import Iterable, List
+from .document import estimate_tokens
+
+
+@dataclass
+class DigestSection:
+    """
+    One stage's contribution to the digest: a title and one line per finding.
+    """
+    title: str
+    items: List[str] = field(default_factory=list)
+
+
+class AnalysisDigest:
+    """
+    Compact, bounded summary of earlier stages' results for later prompts.
+
+    Stages add short lines instead of their full results; duplicates are
+    dropped and long lines clipped. `render` fits the digest into
+    `max_tokens`, taking lines from every section in turn so one large
+    section cannot crowd out the others.
+    """
+
+    def __init__(self, max_tokens: int = 1500, max_item_chars: int = 300):
+        self.max_tokens = max_tokens
+        self.max_item_chars = max_item_chars
+        self.sections: List[DigestSection] = []
+        self._seen = set()
+
+    def add(self, title: str, items: Iterable[str]) -> None:
+        section = DigestSection(title)
+        for item in items:
+            item = ' '.join(str(item).split())
+            key = item.lower()
+            if not item or key in self._seen:
+                continue
+            self._seen.add(key)
+            if len(item) > self.max_item_chars:
+                item = item[:self.max_item_chars - 3] + '...'
+            section.items.append(item)
+        if section.items:
+            self.sections.append(section)
+
+    def __bool__(self) -> bool:
+        return bool(self.sections)
+
+    def render(self) -> str:
+        """
+        The digest as text within the token budget. Sections that could not
+        be shown in full say how many lines were left out.
+        """
+        if not self.sections:
+            return 'No earlier findings'
+
+        budget = self.max_tokens - sum(estimate_tokens(f"{section.title}:") for section in self.sections)
+        shown: List[List[str]] = [[] for _ in self.sections]
+        full = set()
+        for position in range(max(len(section.items) for section in self.sections)):
+            for index, section in enumerate(self.sections):
+                if index in full or position >= len(section.items):
+                    continue
+                line = f"- {section.items[position]}"
+                cost = estimate_tokens(line)
+                if cost > budget:
+                    # Stop this section here so its lines stay in order
+                    full.add(index)
+                    continue
+                budget -= cost
+                shown[index].append(line)
+
+        blocks = []
+        for section, lines in zip(self.sections, shown):
+            omitted = len(section.items) - len(lines)
+            if omitted:
+                lines = lines + [f"- ({omitted} more not shown)"]
+            blocks.append(f"{section.title}:\n" + "\n".join(lines))
+        return "\n\n".join(blocks)
\ No newline at end of file
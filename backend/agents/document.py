@@ -0,0 +1,191 @@
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from .entities import Entity, extract_entities
+from .references import CrossReferenceGraph
+from .segmentation import Clause, segment_clauses
+
+if TYPE_CHECKING:
+    from .retrieval import BM25Index
+
+# Rough English average; good enough for budgeting prompt sizes
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate used for prompt budgeting.
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+@dataclass(frozen=True)
+class DocumentChunk:
+    """
+    A slice of the document that fits a token budget.
+
+    `segments` lists the (clause_id, start, end) pieces the chunk is made of;
+    a clause longer than the budget is split across several chunks. Chunks
+    built from a subset of the clauses join their pieces with blank lines.
+    """
+    id: str
+    text: str
+    start: int
+    end: int
+    segments: Tuple[Tuple[str, int, int], ...]
+
+    @property
+    def clause_ids(self) -> List[str]:
+        return list(dict.fromkeys(segment[0] for segment in self.segments))
+
+
+def _split_span(text: str, start: int, end: int, max_chars: int) -> List[Tuple[int, int]]:
+    """
+    Cut [start, end) into pieces of at most `max_chars`, preferring to break
+    at a paragraph, line or sentence boundary.
+    """
+    pieces = []
+    while end - start > max_chars:
+        limit = start + max_chars
+        cut = -1
+        for separator in ('\n\n', '\n', '. ', ' '):
+            cut = text.rfind(separator, start + max_chars // 2, limit)
+            if cut != -1:
+                cut += len(separator)
+                break
+        if cut == -1:
+            cut = limit
+        pieces.append((start, cut))
+        start = cut
+    pieces.append((start, end))
+    return pieces
+
+
+class LegalDocument:
+    """
+    The document under analysis, shared by every agent in one run.
+
+    Derived views such as the clause segmentation are computed on first use
+    and then reused, so each is built once per document rather than once per
+    agent.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self._clauses: Optional[List[Clause]] = None
+        self._clauses_by_id: Optional[Dict[str, Clause]] = None
+        self._clause_starts: List[int] = []
+        self._entities: Optional[Dict[str, List[Entity]]] = None
+        self._references: Optional[CrossReferenceGraph] = None
+        self._chunks: Dict[Tuple[int, Optional[FrozenSet[str]]], List[DocumentChunk]] = {}
+        self._indexes: Dict[int, "BM25Index"] = {}
+
+    @property
+    def clauses(self) -> List[Clause]:
+        if self._clauses is None:
+            self._clauses = segment_clauses(self.text)
+            self._clauses_by_id = {clause.id: clause for clause in self._clauses}
+            self._clause_starts = [clause.start for clause in self._clauses]
+        return self._clauses
+
+    @property
+    def entities(self) -> Dict[str, List[Entity]]:
+        """
+        Dates, amounts, percentages, durations and defined terms, by type.
+        """
+        if self._entities is None:
+            self._entities = extract_entities(self.text)
+        return self._entities
+
+    @property
+    def references(self) -> CrossReferenceGraph:
+        """
+        Section cross-references between clauses, keyed by clause ID.
+        """
+        if self._references is None:
+            self._references = CrossReferenceGraph(self.text, self.clauses)
+        return self._references
+
+    def clause_at(self, offset: int) -> Optional[Clause]:
+        """
+        The clause containing character `offset`, if any.
+        """
+        clauses = self.clauses
+        index = bisect_right(self._clause_starts, offset) - 1
+        if index >= 0 and offset < clauses[index].end:
+            return clauses[index]
+        return None
+
+    def clause(self, clause_id: str) -> Optional[Clause]:
+        """
+        Look up a clause by its ID.
+        """
+        if self._clauses_by_id is None:
+            self.clauses
+        return self._clauses_by_id.get(clause_id.strip())
+
+    def chunks(self, max_tokens: int, clause_ids: Optional[Iterable[str]] = None) -> List[DocumentChunk]:
+        """
+        Group consecutive clauses into chunks of at most `max_tokens`
+        (estimated), optionally only the clauses in `clause_ids`. The result
+        is cached per budget and selection.
+        """
+        selection = frozenset(clause_ids) if clause_ids is not None else None
+        key = (max_tokens, selection)
+        if key not in self._chunks:
+            clauses = self.clauses if selection is None else [clause for clause in self.clauses if clause.id in selection]
+            self._chunks[key] = self._build_chunks(max_tokens, clauses, contiguous=selection is None)
+        return self._chunks[key]
+
+    def _build_chunks(self, max_tokens: int, clauses: List[Clause], contiguous: bool) -> List[DocumentChunk]:
+        max_chars = max(max_tokens * CHARS_PER_TOKEN, 1)
+        groups: List[List[Tuple[str, int, int]]] = []
+        current: List[Tuple[str, int, int]] = []
+        current_chars = 0
+
+        for clause in clauses:
+            for piece_start, piece_end in _split_span(self.text, clause.start, clause.end, max_chars):
+                if contiguous:
+                    size = piece_end - current[0][1] if current else 0
+                else:
+                    size = current_chars + (piece_end - piece_start) + 2 * len(current)
+                if current and size > max_chars:
+                    groups.append(current)
+                    current = []
+                    current_chars = 0
+                current.append((clause.id, piece_start, piece_end))
+                current_chars += piece_end - piece_start
+        if current:
+            groups.append(current)
+
+        return [
+            DocumentChunk(
+                id=f"chunk-{index}",
+                text=self.text[group[0][1]:group[-1][2]] if contiguous else "\n\n".join(
+                    self.text[start:end] for _, start, end in group
+                ),
+                start=group[0][1],
+                end=group[-1][2],
+                segments=tuple(group)
+            )
+            for index, group in enumerate(groups, 1)
+        ]
+
+    def index(self, chunk_tokens: int) -> "BM25Index":
+        """
+        BM25 retrieval index over chunks of `chunk_tokens`, built on first use.
+        """
+        if chunk_tokens not in self._indexes:
+            # Imported here because the retrieval module depends on this one
+            from .retrieval import BM25Index
+            self._indexes[chunk_tokens] = BM25Index(self.chunks(chunk_tokens))
+        return self._indexes[chunk_tokens]
+
+    def fits(self, max_tokens: int) -> bool:
+        """
+        Whether the whole document fits in `max_tokens`.
+        """
+        return estimate_tokens(self.text) <= max_tokens
+
+    def __repr__(self) -> str:
+        return f"LegalDocument({len(self.text)} chars)"
@@ -0,0 +1,177 @@
+import re
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8,
+    'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12, 'fourteen': 14, 'fifteen': 15, 'twenty': 20,
+    'thirty': 30, 'forty-five': 45, 'sixty': 60, 'ninety': 90, 'one hundred eighty': 180
+}
+CURRENCIES = {
+    '$': 'USD', 'usd': 'USD', 'dollar': 'USD', 'dollars': 'USD',
+    '€': 'EUR', 'eur': 'EUR', 'euro': 'EUR', 'euros': 'EUR',
+    '£': 'GBP', 'gbp': 'GBP', 'pound': 'GBP', 'pounds': 'GBP',
+    '₹': 'INR', 'inr': 'INR', 'rs': 'INR', 'rs.': 'INR', 'rupees': 'INR'
+}
+MULTIPLIERS = {'thousand': 1e3, 'k': 1e3, 'million': 1e6, 'm': 1e6, 'billion': 1e9, 'bn': 1e9}
+
+_MONTH = (
+    r'(?i:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+    r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?'
+)
+_NUMBER = r'\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?'
+_NUMBER_WORD = '|'.join(sorted(map(re.escape, NUMBER_WORDS), key=len, reverse=True))
+_QUOTED_TERM = r'["“](?P<{name}>[A-Z][^"“”\n]{{0,80}}?)["”]'
+
+# One alternation, scanned once; earlier alternatives win where they overlap
+ENTITY_PATTERN = re.compile(
+    r'(?P<iso_date>\b(?P<iso_year>\d{4})-(?P<iso_month>\d{1,2})-(?P<iso_day>\d{1,2})\b)'
+    r'|(?P<numeric_date>\b(?P<numeric_first>\d{1,2})(?P<numeric_sep>[/-])(?P<numeric_second>\d{1,2})(?P=numeric_sep)(?P<numeric_year>\d{4}|\d{2})\b)'
+    r'|(?P<month_date>\b(?P<md_month>' + _MONTH + r')\s+(?P<md_day>\d{1,2})(?:st|nd|rd|th)?,?\s+(?P<md_year>\d{4})\b)'
+    r'|(?P<day_date>\b(?P<dm_day>\d{1,2})(?:st|nd|rd|th)?\s+(?:day\s+of\s+)?(?P<dm_month>' + _MONTH + r'),?\s+(?P<dm_year>\d{4})\b)'
+    r'|(?P<money>(?:(?P<money_symbol>[$€£₹])\s?|\b(?P<money_code>(?i:usd|eur|gbp|inr|rs\.?))\s?)(?P<money_amount>' + _NUMBER + r')'
+    r'(?:\s?(?P<money_multiplier>(?i:thousand|million|billion|bn|k|m))\b)?'
+    r'|\b(?P<money_plain>' + _NUMBER + r')\s?(?P<money_unit>(?i:dollars|euros|pounds|rupees|usd|eur|gbp|inr))\b)'
+    r'|(?P<percentage>\b(?P<percent_value>\d+(?:\.\d+)?)\s?(?:%|(?i:percent|per\s+cent)\b))'
+    r'|(?P<duration>\b(?:(?P<duration_word>(?i:' + _NUMBER_WORD + r'))\s+\(\s*(?P<duration_paren>\d+)\s*\)'
+    r'|(?P<duration_number>\d+)|(?P<duration_word_only>(?i:' + _NUMBER_WORD + r')))'
+    r'\s+(?P<duration_qualifier>(?i:business|calendar|working)\s+)?(?P<duration_unit>(?i:hours?|days?|weeks?|months?|years?))\b)'
+    r'|(?P<definition>' + _QUOTED_TERM.format(name='defined') + r'\s+(?:shall\s+)?(?i:means?|shall\s+have\s+the\s+meaning|has\s+the\s+meaning|refers?\s+to)\b)'
+    r'|(?P<alias>\((?:(?i:hereinafter)\s+(?:(?i:referred\s+to\s+as)\s+)?)?(?:(?i:the|each\s+a|a)\s+)?' + _QUOTED_TERM.format(name='aliased') + r'\))'
+)
+# Where a definition's text or an alias's referent stops
+_DEFINITION_END = re.compile(r'(?<=[.;])\s|\n\s*\n')
+# A full stop ends a sentence unless it closes an initial or an abbreviation
+# common in company names (Ltd., Inc., Co., Corp., L.L.C., N.V.)
+_REFERENT_START = re.compile(
+    r'(?:\n|;|:|\bbetween\b|\band\b|\bby\b|\(\w\)'
+    r'|(?<!\bltd)(?<!\binc)(?<!\bco)(?<!\bcorp)(?<!\bpvt)(?<!\bplc)(?<!\bbros)(?<!\b\w)\. )',
+    re.IGNORECASE
+)
+
+
+@dataclass(frozen=True)
+class Entity:
+    """
+    A value found in the document. `start`/`end` are character offsets of
+    `text`, and `value` is its normalized form (ISO date, amount, ...).
+    """
+    type: str
+    text: str
+    value: Any
+    start: int
+    end: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _year(value: str) -> int:
+    year = int(value)
+    if len(value) == 2:
+        # Same pivot as strptime's %y: 00-68 -> 2000s, 69-99 -> 1900s
+        year += 2000 if year < 69 else 1900
+    return year
+
+
+def _iso_date(year: int, month: int, day: int) -> Optional[str]:
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def _parse_number(value: str) -> float:
+    return float(value.replace(',', ''))
+
+
+def _date_value(match: re.Match) -> Optional[str]:
+    if match.group('iso_date'):
+        return _iso_date(int(match.group('iso_year')), int(match.group('iso_month')), int(match.group('iso_day')))
+    if match.group('numeric_date'):
+        first, second = int(match.group('numeric_first')), int(match.group('numeric_second'))
+        year = _year(match.group('numeric_year'))
+        # Month first (US style) unless that cannot be a valid date
+        return _iso_date(year, first, second) or _iso_date(year, second, first)
+    if match.group('month_date'):
+        month = MONTHS[match.group('md_month')[:3].lower()]
+        return _iso_date(int(match.group('md_year')), month, int(match.group('md_day')))
+    month = MONTHS[match.group('dm_month')[:3].lower()]
+    return _iso_date(int(match.group('dm_year')), month, int(match.group('dm_day')))
+
+
+def _money_value(match: re.Match) -> Dict[str, Any]:
+    if match.group('money_plain'):
+        return {
+            'amount': _parse_number(match.group('money_plain')),
+            'currency': CURRENCIES[match.group('money_unit').lower()]
+        }
+    amount = _parse_number(match.group('money_amount'))
+    multiplier = match.group('money_multiplier')
+    if multiplier:
+        amount *= MULTIPLIERS[multiplier.lower()]
+    currency = match.group('money_symbol') or match.group('money_code')
+    return {'amount': amount, 'currency': CURRENCIES[currency.lower()]}
+
+
+def _duration_value(match: re.Match) -> Dict[str, Any]:
+    if match.group('duration_paren'):
+        amount = int(match.group('duration_paren'))
+    elif match.group('duration_number'):
+        amount = int(match.group('duration_number'))
+    else:
+        amount = NUMBER_WORDS[' '.join(match.group('duration_word_only').lower().split())]
+    qualifier = match.group('duration_qualifier')
+    return {
+        'amount': amount,
+        'unit': match.group('duration_unit').lower().rstrip('s'),
+        'qualifier': qualifier.strip().lower() if qualifier else None
+    }
+
+
+def _definition_value(text: str, match: re.Match) -> Dict[str, Any]:
+    end = _DEFINITION_END.search(text, match.end(), min(len(text), match.end() + 1000))
+    definition = text[match.end():end.start() if end else min(len(text), match.end() + 500)]
+    return {'term': match.group('defined'), 'definition': ' '.join(definition.split())}
+
+
+def _alias_value(text: str, match: re.Match) -> Dict[str, Any]:
+    window_start = max(0, match.start() - 200)
+    window = text[window_start:match.start()]
+    boundaries = list(_REFERENT_START.finditer(window))
+    referent = window[boundaries[-1].end():] if boundaries else window
+    return {'term': match.group('aliased'), 'refers_to': ' '.join(referent.split()).strip(' ,')}
+
+
+def extract_entities(text: str) -> Dict[str, List[Entity]]:
+    """
+    Find dates, monetary amounts, percentages, durations and defined terms in
+    a single scan of `text`. Returns entities grouped by type, in document
+    order; values that cannot be normalized (e.g. 02/30/2024) are skipped.
+    """
+    entities: Dict[str, List[Entity]] = defaultdict(list)
+    for match in ENTITY_PATTERN.finditer(text):
+        if match.group('iso_date') or match.group('numeric_date') or match.group('month_date') or match.group('day_date'):
+            entity_type, value = 'date', _date_value(match)
+        elif match.group('money'):
+            entity_type, value = 'money', _money_value(match)
+        elif match.group('percentage'):
+            entity_type, value = 'percentage', float(match.group('percent_value'))
+        elif match.group('duration'):
+            entity_type, value = 'duration', _duration_value(match)
+        elif match.group('definition'):
+            entity_type, value = 'defined_term', _definition_value(text, match)
+        elif match.group('alias'):
+            entity_type, value = 'defined_term', _alias_value(text, match)
+        else:
+            continue
+        if value is None:
+            continue
+        entities[entity_type].append(Entity(entity_type, match.group(), value, match.start(), match.end()))
+    return dict(entities)
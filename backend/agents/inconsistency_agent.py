@@ -1,5 +1,8 @@
 from typing import Dict, List, Any, Optional
 from .base_agent import BaseAgent
+from .conflict_index import ConflictIndex
+from .schemas import InconsistencyImpact, InconsistencyList, InconsistencyResolution
+import os
 
 class InconsistencyAgent(BaseAgent):
     def __init__(self):
@@ -11,13 +14,27 @@ class InconsistencyAgent(BaseAgent):
             'scope': 'Conflicting scope or coverage',
             'condition': 'Conflicting conditions or prerequisites'
         }
+        # Scope and condition conflicts need a full LLM read of the document
+        self.full_scan = os.getenv("INCONSISTENCY_FULL_SCAN", "false").lower() == "true"
 
     async def process(self, document_text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Identify and analyze inconsistencies in the document.
         """
-        # Identify potential inconsistencies
-        inconsistencies = await self._identify_inconsistencies(document_text)
+        # Find candidate conflicts deterministically; only these go to the LLM
+        document = self._get_document(document_text, context)
+        inconsistencies = [candidate.to_dict() for candidate in ConflictIndex.build(document).candidates()]
+        self.log_activity(f"Conflict index found {len(inconsistencies)} candidate inconsistencies")
+
+        # References to sections that do not exist need no LLM to find
+        dangling_references = [reference.to_dict() for reference in document.references.dangling]
+
+        if self.full_scan:
+            inconsistencies += await self._map_reduce(
+                document,
+                lambda chunk: self._identify_inconsistencies(chunk.text),
+                key=lambda inconsistency: '|'.join(str(value) for value in inconsistency.values())
+            )
         
         # Analyze the impact of each inconsistency
         impact_analysis = await self._analyze_impact(inconsistencies)
@@ -28,9 +45,25 @@ class InconsistencyAgent(BaseAgent):
         return {
             'inconsistencies': inconsistencies,
             'impact_analysis': impact_analysis,
-            'recommendations': recommendations
+            'recommendations': recommendations,
+            'dangling_references': dangling_references
         }
 
+    def digest(self, results: Dict[str, Any]) -> List[str]:
+        key = lambda inconsistency: (inconsistency.get('type'), inconsistency.get('elements'), inconsistency.get('location'))
+        severities = {key(analysis['inconsistency']): analysis.get('severity', '') for analysis in results.get('impact_analysis', [])}
+        items = [
+            f"{inconsistency.get('type', '').capitalize()} inconsistency"
+            + (f" ({severities[key(inconsistency)]})" if severities.get(key(inconsistency)) else '')
+            + f": {inconsistency.get('subject') or inconsistency.get('elements', '')} in {inconsistency.get('location') or 'the document'}"
+            for inconsistency in results.get('inconsistencies', [])
+        ]
+        items += [
+            f"Dangling reference: {reference['label']} in {reference['source']}"
+            for reference in results.get('dangling_references', [])
+        ]
+        return items
+
     async def _identify_inconsistencies(self, text: str) -> List[Dict[str, Any]]:
         prompt = f"""
         Analyze the following legal document for inconsistencies and conflicts.
@@ -49,32 +82,18 @@ class InconsistencyAgent(BaseAgent):
 
         Document text:
         {text}
-
-        Return the information in a structured format.
         """
-        
-        response = await self._call_llm(prompt)
-        inconsistencies = []
-        
-        # Parse the response and structure it
-        current_inconsistency = {}
-        for line in response.split('\n'):
-            if line.strip():
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    current_inconsistency[key.strip().lower()] = value.strip()
-                elif current_inconsistency:
-                    inconsistencies.append(current_inconsistency)
-                    current_inconsistency = {}
-        
-        if current_inconsistency:
-            inconsistencies.append(current_inconsistency)
-            
-        return inconsistencies
+
+        result = await self._call_llm_structured_or_none(prompt, InconsistencyList)
+        return [inconsistency.model_dump() for inconsistency in result.inconsistencies] if result else []
+
+    def _cross_reference_note(self, inconsistency: Dict[str, Any]) -> str:
+        if inconsistency.get('cross_referenced'):
+            return "Note: the conflicting sections refer to each other, so one may intentionally override the other."
+        return ""
 
     async def _analyze_impact(self, inconsistencies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        impact_analysis = []
-        
+        prompts = []
         for inconsistency in inconsistencies:
             prompt = f"""
             Analyze the impact of the following inconsistency in the legal document:
@@ -82,6 +101,7 @@ class InconsistencyAgent(BaseAgent):
             Inconsistency Type: {inconsistency.get('type', '')}
             Conflicting Elements: {inconsistency.get('elements', '')}
             Location: {inconsistency.get('location', '')}
+            {self._cross_reference_note(inconsistency)}
 
             Please provide:
             1. Severity of the impact (High/Medium/Low)
@@ -89,46 +109,18 @@ class InconsistencyAgent(BaseAgent):
             3. Effect on document enforceability
             4. Impact on parties' rights and obligations
             5. Risk of disputes or litigation
-
-            Return the information in a structured format.
             """
-            
-            response = await self._call_llm(prompt)
-            
-            # Parse the response and structure it
-            analysis = {
-                'inconsistency': inconsistency,
-                'severity': '',
-                'consequences': [],
-                'enforceability_impact': '',
-                'rights_impact': [],
-                'litigation_risk': ''
-            }
-            
-            for line in response.split('\n'):
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    key = key.strip().lower()
-                    value = value.strip()
-                    
-                    if 'severity' in key:
-                        analysis['severity'] = value
-                    elif 'consequence' in key:
-                        analysis['consequences'].append(value)
-                    elif 'enforceability' in key:
-                        analysis['enforceability_impact'] = value
-                    elif 'right' in key:
-                        analysis['rights_impact'].append(value)
-                    elif 'litigation' in key:
-                        analysis['litigation_risk'] = value
-            
-            impact_analysis.append(analysis)
-        
-        return impact_analysis
+            prompts.append(prompt)
+
+        results = await self._call_llm_structured_batched(prompts, InconsistencyImpact)
+
+        return [
+            {'inconsistency': inconsistency, **result.model_dump()}
+            for inconsistency, result in zip(inconsistencies, results) if result is not None
+        ]
 
     async def _generate_resolutions(self, inconsistencies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        recommendations = []
-        
+        prompts = []
         for inconsistency in inconsistencies:
             prompt = f"""
             Generate resolution recommendations for the following inconsistency:
@@ -136,6 +128,7 @@ class InconsistencyAgent(BaseAgent):
             Inconsistency Type: {inconsistency.get('type', '')}
             Conflicting Elements: {inconsistency.get('elements', '')}
             Location: {inconsistency.get('location', '')}
+            {self._cross_reference_note(inconsistency)}
 
             Please provide:
             1. Specific language changes needed
@@ -143,39 +136,12 @@ class InconsistencyAgent(BaseAgent):
             3. Required modifications to related provisions
             4. Implementation steps
             5. Additional considerations or precautions
-
-            Return the information in a structured format.
             """
-            
-            response = await self._call_llm(prompt)
-            
-            # Parse the response and structure it
-            recommendation = {
-                'inconsistency': inconsistency,
-                'language_changes': [],
-                'alternatives': [],
-                'modifications': [],
-                'steps': [],
-                'considerations': []
-            }
-            
-            for line in response.split('\n'):
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    key = key.strip().lower()
-                    value = value.strip()
-                    
-                    if 'language' in key:
-                        recommendation['language_changes'].append(value)
-                    elif 'alternative' in key:
-                        recommendation['alternatives'].append(value)
-                    elif 'modification' in key:
-                        recommendation['modifications'].append(value)
-                    elif 'step' in key:
-                        recommendation['steps'].append(value)
-                    elif 'consideration' in key:
-                        recommendation['considerations'].append(value)
-            
-            recommendations.append(recommendation)
-        
-        return recommendations 
\ No newline at end of file
+            prompts.append(prompt)
+
+        results = await self._call_llm_structured_batched(prompts, InconsistencyResolution)
+
+        return [
+            {'inconsistency': inconsistency, **result.model_dump()}
+            for inconsistency, result in zip(inconsistencies, results) if result is not None
+        ]
\ No newline at end of file
@@ -0,0 +1,329 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import orjson
+
+from .payload import dumps
+
+DEFAULT_JOB_STORE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "jobs.sqlite3"
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+logger = logging.getLogger("JobRunner")
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while `max_queued` jobs are waiting.
+    """
+
+
+class JobStore:
+    """
+    Persistent analysis jobs in a SQLite file.
+
+    Jobs survive restarts: a running job whose worker stops sending
+    heartbeats is claimed again by the next free worker, up to
+    `max_attempts` times. The file runs in WAL mode and claims happen in an
+    immediate transaction, so several uvicorn workers can share one store.
+    Finished jobs are purged `retention` seconds after they finish.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_queued: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        stale_after: Optional[float] = None,
+        retention: Optional[float] = None
+    ):
+        self.path = Path(path or os.getenv("JOB_STORE_PATH", str(DEFAULT_JOB_STORE_PATH)))
+        self.max_queued = max_queued or int(os.getenv("JOB_MAX_QUEUED", "100"))
+        self.max_attempts = max_attempts or int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.stale_after = stale_after or float(os.getenv("JOB_STALE_SECONDS", "120"))
+        self.retention = retention if retention is not None else float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, filename TEXT, document_text TEXT NOT NULL, "
+            "context TEXT, result BLOB, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, heartbeat_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)")
+
+    async def create(self, document_text: str, context: Optional[Dict[str, Any]] = None, filename: Optional[str] = None) -> str:
+        """
+        Queue a job and return its ID. Raises QueueFullError when the queue
+        is at `max_queued`.
+        """
+        return await asyncio.to_thread(self._create, document_text, context, filename)
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Mark the oldest queued (or abandoned) job as running on this worker
+        and return it, or None if there is nothing to run.
+        """
+        return await asyncio.to_thread(self._claim, time.time())
+
+    async def complete(self, job_id: str, results: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._finish, job_id, 'succeeded', dumps(results), None)
+
+    async def fail(self, job_id: str, error: str, results: Optional[Dict[str, Any]] = None) -> None:
+        await asyncio.to_thread(self._finish, job_id, 'failed', dumps(results) if results else None, error)
+
+    async def release(self, job_ids: List[str]) -> None:
+        """
+        Put jobs this worker is abandoning (e.g. on shutdown) back in the queue.
+        """
+        await asyncio.to_thread(self._release, job_ids)
+
+    async def heartbeat(self, job_ids: List[str]) -> None:
+        await asyncio.to_thread(self._heartbeat, job_ids, time.time())
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The job's status and timings, with its results once it has succeeded
+        (or whatever partial results it failed with).
+        """
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def purge(self) -> int:
+        """
+        Delete jobs that finished more than `retention` seconds ago, with
+        their results. Returns how many were deleted.
+        """
+        return await asyncio.to_thread(self._purge, time.time())
+
+    async def counts(self) -> Dict[str, int]:
+        """
+        Number of jobs in each status; `queued` is the queue depth.
+        """
+        return await asyncio.to_thread(self._counts)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def _create(self, document_text: str, context: Optional[Dict[str, Any]], filename: Optional[str]) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            queued = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                raise QueueFullError(f"{queued} jobs are already queued")
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, filename, document_text, context, created_at) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, filename, document_text, json.dumps(context) if context else None, time.time())
+            )
+        return job_id
+
+    def _claim(self, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # A job whose worker keeps dying on it is given up on; other
+                # abandoned jobs (stale heartbeat) are claimed again below
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'Worker stopped too many times', finished_at = ? "
+                    "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                    (now, now - self.stale_after, self.max_attempts)
+                )
+                row = self._conn.execute(
+                    "SELECT id, filename, document_text, context, attempts FROM jobs "
+                    "WHERE status = 'queued' OR (status = 'running' AND heartbeat_at < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now - self.stale_after,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                        "started_at = ?, heartbeat_at = ? WHERE id = ?",
+                        (self.worker_id, now, now, row['id'])
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = dict(row)
+        job['context'] = json.loads(job['context']) if job['context'] else None
+        return job
+
+    def _finish(self, job_id: str, status: str, result: Optional[bytes], error: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id)
+            )
+
+    def _release(self, job_ids: List[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1 WHERE id = ? AND status = 'running' AND worker = ?",
+                [(job_id, self.worker_id) for job_id in job_ids]
+            )
+
+    def _heartbeat(self, job_ids: List[str], now: float) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker = ?",
+                [(now, job_id, self.worker_id) for job_id in job_ids]
+            )
+
+    def _purge(self, now: float) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+                (now - self.retention,)
+            ).rowcount
+
+    def _get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, filename, result, error, attempts, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = dict(row)
+            if job['status'] == 'queued':
+                job['queue_position'] = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at <= (SELECT created_at FROM jobs WHERE id = ?)",
+                    (job_id,)
+                ).fetchone()[0]
+        result = job.pop('result')
+        job['results'] = orjson.loads(result) if result is not None else None
+        return job
+
+
+JobProcessor = Callable[[str, Optional[Dict[str, Any]]], Awaitable[Dict[str, Any]]]
+
+
+class JobRunner:
+    """
+    A fixed pool of `workers` tasks that take jobs from the store and run
+    them through `process` (the supervisor's pipeline).
+
+    Idle workers wake up when a job is submitted in this process and poll
+    every `poll_interval` seconds for jobs submitted by other processes.
+    A worker that hits an error outside a job's pipeline (e.g. the store is
+    locked) logs it and carries on after `poll_interval`.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        process: JobProcessor,
+        workers: Optional[int] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.store = store
+        self.process = process
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "2"))
+        self.poll_interval = poll_interval or float(os.getenv("JOB_POLL_INTERVAL", "2"))
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._maintain()))
+
+    async def submit(self, document_text: str, context: Optional[Dict[str, Any]] = None, filename: Optional[str] = None) -> str:
+        job_id = await self.store.create(document_text, context, filename)
+        self._wakeup.set()
+        return job_id
+
+    async def stop(self) -> None:
+        """
+        Cancel the workers and hand their unfinished jobs back to the queue.
+        """
+        running = list(self._running)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if running:
+            await self.store.release(running)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {'workers': self.workers, 'running_here': len(self._running), **await self.store.counts()}
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                await self._run_next()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # A job left running is reclaimed once its heartbeat goes stale
+                logger.exception("Job worker error")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run_next(self) -> None:
+        """
+        Claim one job and run it, or wait for one to be submitted.
+        """
+        # Cleared before claiming so a submission in between is not missed
+        self._wakeup.clear()
+        job = await self.store.claim()
+        if job is None:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            return
+
+        self._running[job['id']] = asyncio.current_task()
+        try:
+            results = await self.process(job['document_text'], job['context'])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Job %s failed", job['id'])
+            # Pipeline errors carry the stages completed before the failure
+            await self.store.fail(job['id'], str(e), getattr(e, 'results', None))
+        else:
+            await self.store.complete(job['id'], results)
+        finally:
+            self._running.pop(job['id'], None)
+
+    async def _maintain(self) -> None:
+        """
+        Keep this process's running jobs' heartbeats fresh and purge old
+        finished jobs.
+        """
+        while True:
+            await asyncio.sleep(self.store.stale_after / 4)
+            try:
+                if self._running:
+                    await self.store.heartbeat(list(self._running))
+                await self.store.purge()
+            except Exception:
+                logger.exception("Job heartbeat or purge failed")
\ No newline at end of file
@@ -0,0 +1,273 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .template_index import EMBEDDING_DIM, TemplateIndex, embed_texts, template_embedding_text
+
+PACK_VERSION = 1
+DATA_DIR = Path(os.getenv("LEGAL_AI_DATA_DIR", Path(__file__).resolve().parent.parent / "data"))
+PACK_DIR = Path(os.getenv("KNOWLEDGE_PACK_DIR", Path(__file__).resolve().parent.parent / ".cache" / "knowledge_pack"))
+SOURCE_DIRS = ("clause_templates", "compliance_rules")
+
+
+def normalize_jurisdiction(name: str) -> str:
+    """
+    Canonical form of a jurisdiction or rule-set name ("E.U. GDPR" -> "e u gdpr").
+    """
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(name).lower()).split())
+
+
+def source_fingerprint(data_dir: Path) -> str:
+    """
+    Hash of the names, sizes and modification times of every source file.
+    """
+    digest = hashlib.sha256(f"v{PACK_VERSION}:{EMBEDDING_DIM}".encode())
+    for source in SOURCE_DIRS:
+        for path in sorted((data_dir / source).glob("*.json")):
+            stat = path.stat()
+            digest.update(f"{source}/{path.name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def _load_json_dir(directory: Path, kind: str) -> Dict[str, Dict[str, Any]]:
+    items = {}
+    for path in sorted(directory.glob("*.json")):
+        try:
+            with open(path, 'r') as f:
+                items[path.stem] = json.load(f)
+        except Exception as e:
+            print(f"Error loading {kind} {path}: {str(e)}")
+    return items
+
+
+class KnowledgePack:
+    """
+    Compiled clause templates and compliance rules.
+
+    Template embeddings are precomputed at build time and memory-mapped on
+    load, and compliance rules are keyed by normalized jurisdiction names.
+    """
+
+    def __init__(
+        self,
+        fingerprint: str,
+        templates: Dict[str, Dict[str, Any]],
+        rules: Dict[str, Dict[str, Any]],
+        rule_aliases: Dict[str, str],
+        template_embeddings: np.ndarray
+    ):
+        self.version = PACK_VERSION
+        self.fingerprint = fingerprint
+        self.templates = templates
+        self.rules = rules
+        self.rule_aliases = rule_aliases
+        self.template_embeddings = template_embeddings
+        self._template_index: Optional[TemplateIndex] = None
+
+    @property
+    def template_index(self) -> TemplateIndex:
+        if self._template_index is None:
+            self.build_template_index()
+        return self._template_index
+
+    def build_template_index(self) -> TemplateIndex:
+        """
+        Build the similarity index over the templates. The registry does this
+        while loading, off the event loop, so queries never pay for it.
+        """
+        self._template_index = TemplateIndex(self.templates, self.template_embeddings)
+        return self._template_index
+
+    def rules_for(self, jurisdiction: str) -> Dict[str, Any]:
+        """
+        Rules for a jurisdiction name as written in the document or by the LLM.
+        Falls back to any rule set whose alias appears in the name.
+        """
+        key = normalize_jurisdiction(jurisdiction)
+        if not key:
+            return {}
+        if key in self.rule_aliases:
+            return self.rules[self.rule_aliases[key]]
+        padded = f" {key} "
+        for alias, rule_key in self.rule_aliases.items():
+            if f" {alias} " in padded:
+                return self.rules[rule_key]
+        return {}
+
+
+def compile_pack(data_dir: Path = DATA_DIR) -> KnowledgePack:
+    """
+    Parse the JSON sources into an in-memory pack.
+    """
+    fingerprint = source_fingerprint(data_dir)
+    templates = _load_json_dir(data_dir / "clause_templates", "template")
+    rules = _load_json_dir(data_dir / "compliance_rules", "compliance rule")
+
+    rule_aliases: Dict[str, str] = {}
+    for key, rule in rules.items():
+        names: List[str] = [key]
+        if isinstance(rule, dict):
+            names += [rule.get('jurisdiction', ''), rule.get('name', '')] + list(rule.get('aliases', []))
+        for name in names:
+            alias = normalize_jurisdiction(name)
+            if alias:
+                rule_aliases.setdefault(alias, key)
+
+    embeddings = embed_texts([template_embedding_text(name, template) for name, template in templates.items()])
+    return KnowledgePack(fingerprint, templates, rules, rule_aliases, embeddings)
+
+
+def write_pack(pack: KnowledgePack, pack_dir: Path = PACK_DIR) -> Path:
+    """
+    Write `pack` to its own versioned directory, then atomically repoint
+    `pack_dir/CURRENT` at it so concurrent readers never see a partial pack.
+    """
+    pack_dir.mkdir(parents=True, exist_ok=True)
+    target = pack_dir / f"v{PACK_VERSION}-{pack.fingerprint[:16]}"
+    if not (target / "manifest.json").exists():
+        staging = pack_dir / f".{target.name}.{os.getpid()}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+        np.save(staging / "template_embeddings.npy", np.asarray(pack.template_embeddings, dtype=np.float32))
+        with open(staging / "manifest.json", 'w') as f:
+            json.dump({
+                'version': PACK_VERSION,
+                'fingerprint': pack.fingerprint,
+                'built_at': time.time(),
+                'templates': pack.templates,
+                'rules': pack.rules,
+                'rule_aliases': pack.rule_aliases
+            }, f)
+        try:
+            os.replace(staging, target)
+        except OSError:
+            # Another worker published the same pack first
+            shutil.rmtree(staging, ignore_errors=True)
+
+    pointer = pack_dir / f".CURRENT.{os.getpid()}.tmp"
+    pointer.write_text(target.name)
+    os.replace(pointer, pack_dir / "CURRENT")
+    return target
+
+
+def read_pack(pack_dir: Path = PACK_DIR) -> Optional[KnowledgePack]:
+    """
+    Load the pack `pack_dir/CURRENT` points at, memory-mapping the embeddings.
+    Returns None if there is no usable pack.
+    """
+    try:
+        target = pack_dir / (pack_dir / "CURRENT").read_text().strip()
+        with open(target / "manifest.json", 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != PACK_VERSION:
+            return None
+        embeddings = np.load(target / "template_embeddings.npy", mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    return KnowledgePack(
+        manifest['fingerprint'],
+        manifest['templates'],
+        manifest['rules'],
+        manifest['rule_aliases'],
+        embeddings
+    )
+
+
+class KnowledgePackRegistry:
+    """
+    Holds the active pack and swaps in a rebuilt one when the sources change.
+
+    Change detection is a cheap stat of the source files at most every
+    `check_interval` seconds; rebuilding happens on a background thread while
+    the previous pack keeps serving, and the swap is a single assignment.
+    """
+
+    def __init__(self, data_dir: Path = DATA_DIR, pack_dir: Path = PACK_DIR, check_interval: Optional[float] = None):
+        self.data_dir = data_dir
+        self.pack_dir = pack_dir
+        self.check_interval = check_interval if check_interval is not None else float(
+            os.getenv("KNOWLEDGE_PACK_RELOAD_INTERVAL", "5")
+        )
+        self._pack: Optional[KnowledgePack] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._reloading = False
+
+    def current(self) -> KnowledgePack:
+        if self._pack is None:
+            with self._lock:
+                if self._pack is None:
+                    self._pack = self._load(source_fingerprint(self.data_dir))
+                    self._last_check = time.monotonic()
+        elif time.monotonic() - self._last_check >= self.check_interval:
+            self._last_check = time.monotonic()
+            self._maybe_reload()
+        return self._pack
+
+    async def preload(self) -> None:
+        """
+        Load the pack, compiling it if needed, on a worker thread so a cold
+        start does not block the event loop.
+        """
+        await asyncio.to_thread(self.current)
+
+    def _load(self, fingerprint: str) -> KnowledgePack:
+        pack = read_pack(self.pack_dir)
+        if pack is None or pack.fingerprint != fingerprint:
+            pack = compile_pack(self.data_dir)
+            try:
+                write_pack(pack, self.pack_dir)
+            except OSError as e:
+                print(f"Error writing knowledge pack to {self.pack_dir}: {str(e)}")
+        # The pack that gets swapped in must be ready to query
+        pack.build_template_index()
+        return pack
+
+    def _maybe_reload(self) -> None:
+        fingerprint = source_fingerprint(self.data_dir)
+        if fingerprint == self._pack.fingerprint:
+            return
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def reload() -> None:
+            try:
+                self._pack = self._load(fingerprint)
+            finally:
+                self._reloading = False
+
+        threading.Thread(target=reload, name="knowledge-pack-reload", daemon=True).start()
+
+
+_registry = KnowledgePackRegistry()
+
+
+def get_knowledge_pack() -> KnowledgePack:
+    """
+    The active knowledge pack for this process.
+    """
+    return _registry.current()
+
+
+async def preload_knowledge_pack() -> None:
+    """
+    Make the knowledge pack ready before the first request (called on startup).
+    """
+    await _registry.preload()
+
+
+if __name__ == "__main__":
+    compiled = compile_pack(DATA_DIR)
+    location = write_pack(compiled, PACK_DIR)
+    print(f"Built knowledge pack {location} ({len(compiled.templates)} templates, {len(compiled.rules)} rule sets)")
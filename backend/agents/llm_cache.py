@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "llm_cache.sqlite3"
+
+# Memory-tier hits are written to the disk tier's access times in batches of this size
+TOUCH_BATCH_SIZE = 256
+
+
+def make_cache_key(model: str, prompt: str, **params: Any) -> str:
+    """
+    Build a content-addressed key from the model, call parameters and prompt.
+    """
+    payload = json.dumps(
+        {
+            'model': model,
+            'params': params,
+            'prompt': hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        },
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier LLM response cache: an in-process LRU in front of a SQLite file.
+
+    The SQLite tier runs in WAL mode so several uvicorn workers can share the
+    same file. Entries expire after `ttl` seconds and the disk tier is trimmed
+    to `max_disk_entries`, dropping the least recently used rows first. Hits
+    served from memory count as uses too: they are recorded on disk in
+    batches, and always before a trim.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_memory_entries: Optional[int] = None,
+        max_disk_entries: Optional[int] = None,
+        ttl: Optional[float] = None
+    ):
+        self.path = Path(path or os.getenv("LLM_CACHE_PATH", str(DEFAULT_CACHE_PATH)))
+        self.max_memory_entries = max_memory_entries or int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+        self.max_disk_entries = max_disk_entries or int(os.getenv("LLM_CACHE_DISK_ENTRIES", "100000"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        # Memory-tier hits not yet recorded on disk, by key
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._writes_since_trim = 0
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Return the cached response for `key`, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] > self.ttl:
+                del self._memory[key]
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                self._touched[key] = now
+                flush = len(self._touched) >= TOUCH_BATCH_SIZE
+        if entry is not None:
+            if flush:
+                await asyncio.to_thread(self._flush_touched)
+            return entry[0]
+
+        row = await asyncio.to_thread(self._disk_get, key, now)
+        if row is None:
+            with self._lock:
+                self.stats['misses'] += 1
+            return None
+
+        value, created_at = row
+        with self._lock:
+            self.stats['disk_hits'] += 1
+            self._remember(key, value, created_at)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        """
+        Store `value` under `key` in both tiers.
+        """
+        now = time.time()
+        with self._lock:
+            self.stats['writes'] += 1
+            self._remember(key, value, now)
+        await asyncio.to_thread(self._disk_set, key, value, now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return hit/miss counters and the current memory tier size.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        self._flush_touched()
+        with self._disk_lock:
+            self._conn.close()
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        # Caller holds self._lock
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _flush_touched(self) -> None:
+        with self._disk_lock:
+            self._write_touched()
+
+    def _write_touched(self) -> None:
+        # Caller holds self._disk_lock
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            self._conn.executemany(
+                "UPDATE llm_cache SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in touched.items()]
+            )
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple]:
+        with self._disk_lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return row
+
+    def _disk_set(self, key: str, value: str, now: float) -> None:
+        with self._disk_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._writes_since_trim += 1
+            # Trimming scans the table, so only do it every few hundred writes
+            if self._writes_since_trim >= 256:
+                self._writes_since_trim = 0
+                self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        # Caller holds self._disk_lock
+        self._write_touched()
+        expired = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)).rowcount
+        overflow = self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        ).rowcount
+        with self._lock:
+            self.stats['evictions'] += max(expired, 0) + max(overflow, 0)
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Return the process-wide response cache, or None when LLM_CACHE_ENABLED is off.
+    """
+    global _cache
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache()
+    return _cache
@@ -1,17 +1,239 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional
+
+import groq
+import httpx
+from groq import AsyncGroq
+from .llm_cache import LLMResponseCache, get_llm_cache, make_cache_key
+from .concurrency import SingleFlight
+from .rate_limiter import RateLimiter, backoff_delay, get_rate_limiter
+
+DEFAULT_MODEL = "llama-3-8b-8192"
+
+# Errors worth retrying after a pause; anything else fails the call at once
+RETRYABLE_ERRORS = (groq.RateLimitError, groq.APIConnectionError, groq.InternalServerError)
+
+# Shared clients by event loop, then by model: a client's connection pool
+# can only be used from the loop it was created on
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, LLMClient]]" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
 class LLMClient:
-    def __init__(self, api_key: str):
-        self.client = Groq(api_key=api_key)
+    """
+    Non-blocking Groq client backed by a pooled keep-alive HTTP connection pool.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        cache: Optional[LLMResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None
+    ):
+        self.model = model or os.getenv("LLM_MODEL", DEFAULT_MODEL)
+        self.timeout = timeout if timeout is not None else float(os.getenv("LLM_TIMEOUT", "60"))
+        max_connections = max_connections or int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+        max_keepalive_connections = max_keepalive_connections or int(
+            os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", str(max_connections))
+        )
+
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=30.0
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=10.0)
+        )
+        self.client = AsyncGroq(
+            api_key=api_key or os.getenv("GROQ_API_KEY"),
+            http_client=self.http_client,
+            timeout=self.timeout,
+            # Retries are handled below so they go through the rate limiter
+            max_retries=0
+        )
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "6"))
+        self.completion_tokens_estimate = int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", "512"))
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self._inflight = SingleFlight()
+
+    async def call_llm(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        json_mode: bool = False
+    ) -> str:
+        """
+        Send a single-turn chat completion and return the response text.
+        With `json_mode` the provider constrains the output to a JSON object.
+
+        Each attempt is bounded by `timeout` seconds (defaults to the client
+        timeout); throttled and transient failures are retried with back-off.
+        Responses are served from and stored in the response cache when one
+        is configured, and identical concurrent prompts share one request.
+        Cancelling every task awaiting a request aborts the HTTP call.
+        """
+        # json_mode only joins the key when set, so existing cache entries stay valid
+        params = {'json_mode': True} if json_mode else {}
+        cache_key = make_cache_key(self.model, prompt, temperature=temperature, max_tokens=max_tokens, **params)
+        return await self._inflight.do(
+            cache_key,
+            lambda: self._complete(cache_key, prompt, temperature, max_tokens, timeout, json_mode)
+        )
+
+    async def _complete(
+        self,
+        cache_key: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        timeout: Optional[float],
+        json_mode: bool = False
+    ) -> str:
+        if self.cache is not None:
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        timeout = self.timeout if timeout is None else timeout
+        estimated_tokens = len(prompt) // 4 + (max_tokens or self.completion_tokens_estimate)
+        extra = {'response_format': {"type": "json_object"}} if json_mode else {}
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(estimated_tokens)
+            try:
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        **extra
+                    ),
+                    timeout=timeout
+                )
+                break
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"LLM call timed out after {timeout:.0f}s")
+            except groq.BadRequestError as e:
+                # JSON mode rejects output that does not parse; hand the raw
+                # generation back so the caller's repair step can deal with it
+                failed_generation = self._failed_generation(e) if json_mode else None
+                if failed_generation is None:
+                    raise
+                return failed_generation
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._retry_after(e) or backoff_delay(attempt)
+                if self.rate_limiter is not None and isinstance(e, groq.RateLimitError):
+                    # Pause every caller, not just this one, so the queue drains
+                    self.rate_limiter.throttle(delay)
+                else:
+                    await asyncio.sleep(delay)
+                attempt += 1
 
-    async def call_llm(self, prompt: str) -> str:
+        usage = getattr(response, 'usage', None)
+        if self.rate_limiter is not None and usage is not None and usage.total_tokens:
+            self.rate_limiter.reconcile(estimated_tokens, usage.total_tokens)
+
+        content = (response.choices[0].message.content or "").strip()
+
+        if self.cache is not None and content:
+            await self.cache.set(cache_key, content)
+        return content
+
+    @staticmethod
+    def _failed_generation(error: Exception) -> Optional[str]:
+        body = getattr(error, 'body', None)
+        if isinstance(body, dict):
+            body = body.get('error', body)
+            if isinstance(body, dict) and isinstance(body.get('failed_generation'), str):
+                return body['failed_generation']
+        return None
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """
+        Seconds requested by the provider's Retry-After header, if any.
+        """
+        response = getattr(error, 'response', None)
+        if response is None:
+            return None
         try:
-            response = self.client.chat.completions.create(
-                model="llama-3-8b-8192",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1000,
-                n=1,
-                stop=None,
-                temperature=0.7,
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            raise Exception(f"Error calling LLM: {str(e)}") 
\ No newline at end of file
+            return float(response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return counters for this client.
+        """
+        return {
+            'model': self.model,
+            'in_flight': len(self._inflight),
+            'coalesced_calls': self._inflight.coalesced,
+            'cache': self.cache.snapshot() if self.cache is not None else None,
+            'rate_limiter': self.rate_limiter.snapshot() if self.rate_limiter is not None else None
+        }
+
+    async def aclose(self) -> None:
+        """
+        Close the underlying connection pool.
+        """
+        await self.http_client.aclose()
+
+
+def get_llm_client(model: Optional[str] = None) -> LLMClient:
+    """
+    Return the running event loop's shared client for `model`, creating it
+    on first use. Clients on every loop share the cache and rate limiter.
+    """
+    model = model or os.getenv("LLM_MODEL", DEFAULT_MODEL)
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop, {}).get(model)
+    if client is None:
+        with _clients_lock:
+            # A client's connections keep its loop alive, so forget the
+            # clients of loops that have closed
+            for closed in [other for other in _clients if other.is_closed()]:
+                del _clients[closed]
+            clients = _clients.setdefault(loop, {})
+            client = clients.get(model)
+            if client is None:
+                client = LLMClient(model=model, cache=get_llm_cache(), rate_limiter=get_rate_limiter())
+                clients[model] = client
+    return client
+
+
+def llm_stats() -> Dict[str, Any]:
+    """
+    Return the counters of every shared client, keyed by model.
+    """
+    return {
+        model: client.stats()
+        for clients in list(_clients.values())
+        for model, client in list(clients.items())
+    }
+
+
+async def close_llm_clients() -> None:
+    """
+    Close the running event loop's shared clients and drop them from the
+    registry.
+    """
+    with _clients_lock:
+        clients = list(_clients.pop(asyncio.get_running_loop(), {}).values())
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,158 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+PAYLOAD_VERSION = 1
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# Fields a risk finding copies from its clause; dropped once the clause is in the table
+CLAUSE_FIELDS = ('clause_text', 'section', 'start', 'end')
+
+
+def dumps(data: Any) -> bytes:
+    """
+    Serialize results with orjson. Numpy values are written natively and
+    anything else unknown as its string form.
+    """
+    return orjson.dumps(data, option=ORJSON_OPTIONS, default=str)
+
+
+def _canonical(data: Any) -> bytes:
+    return orjson.dumps(data, option=ORJSON_OPTIONS | orjson.OPT_SORT_KEYS, default=str)
+
+
+class PayloadBuilder:
+    """
+    Moves objects that the stage results repeat (clauses, templates,
+    findings and suggested alternatives) into ID-keyed tables and replaces
+    each occurrence with its ID.
+
+    Objects are matched by content, so the same finding reached through
+    several stages gets one ID.
+    """
+
+    def __init__(self):
+        self.tables: Dict[str, Dict[str, Any]] = {
+            'clauses': {},
+            'templates': {},
+            'findings': {},
+            'alternatives': {}
+        }
+        self._ids: Dict[tuple, str] = {}
+        self._counts: Dict[str, int] = defaultdict(int)
+
+    def _register(
+        self,
+        table: str,
+        data: Dict[str, Any],
+        name: str,
+        stored: Optional[Dict[str, Any]] = None,
+        numbered: bool = False
+    ) -> str:
+        """
+        The ID of `data` in `table`, adding it (or `stored` in its place) on
+        first sight. Numbered IDs are `name-1`, `name-2`, ...; otherwise `name`
+        is used as is, suffixed only if already taken.
+        """
+        key = (table, _canonical(data))
+        existing = self._ids.get(key)
+        if existing is not None:
+            return existing
+        if numbered:
+            self._counts[name] += 1
+            item_id = f"{name}-{self._counts[name]}"
+        else:
+            item_id = name
+            suffix = 2
+            while item_id in self.tables[table]:
+                item_id = f"{name}-{suffix}"
+                suffix += 1
+        self.tables[table][item_id] = data if stored is None else stored
+        self._ids[key] = item_id
+        return item_id
+
+    def clause(self, clause: Dict[str, Any]) -> str:
+        return self._register('clauses', clause, str(clause.get('id') or 'clause'))
+
+    def template(self, template: Dict[str, Any]) -> str:
+        name = re.sub(r'\W+', '_', str(template.get('name') or 'template').lower()).strip('_')
+        return self._register('templates', template, name or 'template')
+
+    def finding(self, finding: Dict[str, Any], prefix: str) -> str:
+        stored = dict(finding)
+        if stored.get('clause_id') in self.tables['clauses']:
+            for field in CLAUSE_FIELDS:
+                stored.pop(field, None)
+        return self._register('findings', finding, prefix, stored, numbered=True)
+
+    def alternative(self, alternative: Dict[str, Any]) -> str:
+        stored = dict(alternative)
+        original = stored.pop('original_clause', None)
+        if isinstance(original, dict):
+            stored['finding_id'] = self.finding(original, 'risk')
+        return self._register('alternatives', alternative, 'alt', stored, numbered=True)
+
+    def _replace(self, items: List[Dict[str, Any]], field: str, reference: str, register) -> List[Dict[str, Any]]:
+        replaced = []
+        for item in items:
+            item = dict(item)
+            value = item.pop(field, None)
+            if isinstance(value, dict):
+                item[reference] = register(value)
+            replaced.append(item)
+        return replaced
+
+    def normalize(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        normalized = dict(results)
+
+        clause = results.get('clause')
+        if isinstance(clause, dict):
+            clause = dict(clause)
+            clause['clauses'] = [self.clause(item) for item in clause.get('clauses', [])]
+            for key in ('comparisons', 'recommendations'):
+                items = self._replace(clause.get(key, []), 'clause', 'clause_id', self.clause)
+                clause[key] = self._replace(items, 'template', 'template_id', self.template)
+            normalized['clause'] = clause
+
+        risk = results.get('risk')
+        if isinstance(risk, dict):
+            risk = dict(risk)
+            risk['risky_clauses'] = [self.finding(item, 'risk') for item in risk.get('risky_clauses', [])]
+            for key in ('risk_analysis', 'recommendations'):
+                risk[key] = self._replace(risk.get(key, []), 'clause', 'finding_id', lambda item: self.finding(item, 'risk'))
+            normalized['risk'] = risk
+
+        suggestions = results.get('suggestions')
+        if isinstance(suggestions, dict) and 'alternatives' in suggestions:
+            suggestions = dict(suggestions)
+            suggestions['alternatives'] = [self.alternative(item) for item in suggestions.get('alternatives', [])]
+            for key in ('explanations', 'guidance'):
+                suggestions[key] = self._replace(suggestions.get(key, []), 'alternative', 'alternative_id', self.alternative)
+            normalized['suggestions'] = suggestions
+
+        inconsistencies = results.get('inconsistencies')
+        if isinstance(inconsistencies, dict):
+            inconsistencies = dict(inconsistencies)
+            register = lambda item: self.finding(item, 'inc')
+            inconsistencies['inconsistencies'] = [register(item) for item in inconsistencies.get('inconsistencies', [])]
+            for key in ('impact_analysis', 'recommendations'):
+                inconsistencies[key] = self._replace(inconsistencies.get(key, []), 'inconsistency', 'finding_id', register)
+            normalized['inconsistencies'] = inconsistencies
+
+        return normalized
+
+
+def normalize_results(results: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The pipeline results as a normalized payload: `results` keeps one entry
+    per stage with repeated objects replaced by IDs into `tables`.
+    """
+    builder = PayloadBuilder()
+    normalized = builder.normalize(results)
+    return {
+        'version': PAYLOAD_VERSION,
+        'results': normalized,
+        'tables': builder.tables
+    }
\ No newline at end of file
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `rate` units per second.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """
+        Seconds until `amount` units are available (0 if they are now).
+        """
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float) -> None:
+        # May go negative when usage is reconciled after the fact; the debt
+        # is paid back by the refill before the next caller is admitted
+        self.level -= amount
+
+
+class RateLimiter:
+    """
+    Process-wide limiter that budgets both requests and tokens per minute.
+
+    Callers queue in arrival order until both buckets can cover them. When
+    the provider throttles anyway, `throttle` pauses every caller for the
+    back-off period so the whole process slows down together.
+
+    The limiter may be shared by several event loops (e.g. a test client's
+    and the server's): each loop queues on its own asyncio lock, and the
+    buckets themselves sit behind a thread lock.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        requests_per_minute = requests_per_minute or int(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+        tokens_per_minute = tokens_per_minute or int(os.getenv("LLM_TOKENS_PER_MINUTE", "30000"))
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self._blocked_until = 0.0
+        self._state_lock = threading.Lock()
+        self._locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+        self.stats = {
+            'requests': 0,
+            'queued_requests': 0,
+            'wait_seconds_total': 0.0,
+            'max_wait_seconds': 0.0,
+            'throttled_responses': 0,
+            'backoff_seconds_total': 0.0
+        }
+
+    async def acquire(self, tokens: int) -> float:
+        """
+        Wait until one request and `tokens` tokens fit in the budget.
+        Returns the number of seconds spent waiting.
+        """
+        started = time.monotonic()
+        async with self._loop_lock():
+            while True:
+                with self._state_lock:
+                    now = time.monotonic()
+                    delay = max(
+                        self._blocked_until - now,
+                        self.requests.delay(1, now),
+                        self.tokens.delay(tokens, now)
+                    )
+                    if delay <= 0:
+                        self.requests.consume(1)
+                        self.tokens.consume(min(tokens, self.tokens.capacity))
+                        break
+                await asyncio.sleep(delay)
+
+        waited = time.monotonic() - started
+        self.stats['requests'] += 1
+        if waited > 0.001:
+            self.stats['queued_requests'] += 1
+            self.stats['wait_seconds_total'] += waited
+            self.stats['max_wait_seconds'] = max(self.stats['max_wait_seconds'], waited)
+        return waited
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """
+        Charge (or refund) the difference between estimated and reported usage.
+        """
+        with self._state_lock:
+            self.tokens.consume(actual_tokens - min(estimated_tokens, self.tokens.capacity))
+
+    def throttle(self, seconds: float) -> None:
+        """
+        Hold back every caller for `seconds` after the provider returned 429.
+        """
+        self.stats['throttled_responses'] += 1
+        self.stats['backoff_seconds_total'] += seconds
+        with self._state_lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def _loop_lock(self) -> asyncio.Lock:
+        """
+        The lock callers on the running event loop queue on.
+        """
+        loop = asyncio.get_running_loop()
+        with self._state_lock:
+            lock = self._locks.get(loop)
+            if lock is None:
+                # A lock used by a loop keeps that loop alive, so drop the
+                # locks of loops that have closed
+                for closed in [other for other in self._locks if other.is_closed()]:
+                    del self._locks[closed]
+                lock = self._locks[loop] = asyncio.Lock()
+        return lock
+
+    def snapshot(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['wait_seconds_total'] = round(stats['wait_seconds_total'], 3)
+        stats['max_wait_seconds'] = round(stats['max_wait_seconds'], 3)
+        stats['backoff_seconds_total'] = round(stats['backoff_seconds_total'], 3)
+        return stats
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """
+    Exponential back-off with full jitter for the given retry attempt (0-based).
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Return the process-wide rate limiter, creating it on first use.
+    """
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
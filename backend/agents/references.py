@@ -0,0 +1,185 @@
+import re
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from .segmentation import Clause
+
+_NUMBER = r'(?:\d{1,3}(?:\.\d{1,3})*(?:\s?\([a-zA-Z0-9]{1,4}\))*|[IVXLC]{1,7}\b|[A-Z]{1,2}\b)'
+REFERENCE_PATTERN = re.compile(
+    r'\b(?P<kind>(?i:sections?|clauses?|articles?|paragraphs?|schedules?|exhibits?|annex(?:es)?|appendix|appendices))\s+'
+    r'(?P<numbers>' + _NUMBER + r'(?:\s*(?:,|(?i:and|or|through|to)|-|–)\s*' + _NUMBER + r')*)'
+)
+# Numbers are case-sensitive so "Section 5 or a party" does not read "a" as a schedule letter
+REFERENCE_NUMBER = re.compile(_NUMBER)
+# "Section 230 of the Communications Decency Act", "Article 28 of the GDPR" and
+# "Article 6 of Regulation (EU) 2016/679" are not references into this document
+EXTERNAL_REFERENCE = re.compile(
+    r'\s+of\s+(?:the\s+)?(?!this\b)(?:(?:[A-Z][\w.]*\s*){1,8}?'
+    r'(?:Act|Code|Regulation|Directive|Rules?|Law|Statute|Ordinance|Treaty|Convention|Constitution)\b'
+    r'|[A-Z]{2,}\b|(?:Regulation|Directive)\s+\()'
+)
+# Nor is "Article 32 GDPR"; only checked in mixed-case text, where capitals
+# after the number are an acronym rather than more shouted words
+EXTERNAL_ACRONYM = re.compile(r'\s+[A-Z]{2,}\b')
+# Separators of a range such as "Sections 4.1 through 4.3" or "Schedules A-C"
+RANGE_SEPARATOR = re.compile(r'\s*(?:(?i:through|to)|-|–)\s*')
+# Longest range expanded; beyond this only its ends are taken
+MAX_RANGE = 50
+
+# Reference words and the clause-ID prefixes they can point at, in order of preference
+REFERENCE_KINDS = {
+    'section': ('sec', 'art'),
+    'clause': ('sec', 'art'),
+    'paragraph': ('sec', 'art'),
+    'article': ('art', 'sec'),
+    'schedule': ('schedule', 'annex', 'exhibit', 'appendix'),
+    'exhibit': ('exhibit', 'schedule', 'annex', 'appendix'),
+    'annex': ('annex', 'schedule', 'exhibit', 'appendix'),
+    'appendix': ('appendix', 'annex', 'schedule', 'exhibit'),
+}
+
+
+@dataclass(frozen=True)
+class CrossReference:
+    """
+    A reference from one clause to a section. `target` is the ID of the
+    clause it resolves to, or None for a dangling reference; `start`/`end`
+    are offsets of `text` in the document.
+    """
+    source: str
+    target: Optional[str]
+    label: str
+    text: str
+    start: int
+    end: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _range_between(first: str, last: str) -> List[str]:
+    """
+    Numbers strictly between the ends of a range: "4.1" and "4.3" give
+    ["4.2"], "A" and "C" give ["B"]. Empty when the ends do not form a range.
+    """
+    if re.fullmatch(r'[A-Z]', first) and re.fullmatch(r'[A-Z]', last):
+        return [chr(code) for code in range(ord(first) + 1, ord(last))]
+    first_match = re.fullmatch(r'((?:\d+\.)*)(\d+)', first)
+    last_match = re.fullmatch(r'((?:\d+\.)*)(\d+)', last)
+    if not first_match or not last_match or first_match.group(1) != last_match.group(1):
+        return []
+    start, end = int(first_match.group(2)), int(last_match.group(2))
+    if end - start > MAX_RANGE:
+        return []
+    return [f"{first_match.group(1)}{number}" for number in range(start + 1, end)]
+
+
+def _reference_numbers(numbers: str) -> List[str]:
+    """
+    The numbers in a reference's list, with ranges expanded.
+    """
+    result: List[str] = []
+    previous = None
+    for number in REFERENCE_NUMBER.finditer(numbers):
+        if previous is not None and RANGE_SEPARATOR.fullmatch(numbers, previous.end(), number.start()):
+            result += _range_between(previous.group(), number.group())
+        result.append(number.group())
+        previous = number
+    return result
+
+
+def _reference_kind(word: str) -> str:
+    word = word.lower()
+    if word.startswith('append'):
+        return 'appendix'
+    if word.startswith('annex'):
+        return 'annex'
+    return word.rstrip('s')
+
+
+class CrossReferenceGraph:
+    """
+    Section cross-references of a document, keyed by clause ID.
+
+    Built in one pass over the clauses. Lookups by clause ID or by label
+    ("Section 7.2", "Schedule B") are dictionary reads.
+    """
+
+    def __init__(self, text: str, clauses: List[Clause]):
+        self.clauses = {clause.id: clause for clause in clauses}
+        self.labels: Dict[Tuple[str, str], str] = {}
+        for clause in clauses:
+            if clause.number:
+                prefix = clause.id.split('-', 1)[0]
+                self.labels.setdefault((prefix, clause.number.lower()), clause.id)
+
+        self.outgoing: Dict[str, List[CrossReference]] = defaultdict(list)
+        self.incoming: Dict[str, List[CrossReference]] = defaultdict(list)
+        self.dangling: List[CrossReference] = []
+        for clause in clauses:
+            for reference in self._parse(text, clause):
+                self.outgoing[clause.id].append(reference)
+                if reference.target is None:
+                    self.dangling.append(reference)
+                else:
+                    self.incoming[reference.target].append(reference)
+
+    def _parse(self, text: str, clause: Clause) -> List[CrossReference]:
+        references = []
+        for match in REFERENCE_PATTERN.finditer(text, clause.start, clause.end):
+            if match.start() == clause.start and clause.number:
+                # The clause's own heading ("Section 7. Payment")
+                continue
+            if EXTERNAL_REFERENCE.match(text, match.end()):
+                continue
+            if not match.group('kind').isupper() and EXTERNAL_ACRONYM.match(text, match.end()):
+                continue
+            kind = _reference_kind(match.group('kind'))
+            for number in _reference_numbers(match.group('numbers')):
+                label = f"{kind.title()} {number}"
+                references.append(CrossReference(
+                    source=clause.id,
+                    target=self.resolve(label),
+                    label=label,
+                    text=match.group(),
+                    start=match.start(),
+                    end=match.end()
+                ))
+        return references
+
+    def resolve(self, label: str) -> Optional[str]:
+        """
+        The clause ID a label such as "Section 7.2(a)" or "Schedule B" points
+        at. A sub-paragraph resolves to its nearest numbered ancestor.
+        """
+        parts = label.split(None, 1)
+        if len(parts) != 2:
+            return None
+        prefixes = REFERENCE_KINDS.get(_reference_kind(parts[0]))
+        if prefixes is None:
+            return None
+        number = re.sub(r'\s?\(.*$', '', parts[1].strip()).lower()
+        while number:
+            for prefix in prefixes:
+                clause_id = self.labels.get((prefix, number))
+                if clause_id is not None:
+                    return clause_id
+            number = number.rsplit('.', 1)[0] if '.' in number else ''
+        return None
+
+    def targets(self, clause_id: str) -> List[Clause]:
+        """
+        Clauses that `clause_id` refers to, in reference order.
+        """
+        ids = dict.fromkeys(reference.target for reference in self.outgoing.get(clause_id, ()) if reference.target)
+        return [self.clauses[target] for target in ids if target != clause_id]
+
+    def referrers(self, clause_id: str) -> List[Clause]:
+        """
+        Clauses that refer to `clause_id`.
+        """
+        ids = dict.fromkeys(reference.source for reference in self.incoming.get(clause_id, ()))
+        return [self.clauses[source] for source in ids if source != clause_id]
+
+    def refers_to(self, source: str, target: str) -> bool:
+        return any(reference.target == target for reference in self.outgoing.get(source, ()))
@@ -0,0 +1,76 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+from .document import DocumentChunk, estimate_tokens
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or such that the their this "
+    "to was were will with shall any all under".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Offline BM25 index over document chunks, built once per analysis.
+
+    Queries only touch the postings of their own terms, so lookups stay cheap
+    however many agents query the same document.
+    """
+
+    def __init__(self, chunks: List[DocumentChunk], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths: List[int] = []
+
+        for index, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk.text))
+            self.lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings[term].append((index, frequency))
+
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[DocumentChunk, float]]:
+        """
+        Return up to `k` chunks matching `query`, best first.
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        total = len(self.chunks)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for index, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / (self.average_length or 1))
+                scores[index] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.chunks[index], score) for index, score in ranked]
+
+    def relevant_text(self, query: str, max_tokens: int) -> str:
+        """
+        The best matching chunks that fit in `max_tokens`, joined in document
+        order so the excerpt still reads top to bottom. Falls back to the start
+        of the document when nothing matches.
+        """
+        candidates = [chunk for chunk, _ in self.search(query, k=len(self.chunks))] or self.chunks
+        selected = []
+        used = 0
+        for chunk in candidates:
+            cost = estimate_tokens(chunk.text)
+            if selected and used + cost > max_tokens:
+                continue
+            selected.append(chunk)
+            used += cost
+
+        selected.sort(key=lambda chunk: chunk.start)
+        return "\n[...]\n".join(chunk.text for chunk in selected)
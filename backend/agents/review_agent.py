@@ -1,40 +1,218 @@
-from typing import Dict, List, Any, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from .base_agent import BaseAgent
-import re
-from datetime import datetime
+from .document import DocumentChunk, LegalDocument
+from .entities import Entity
+from .schemas import KeyTermList, ObligationList, PartyList
+from .structured_output import answer_shape, extract_json, parse_stats
+from pydantic import ValidationError
+import json
+import os
+
+# Defined terms in the preamble that name the document or a date, not a party
+NON_PARTY_TERMS = {'agreement', 'contract', 'effective date', 'commencement date', 'services', 'term'}
+
+# Sections of the fused extraction: the schema a section's list must match
+# and the key results are de-duplicated on
+REVIEW_SECTIONS: Dict[str, Dict[str, Any]] = {
+    'parties': {
+        'schema': PartyList,
+        'key': lambda party: party['name']
+    },
+    'obligations': {
+        'schema': ObligationList,
+        'key': lambda obligation: f"{obligation['party']}|{obligation['obligation']}"
+    },
+    'key_terms': {
+        'schema': KeyTermList,
+        'key': lambda term: term['term']
+    },
+}
 
 class ReviewAgent(BaseAgent):
     def __init__(self):
         super().__init__()
-        self.date_patterns = [
-            r'\d{1,2}/\d{1,2}/\d{2,4}',
-            r'\d{1,2}-\d{1,2}-\d{2,4}',
-            r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{1,2},? \d{4}'
-        ]
+        self.fused_extraction = os.getenv("REVIEW_FUSED_EXTRACTION", "true").lower() == "true"
+        self.section_extractors: Dict[str, Callable[[str], Awaitable[List[Dict[str, Any]]]]] = {
+            'parties': self._extract_parties,
+            'obligations': self._extract_obligations,
+            'key_terms': self._extract_key_terms
+        }
 
     async def process(self, document_text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Extract key legal terms, parties, dates, and obligations from the document.
         """
-        # Extract parties
-        parties = await self._extract_parties(document_text)
+        # Long documents are processed chunk by chunk and the results merged
+        document = self._get_document(document_text, context)
+
+        # Parties the document defines itself need no LLM call. Defined terms
+        # do not cover every key concept, so the LLM still adds to them
+        parties = self._extract_defined_parties(document)
+        key_terms = self._extract_defined_terms(document)
+        sections = ['obligations', 'key_terms']
+        if len(parties) < 2:
+            sections.insert(0, 'parties')
+
+        # Ask for every remaining section in one request per chunk
+        extracted = await self._extract_sections(document, sections)
+        seen = {party['name'].lower() for party in parties}
+        parties += [party for party in extracted.get('parties', []) if party['name'].lower() not in seen]
+        obligations = extracted['obligations']
+        seen = {term['term'].lower() for term in key_terms}
+        key_terms += [term for term in extracted['key_terms'] if term['term'].lower() not in seen]
         
         # Extract dates
-        dates = await self._extract_dates(document_text)
-        
-        # Extract obligations
-        obligations = await self._extract_obligations(document_text)
-        
-        # Extract key terms
-        key_terms = await self._extract_key_terms(document_text)
+        dates = self._extract_dates(document)
 
         return {
             'parties': parties,
             'dates': dates,
             'obligations': obligations,
-            'key_terms': key_terms
+            'key_terms': key_terms,
+            'amounts': [self._entity_dict(document, entity) for entity in document.entities.get('money', [])],
+            'durations': [self._entity_dict(document, entity) for entity in document.entities.get('duration', [])],
+            'percentages': [self._entity_dict(document, entity) for entity in document.entities.get('percentage', [])]
+        }
+
+    def digest(self, results: Dict[str, Any]) -> List[str]:
+        items = [
+            f"Party: {party['name']}" + (f" ({party['details']})" if party.get('details') else '')
+            for party in results.get('parties', [])
+        ]
+        items += [f"Obligation of {obligation['party']}: {obligation['obligation']}" for obligation in results.get('obligations', [])]
+        items += [f"Defined term: {term['term']}" for term in results.get('key_terms', [])]
+        for key, label in (('dates', 'Dates'), ('amounts', 'Amounts'), ('durations', 'Durations')):
+            values = list(dict.fromkeys(entity['text'] for entity in results.get(key, [])))
+            if values:
+                items.append(f"{label}: {', '.join(values)}")
+        return items
+
+    def _entity_dict(self, document: LegalDocument, entity: Entity) -> Dict[str, Any]:
+        """
+        An extracted entity with the clause it is in and surrounding text.
+        """
+        clause = document.clause_at(entity.start)
+        data = entity.to_dict()
+        data.update({
+            'clause_id': clause.id if clause else None,
+            'context': document.text[max(0, entity.start - 50):min(len(document.text), entity.end + 50)]
+        })
+        return data
+
+    def _extract_defined_parties(self, document: LegalDocument) -> List[Dict[str, Any]]:
+        """
+        Parties introduced in the preamble as `Name, ... (the "Alias")`.
+        """
+        first_clause = document.clauses[0] if document.clauses else None
+        if first_clause is None:
+            return []
+
+        parties = []
+        seen = set()
+        for entity in document.entities.get('defined_term', []):
+            if entity.start >= first_clause.end:
+                break
+            name = entity.value.get('refers_to', '')
+            alias = entity.value['term']
+            if not name or alias.lower() in NON_PARTY_TERMS or name.lower().startswith(('this ', 'the ')):
+                continue
+            if name.lower() in seen:
+                continue
+            seen.add(name.lower())
+            parties.append({
+                'name': name,
+                'details': f'Referred to as "{alias}"',
+                'alias': alias,
+                'start': entity.start,
+                'end': entity.end
+            })
+        return parties
+
+    def _extract_defined_terms(self, document: LegalDocument) -> List[Dict[str, Any]]:
+        """
+        Terms the document defines itself, with their definitions.
+        """
+        key_terms = []
+        seen = set()
+        for entity in document.entities.get('defined_term', []):
+            term = entity.value['term']
+            if term.lower() in seen:
+                continue
+            seen.add(term.lower())
+            definition = entity.value.get('definition') or f"Refers to {entity.value.get('refers_to', '')}".strip()
+            clause = document.clause_at(entity.start)
+            key_terms.append({
+                'term': term,
+                'definition': definition,
+                'clause_id': clause.id if clause else None,
+                'start': entity.start,
+                'end': entity.end
+            })
+        return key_terms
+
+    async def _extract_sections(self, document: LegalDocument, sections: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Extract `sections` from every chunk and merge them across chunks.
+        """
+        if self.fused_extraction and len(sections) > 1:
+            func = lambda chunk: self._extract_fused(chunk, sections)
+        else:
+            async def func(chunk: DocumentChunk) -> Dict[str, List[Dict[str, Any]]]:
+                results = await self._map_concurrent(lambda section: self.section_extractors[section](chunk.text), sections)
+                return dict(zip(sections, results))
+
+        chunks = document.chunks(self.chunk_tokens)
+        if len(chunks) > 1:
+            self.log_activity(f"Document exceeds the {self.chunk_tokens}-token budget, processing {len(chunks)} chunks")
+        results = await self._map_concurrent(func, chunks)
+        return {
+            section: self._merge_unique([result[section] for result in results], REVIEW_SECTIONS[section]['key'])
+            for section in sections
         }
 
+    async def _extract_fused(self, chunk: DocumentChunk, sections: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        One JSON request for all `sections` of a chunk. Sections missing from
+        the response or failing validation are re-extracted on their own.
+        """
+        shape = {}
+        for section in sections:
+            shape.update(json.loads(answer_shape(REVIEW_SECTIONS[section]['schema'])))
+        prompt = f"""
+        Extract the following from the legal document below. Use an empty list when a section has no entries.
+
+        Document text:
+        {chunk.text}
+
+        Respond with only a JSON object of this shape:
+        {json.dumps(shape, ensure_ascii=False)}
+        """
+
+        response = await self._call_llm(prompt, temperature=0.0, json_mode=True)
+        try:
+            data = extract_json(response)
+        except ValueError:
+            data = {}
+
+        results = {}
+        failed = []
+        for section in sections:
+            schema = REVIEW_SECTIONS[section]['schema']
+            try:
+                if not isinstance(data, dict) or section not in data:
+                    raise ValueError(f"missing {section}")
+                results[section] = schema.model_validate(data).model_dump()[section]
+                parse_stats.record(schema, 'parsed')
+            except (ValueError, ValidationError):
+                parse_stats.record(schema, 'retried')
+                failed.append(section)
+
+        if failed:
+            self.log_activity(f"Fused extraction failed validation for {', '.join(failed)}, extracting separately", "WARNING")
+            retried = await self._map_concurrent(lambda section: self.section_extractors[section](chunk.text), failed)
+            results.update(zip(failed, retried))
+        return results
+
     async def _extract_parties(self, text: str) -> List[Dict[str, str]]:
         prompt = f"""
         Extract all parties mentioned in the following legal document. For each party, identify:
@@ -44,44 +222,17 @@ class ReviewAgent(BaseAgent):
 
         Document text:
         {text}
-
-        Return the information in a structured format.
         """
-        
-        response = await self._call_llm(prompt)
-        # Parse the response and structure it
-        # This is a simplified version - you might want to add more sophisticated parsing
-        parties = []
-        for line in response.split('\n'):
-            if ':' in line:
-                name, details = line.split(':', 1)
-                parties.append({
-                    'name': name.strip(),
-                    'details': details.strip()
-                })
-        return parties
 
-    async def _extract_dates(self, text: str) -> List[Dict[str, str]]:
+        result = await self._call_llm_structured_or_none(prompt, PartyList)
+        return [party.model_dump() for party in result.parties] if result else []
+
+    def _extract_dates(self, document: LegalDocument) -> List[Dict[str, Any]]:
         dates = []
-        for pattern in self.date_patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                date_str = match.group()
-                try:
-                    # Try to parse the date
-                    if '/' in date_str:
-                        date_obj = datetime.strptime(date_str, '%m/%d/%Y')
-                    elif '-' in date_str:
-                        date_obj = datetime.strptime(date_str, '%m-%d-%Y')
-                    else:
-                        date_obj = datetime.strptime(date_str, '%B %d %Y')
-                    
-                    dates.append({
-                        'date': date_obj.strftime('%Y-%m-%d'),
-                        'context': text[max(0, match.start()-50):min(len(text), match.end()+50)]
-                    })
-                except ValueError:
-                    continue
+        for entity in document.entities.get('date', []):
+            date = self._entity_dict(document, entity)
+            date['date'] = entity.value
+            dates.append(date)
         return dates
 
     async def _extract_obligations(self, text: str) -> List[Dict[str, str]]:
@@ -94,20 +245,10 @@ class ReviewAgent(BaseAgent):
 
         Document text:
         {text}
-
-        Return the information in a structured format.
         """
-        
-        response = await self._call_llm(prompt)
-        obligations = []
-        for line in response.split('\n'):
-            if ':' in line:
-                party, obligation = line.split(':', 1)
-                obligations.append({
-                    'party': party.strip(),
-                    'obligation': obligation.strip()
-                })
-        return obligations
+
+        result = await self._call_llm_structured_or_none(prompt, ObligationList)
+        return [obligation.model_dump() for obligation in result.obligations] if result else []
 
     async def _extract_key_terms(self, text: str) -> List[Dict[str, str]]:
         prompt = f"""
@@ -119,17 +260,7 @@ class ReviewAgent(BaseAgent):
 
         Document text:
         {text}
-
-        Return the information in a structured format.
         """
-        
-        response = await self._call_llm(prompt)
-        key_terms = []
-        for line in response.split('\n'):
-            if ':' in line:
-                term, definition = line.split(':', 1)
-                key_terms.append({
-                    'term': term.strip(),
-                    'definition': definition.strip()
-                })
-        return key_terms 
\ No newline at end of file
+
+        result = await self._call_llm_structured_or_none(prompt, KeyTermList)
+        return [term.model_dump() for term in result.key_terms] if result else []
\ No newline at end of file
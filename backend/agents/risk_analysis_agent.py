@@ -1,5 +1,11 @@
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional
 from .base_agent import BaseAgent
+from .concurrency import Channel, bounded_as_completed, bounded_map_stream
+from .document import DocumentChunk, LegalDocument, estimate_tokens
+from .risk_scanner import ClauseRiskScore, RiskScanner
+from .schemas import RiskFindingList, RiskRecommendation, RiskSeverity
+import asyncio
+import os
 
 class RiskAnalysisAgent(BaseAgent):
     def __init__(self):
@@ -19,13 +25,47 @@ class RiskAnalysisAgent(BaseAgent):
             "without limitation",
             "including but not limited to"
         ]
+        # Words that appear in almost every clause count for little on their own
+        self.indicator_weights = {indicator: 1.0 for indicator in self.risk_indicators}
+        self.indicator_weights.update({
+            "reasonable": 0.5,
+            "material": 0.5,
+            "substantial": 0.5,
+            "significant": 0.5,
+            "shall": 0.1,
+            "may": 0.2,
+            "subject to": 0.3,
+            "including but not limited to": 0.5
+        })
+        self.risk_scanner = RiskScanner(self.indicator_weights)
+        self.risk_score_threshold = float(os.getenv("RISK_SCORE_THRESHOLD", "1.0"))
 
     async def process(self, document_text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Analyze the document for risky or ambiguous clauses.
         """
+        # Score every clause locally and only send the flagged ones to the LLM
+        document = self._get_document(document_text, context)
+        scores = self._score_clauses(document)
+        flagged = {score.clause_id: score for score in scores if score.score >= self.risk_score_threshold}
+        self.log_activity(f"Risk prefilter flagged {len(flagged)} of {len(scores)} clauses")
+
+        # Streaming mode: hand each risky clause on as soon as it is found
+        stream = (context or {}).get('risky_clause_stream')
+        if stream is not None:
+            return await self._process_stream(document, scores, flagged, stream)
+
         # Identify potentially risky clauses
-        risky_clauses = await self._identify_risky_clauses(document_text)
+        risky_clauses = []
+        if flagged:
+            risky_clauses = await self._map_reduce(
+                document,
+                lambda chunk: self._identify_risky_clauses(document, chunk),
+                key=self._finding_key,
+                clause_ids=flagged
+            )
+        for risky_clause in risky_clauses:
+            self._add_score(risky_clause, flagged)
         
         # Analyze the severity of each risk
         risk_analysis = await self._analyze_risk_severity(risky_clauses)
@@ -36,10 +76,105 @@ class RiskAnalysisAgent(BaseAgent):
         return {
             'risky_clauses': risky_clauses,
             'risk_analysis': risk_analysis,
-            'recommendations': recommendations
+            'recommendations': recommendations,
+            'clause_risk_scores': [score.to_dict() for score in scores if score.score > 0]
+        }
+
+    def digest(self, results: Dict[str, Any]) -> List[str]:
+        severities = {
+            self._finding_key(analysis['clause']): analysis.get('severity', '')
+            for analysis in results.get('risk_analysis', [])
+        }
+        return [
+            f"[{clause.get('clause_id', 'unknown clause')}] "
+            f"{severities.get(self._finding_key(clause), 'Unrated')} risk: {clause.get('risk', '')}"
+            for clause in results.get('risky_clauses', [])
+        ]
+
+    async def _process_stream(
+        self,
+        document: LegalDocument,
+        scores: List[ClauseRiskScore],
+        flagged: Dict[str, ClauseRiskScore],
+        stream: Channel
+    ) -> Dict[str, Any]:
+        """
+        Grade each risky clause as soon as its chunk has been analysed, and
+        send it to `stream` for the next stage. The stream is closed when the
+        last clause is found, or on error.
+        """
+        risky_clauses = []
+
+        async def found() -> AsyncIterator[Dict[str, Any]]:
+            try:
+                async for risky_clause in self._stream_risky_clauses(document, flagged):
+                    risky_clauses.append(risky_clause)
+                    stream.send(risky_clause)
+                    yield risky_clause
+            finally:
+                stream.close()
+
+        async def assess(clause: Dict[str, Any]) -> Dict[str, Any]:
+            severity, recommendation = await asyncio.gather(
+                self._call_llm_structured_or_none(self._severity_prompt(clause), RiskSeverity),
+                self._call_llm_structured_or_none(self._recommendation_prompt(clause), RiskRecommendation)
+            )
+            return {'severity': severity, 'recommendation': recommendation, 'clause': clause}
+
+        assessments = await bounded_map_stream(assess, found(), self.max_concurrency)
+        return {
+            'risky_clauses': risky_clauses,
+            'risk_analysis': [
+                {'clause': item['clause'], **item['severity'].model_dump()}
+                for item in assessments if item['severity'] is not None
+            ],
+            'recommendations': [
+                {'clause': item['clause'], **item['recommendation'].model_dump()}
+                for item in assessments if item['recommendation'] is not None
+            ],
+            'clause_risk_scores': [score.to_dict() for score in scores if score.score > 0]
         }
 
-    async def _identify_risky_clauses(self, text: str) -> List[Dict[str, Any]]:
+    async def _stream_risky_clauses(self, document: LegalDocument, flagged: Dict[str, ClauseRiskScore]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Risky clauses of the flagged chunks, yielded as each chunk finishes.
+        """
+        if not flagged:
+            return
+        seen = set()
+        chunks = document.chunks(self.chunk_tokens, flagged)
+        findings = bounded_as_completed(lambda chunk: self._identify_risky_clauses(document, chunk), chunks, self.max_concurrency)
+        async for risky_clauses in findings:
+            for risky_clause in risky_clauses:
+                key = self._merge_key(risky_clause, self._finding_key)
+                if key and key in seen:
+                    continue
+                seen.add(key)
+                self._add_score(risky_clause, flagged)
+                yield risky_clause
+
+    @staticmethod
+    def _finding_key(clause: Dict[str, Any]) -> str:
+        return f"{clause.get('clause_id', '')}|{clause.get('risk', '')}"
+
+    @staticmethod
+    def _add_score(risky_clause: Dict[str, Any], flagged: Dict[str, ClauseRiskScore]) -> None:
+        score = flagged.get(risky_clause.get('clause_id'))
+        if score is not None:
+            risky_clause['risk_score'] = round(score.score, 3)
+            risky_clause['risk_indicators'] = dict(score.indicators)
+
+    def _score_clauses(self, document: LegalDocument) -> List[ClauseRiskScore]:
+        """
+        Deterministic per-clause risk scores from the risk indicators.
+        """
+        return self.risk_scanner.score_clauses(document.text, document.clauses)
+
+    async def _identify_risky_clauses(self, document: LegalDocument, chunk: DocumentChunk) -> List[Dict[str, Any]]:
+        clauses_text = "\n\n".join(
+            f"[{clause_id}] {document.text[start:end]}" for clause_id, start, end in chunk.segments
+        )
+        referenced_text = self._referenced_sections(document, chunk)
         prompt = f"""
         Analyze the following legal document and identify clauses that contain:
         1. Vague or ambiguous language
@@ -48,99 +183,95 @@ class RiskAnalysisAgent(BaseAgent):
         4. Missing or incomplete information
         5. Unbalanced or unfair provisions
 
-        For each identified clause, provide:
-        - The clause text
-        - The specific risk or concern
-        - The potential impact
-        - The section or context where it appears
+        Each clause of the document is prefixed with its ID in square brackets.
+        Report every identified clause under "risky_clauses".
 
-        Document text:
-        {text}
-
-        Return the information in a structured format.
+        Document clauses:
+        {clauses_text}
+        {referenced_text}
         """
-        
-        response = await self._call_llm(prompt)
-        risky_clauses = []
-        
-        # Parse the response and structure it
-        current_clause = {}
-        for line in response.split('\n'):
-            if line.strip():
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    current_clause[key.strip().lower()] = value.strip()
-                elif current_clause:
-                    risky_clauses.append(current_clause)
-                    current_clause = {}
-        
-        if current_clause:
-            risky_clauses.append(current_clause)
+
+        result = await self._call_llm_structured_or_none(prompt, RiskFindingList)
+        risky_clauses = [finding.model_dump() for finding in result.risky_clauses] if result else []
+
+        # Anchor each finding to the exact clause text and offsets
+        for risky_clause in risky_clauses:
+            clause = document.clause(risky_clause.get('clause_id', '').strip('[] '))
+            if clause is not None:
+                risky_clause.update({
+                    'clause_id': clause.id,
+                    'clause_text': clause.text,
+                    'section': clause.heading,
+                    'start': clause.start,
+                    'end': clause.end
+                })
             
         return risky_clauses
 
+    def _referenced_sections(self, document: LegalDocument, chunk: DocumentChunk) -> str:
+        """
+        Text of the sections the chunk's clauses cross-reference but does not
+        itself contain, within the retrieval budget.
+        """
+        in_chunk = set(chunk.clause_ids)
+        sections = []
+        used = 0
+        for clause_id in chunk.clause_ids:
+            for target in document.references.targets(clause_id):
+                cost = estimate_tokens(target.text)
+                if target.id in in_chunk or used + cost > self.retrieval_tokens:
+                    continue
+                in_chunk.add(target.id)
+                sections.append(f"[{target.id}] {target.text}")
+                used += cost
+        if not sections:
+            return ""
+        return "Sections referenced by these clauses (context only, do not report them):\n" + "\n\n".join(sections)
+
+    def _severity_prompt(self, clause: Dict[str, Any]) -> str:
+        return f"""
+        Analyze the severity of the following risky clause in a legal document:
+
+        Clause: {clause.get('clause_text', '')}
+        Risk: {clause.get('risk', '')}
+        Impact: {clause.get('impact', '')}
+
+        Please provide:
+        1. Risk severity level (High/Medium/Low)
+        2. Justification for the severity rating
+        3. Potential legal implications
+        4. Suggested mitigation strategies
+        """
+
+    def _recommendation_prompt(self, clause: Dict[str, Any]) -> str:
+        return f"""
+        Generate specific recommendations to address the following risky clause:
+
+        Clause: {clause.get('clause_text', '')}
+        Risk: {clause.get('risk', '')}
+        Impact: {clause.get('impact', '')}
+
+        Please provide:
+        1. Specific language changes or additions
+        2. Alternative clause formulations
+        3. Additional provisions that should be included
+        4. Any necessary definitions or clarifications
+        """
+
     async def _analyze_risk_severity(self, risky_clauses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        risk_analysis = []
-        
-        for clause in risky_clauses:
-            prompt = f"""
-            Analyze the severity of the following risky clause in a legal document:
-            
-            Clause: {clause.get('clause_text', '')}
-            Risk: {clause.get('risk', '')}
-            Impact: {clause.get('impact', '')}
-            
-            Please provide:
-            1. Risk severity level (High/Medium/Low)
-            2. Justification for the severity rating
-            3. Potential legal implications
-            4. Suggested mitigation strategies
-            
-            Return the information in a structured format.
-            """
-            
-            response = await self._call_llm(prompt)
-            
-            # Parse the response and add to analysis
-            analysis = {'clause': clause}
-            for line in response.split('\n'):
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    analysis[key.strip().lower()] = value.strip()
-            
-            risk_analysis.append(analysis)
-            
-        return risk_analysis
+        prompts = [self._severity_prompt(clause) for clause in risky_clauses]
+        results = await self._call_llm_structured_batched(prompts, RiskSeverity)
+
+        return [
+            {'clause': clause, **result.model_dump()}
+            for clause, result in zip(risky_clauses, results) if result is not None
+        ]
 
     async def _generate_risk_recommendations(self, risky_clauses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        recommendations = []
-        
-        for clause in risky_clauses:
-            prompt = f"""
-            Generate specific recommendations to address the following risky clause:
-            
-            Clause: {clause.get('clause_text', '')}
-            Risk: {clause.get('risk', '')}
-            Impact: {clause.get('impact', '')}
-            
-            Please provide:
-            1. Specific language changes or additions
-            2. Alternative clause formulations
-            3. Additional provisions that should be included
-            4. Any necessary definitions or clarifications
-            
-            Return the information in a structured format.
-            """
-            
-            response = await self._call_llm(prompt)
-            
-            # Parse the response and add to recommendations
-            recommendation = {'clause': clause}
-            for line in response.split('\n'):
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    recommendation[key.strip().lower()] = value.strip()
-            
-            recommendations.append(recommendation)
-            
-        return recommendations 
\ No newline at end of file
+        prompts = [self._recommendation_prompt(clause) for clause in risky_clauses]
+        results = await self._call_llm_structured_batched(prompts, RiskRecommendation)
+
+        return [
+            {'clause': clause, **result.model_dump()}
+            for clause, result in zip(risky_clauses, results) if result is not None
+        ]
\ No newline at end of file
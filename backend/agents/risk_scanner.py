@@ -0,0 +1,115 @@
+import math
+from bisect import bisect_right
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+from .segmentation import Clause
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of phrases.
+
+    The text is scanned once, whatever the number of phrases, and matches are
+    reported only on word boundaries ("may" does not match inside "mayor").
+    Matching is case-insensitive.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases = list(dict.fromkeys(phrase.lower() for phrase in phrases if phrase.strip()))
+        self.transitions: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.outputs: List[List[int]] = [[]]
+
+        for index, phrase in enumerate(self.phrases):
+            state = 0
+            for char in phrase:
+                if char not in self.transitions[state]:
+                    self.transitions.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                    self.transitions[state][char] = len(self.transitions) - 1
+                state = self.transitions[state][char]
+            self.outputs[state].append(index)
+
+        # Breadth-first so every failure target is final before it is used
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in self.transitions[state].items():
+                queue.append(target)
+                fallback = self.fail[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                if state:
+                    self.fail[target] = self.transitions[fallback].get(char, 0)
+                self.outputs[target] = self.outputs[target] + self.outputs[self.fail[target]]
+
+    def finditer(self, text: str) -> Iterable[Tuple[int, int, str]]:
+        """
+        Yield (start, end, phrase) for every whole-word occurrence in `text`.
+        """
+        lowered = text.lower()
+        state = 0
+        for position, char in enumerate(lowered):
+            while state and char not in self.transitions[state]:
+                state = self.fail[state]
+            state = self.transitions[state].get(char, 0)
+            if not self.outputs[state]:
+                continue
+            end = position + 1
+            if end < len(lowered) and lowered[end].isalnum():
+                continue
+            for index in self.outputs[state]:
+                phrase = self.phrases[index]
+                start = end - len(phrase)
+                if start > 0 and lowered[start - 1].isalnum():
+                    continue
+                yield start, end, phrase
+
+
+@dataclass(frozen=True)
+class ClauseRiskScore:
+    """
+    Deterministic risk score of one clause and the indicators behind it.
+    """
+    clause_id: str
+    score: float
+    indicators: Dict[str, int]
+
+    def to_dict(self) -> Dict[str, object]:
+        return {'clause_id': self.clause_id, 'score': round(self.score, 3), 'indicators': dict(self.indicators)}
+
+
+class RiskScanner:
+    """
+    Scores every clause of a document from weighted risk-indicator phrases.
+
+    A clause scores `weight * (1 + ln(count))` per distinct indicator, so
+    repeating a common word ("shall") adds little while a single strong
+    indicator ("best efforts") is enough to flag the clause.
+    """
+
+    def __init__(self, weights: Dict[str, float]):
+        self.weights = {phrase.lower(): weight for phrase, weight in weights.items()}
+        self.matcher = PhraseMatcher(self.weights)
+
+    def score_clauses(self, text: str, clauses: List[Clause]) -> List[ClauseRiskScore]:
+        """
+        Scan `text` once and score each of its `clauses`, in document order.
+        """
+        starts = [clause.start for clause in clauses]
+        counts: List[Counter] = [Counter() for _ in clauses]
+        for start, end, phrase in self.matcher.finditer(text):
+            index = bisect_right(starts, start) - 1
+            if index >= 0 and end <= clauses[index].end:
+                counts[index][phrase] += 1
+
+        return [
+            ClauseRiskScore(
+                clause_id=clause.id,
+                score=sum(self.weights[phrase] * (1 + math.log(count)) for phrase, count in clause_counts.items()),
+                indicators=dict(sorted(clause_counts.items()))
+            )
+            for clause, clause_counts in zip(clauses, counts)
+        ]
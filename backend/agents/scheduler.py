@@ -0,0 +1,142 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+
+@dataclass(frozen=True)
+class PipelineStage:
+    """
+    A single step of the analysis pipeline.
+
+    `depends_on` lists the stages whose results this stage reads. A stage
+    starts as soon as all of them have finished. If `condition` is given it
+    is evaluated against the results so far and a falsy value skips the stage.
+
+    `streams_from` names a stage whose items this stage consumes while both
+    run; it must not also be listed in `depends_on`, or it would wait for
+    the producer to finish first.
+    """
+    name: str
+    agent: str
+    description: str
+    depends_on: Tuple[str, ...] = ()
+    condition: Optional[Callable[[Dict[str, Any]], bool]] = None
+    streams_from: Optional[str] = None
+
+
+StageRunner = Callable[[PipelineStage, Dict[str, Any]], Awaitable[Any]]
+SkipCallback = Callable[[PipelineStage], None]
+
+
+class StageScheduler:
+    """
+    Runs pipeline stages as a dependency graph, starting each stage as soon
+    as its inputs are ready so independent stages execute concurrently.
+    """
+
+    def __init__(self, stages: List[PipelineStage]):
+        self.stages = list(stages)
+        self._by_name = {stage.name: stage for stage in self.stages}
+        if len(self._by_name) != len(self.stages):
+            raise ValueError("Pipeline stage names must be unique")
+        self._validate()
+
+    def _validate(self) -> None:
+        """
+        Reject unknown dependencies and cycles.
+        """
+        for stage in self.stages:
+            for dependency in stage.depends_on:
+                if dependency not in self._by_name:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+            if stage.streams_from is not None:
+                if stage.streams_from not in self._by_name:
+                    raise ValueError(f"Stage '{stage.name}' streams from unknown stage '{stage.streams_from}'")
+                if stage.streams_from in stage.depends_on:
+                    raise ValueError(f"Stage '{stage.name}' cannot both depend on and stream from '{stage.streams_from}'")
+
+        remaining = {stage.name: set(stage.depends_on) for stage in self.stages}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Pipeline stages contain a dependency cycle: {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def dependents(self, name: str) -> Set[str]:
+        """
+        Stages that read `name`'s results or stream from it, directly or
+        through other stages.
+        """
+        found: Set[str] = set()
+        frontier = [name]
+        while frontier:
+            current = frontier.pop()
+            for stage in self.stages:
+                if stage.name not in found and (current in stage.depends_on or stage.streams_from == current):
+                    found.add(stage.name)
+                    frontier.append(stage.name)
+        return found
+
+    async def run(self, runner: StageRunner, on_skip: Optional[SkipCallback] = None) -> Dict[str, Any]:
+        """
+        Execute every stage with `runner(stage, results)` and return the
+        results keyed by stage name, in declaration order. `on_skip` is
+        called with each stage skipped by its condition.
+
+        If a stage raises, the stages depending on it are cancelled and no
+        new stages start, but independent stages already running are left
+        to finish (so their work can be kept) before the first error is
+        re-raised.
+        """
+        results: Dict[str, Any] = {}
+        finished = set()
+        pending = dict(self._by_name)
+        running: Dict[asyncio.Future, PipelineStage] = {}
+        error: Optional[BaseException] = None
+
+        try:
+            while pending or running:
+                scheduled = error is None
+                while scheduled:
+                    scheduled = False
+                    for name, stage in list(pending.items()):
+                        if not all(dependency in finished for dependency in stage.depends_on):
+                            continue
+                        del pending[name]
+                        scheduled = True
+                        if stage.condition is not None and not stage.condition(results):
+                            finished.add(name)
+                            if on_skip is not None:
+                                on_skip(stage)
+                            continue
+                        running[asyncio.ensure_future(runner(stage, results))] = stage
+
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage = running.pop(task)
+                    if task.cancelled():
+                        continue
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        dependents = self.dependents(stage.name)
+                        for other_task, other_stage in running.items():
+                            if other_stage.name in dependents:
+                                other_task.cancel()
+                        continue
+                    results[stage.name] = task.result()
+                    finished.add(stage.name)
+            if error is not None:
+                raise error
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return {stage.name: results[stage.name] for stage in self.stages if stage.name in results}
\ No newline at end of file
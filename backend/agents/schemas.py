@@ -0,0 +1,254 @@
+from typing import Annotated, Any, Dict, List, Literal
+
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field
+
+
+def _as_list(value: Any) -> Any:
+    # Models often answer a one-item list with a bare string
+    if value is None:
+        return []
+    if isinstance(value, (str, dict)):
+        value = [value]
+    if isinstance(value, list):
+        return [str(item) if not isinstance(item, (str, dict)) else item for item in value]
+    return value
+
+
+def _as_text_list(value: Any) -> Any:
+    value = _as_list(value)
+    if isinstance(value, list):
+        return [
+            "; ".join(f"{key}: {item_value}" for key, item_value in item.items()) if isinstance(item, dict) else item
+            for item in value
+        ]
+    return value
+
+
+def _as_text_dict(value: Any) -> Any:
+    if value is None:
+        return {}
+    if isinstance(value, dict):
+        return {str(key): str(item) for key, item in value.items()}
+    if isinstance(value, str):
+        return {'summary': value}
+    return value
+
+
+def _as_severity(value: Any) -> Any:
+    return str(value).strip().capitalize() if value is not None else value
+
+
+TextList = Annotated[List[str], BeforeValidator(_as_text_list)]
+TextDict = Annotated[Dict[str, str], BeforeValidator(_as_text_dict)]
+Severity = Annotated[Literal['High', 'Medium', 'Low'], BeforeValidator(_as_severity)]
+
+
+class Schema(BaseModel):
+    """
+    Base for LLM output schemas: unknown keys are ignored and strings trimmed.
+    """
+    model_config = ConfigDict(extra='ignore', str_strip_whitespace=True)
+
+
+def items(model: type) -> Any:
+    """
+    A list of `model` that also accepts a single object.
+    """
+    return Annotated[List[model], BeforeValidator(_as_list)]
+
+
+# Review
+
+class Party(Schema):
+    name: str = Field(min_length=1, description="party name")
+    details: str = Field("", description="party type (individual, corporation, ...) and role in the document")
+
+
+class Obligation(Schema):
+    party: str = Field(min_length=1, description="the obligated party")
+    obligation: str = Field(min_length=1, description="the obligation with any conditions or deadlines")
+
+
+class KeyTerm(Schema):
+    term: str = Field(min_length=1, description="the term")
+    definition: str = Field(min_length=1, description="its meaning in the document and any conditions or limitations")
+
+
+class PartyList(Schema):
+    parties: items(Party)
+
+
+class ObligationList(Schema):
+    obligations: items(Obligation)
+
+
+class KeyTermList(Schema):
+    key_terms: items(KeyTerm)
+
+
+# Risk analysis
+
+class RiskFinding(Schema):
+    clause_id: str = Field(min_length=1, description="ID of the clause, without brackets")
+    risk: str = Field(min_length=1, description="the specific risk or concern")
+    impact: str = Field("", description="the potential impact")
+
+
+class RiskFindingList(Schema):
+    risky_clauses: items(RiskFinding)
+
+
+class RiskSeverity(Schema):
+    severity: Severity
+    justification: str = Field("", description="justification for the severity rating")
+    legal_implications: TextList = Field(default_factory=list, description="potential legal implication")
+    mitigation_strategies: TextList = Field(default_factory=list, description="suggested mitigation strategy")
+
+
+class RiskRecommendation(Schema):
+    language_changes: TextList = Field(default_factory=list, description="specific language change or addition")
+    alternative_formulations: TextList = Field(default_factory=list, description="alternative clause formulation")
+    additional_provisions: TextList = Field(default_factory=list, description="provision that should be added")
+    clarifications: TextList = Field(default_factory=list, description="definition or clarification needed")
+
+
+# Inconsistencies
+
+class Inconsistency(Schema):
+    type: str = Field(min_length=1, description="temporal, obligation, definition, scope or condition")
+    elements: str = Field(min_length=1, description="the conflicting elements")
+    location: str = Field("", description="where they appear in the document")
+    impact: str = Field("", description="the potential impact")
+
+
+class InconsistencyList(Schema):
+    inconsistencies: items(Inconsistency)
+
+
+class InconsistencyImpact(Schema):
+    severity: Severity
+    consequences: TextList = Field(default_factory=list, description="potential legal consequence")
+    enforceability_impact: str = Field("", description="effect on document enforceability")
+    rights_impact: TextList = Field(default_factory=list, description="impact on the parties' rights and obligations")
+    litigation_risk: str = Field("", description="risk of disputes or litigation")
+
+
+class InconsistencyResolution(Schema):
+    language_changes: TextList = Field(default_factory=list, description="specific language change")
+    alternatives: TextList = Field(default_factory=list, description="alternative approach to resolve the conflict")
+    modifications: TextList = Field(default_factory=list, description="required modification to a related provision")
+    steps: TextList = Field(default_factory=list, description="implementation step")
+    considerations: TextList = Field(default_factory=list, description="additional consideration or precaution")
+
+
+# Compliance
+
+class Jurisdiction(Schema):
+    name: str = Field(min_length=1, description="jurisdiction or regulation name, e.g. California or GDPR")
+    type: str = Field("", description="country, state, regulation or industry regime")
+    basis: str = Field("", description="why it applies to this document")
+
+
+class JurisdictionList(Schema):
+    jurisdictions: items(Jurisdiction)
+
+
+class ComplianceCheck(Schema):
+    status: TextDict = Field(default_factory=dict, description="compliance status for each rule, keyed by rule")
+    violations: TextList = Field(default_factory=list, description="specific violation or concern")
+    required_changes: TextList = Field(default_factory=list, description="change required for compliance")
+    penalties: TextList = Field(default_factory=list, description="potential penalty for non-compliance")
+    recommendations: TextList = Field(default_factory=list, description="recommendation for achieving compliance")
+
+
+class ComplianceReport(Schema):
+    overall_status: str = Field("", description="overall compliance status")
+    key_findings: TextList = Field(default_factory=list, description="key finding")
+    critical_issues: TextList = Field(default_factory=list, description="issue requiring immediate attention")
+    risk_assessment: TextDict = Field(default_factory=dict, description="compliance risk assessment, keyed by area")
+    action_items: TextList = Field(default_factory=list, description="prioritised action item")
+    long_term_strategy: TextList = Field(default_factory=list, description="long-term compliance measure")
+
+
+# Clause comparison
+
+class ClauseComparison(Schema):
+    differences: TextList = Field(default_factory=list, description="key difference between the clause and template")
+    missing_elements: TextList = Field(default_factory=list, description="template element missing from the clause")
+    additional_elements: TextList = Field(default_factory=list, description="element not in the template")
+    issues: TextList = Field(default_factory=list, description="potential issue or concern")
+    recommendations: TextList = Field(default_factory=list, description="recommendation for alignment")
+
+
+class AlignmentRecommendation(Schema):
+    language_changes: TextList = Field(default_factory=list, description="specific language change")
+    elements_to_add: TextList = Field(default_factory=list, description="element to add")
+    elements_to_remove: TextList = Field(default_factory=list, description="element to remove")
+    structural_changes: TextList = Field(default_factory=list, description="structural change")
+    considerations: TextList = Field(default_factory=list, description="additional consideration")
+
+
+# Suggestions
+
+class ClauseAlternative(Schema):
+    alternative_version: str = Field(min_length=1, description="the full safer alternative clause")
+    changes: TextList = Field(default_factory=list, description="key change made")
+    risk_addressed: str = Field("", description="how the changes address the risk")
+    considerations: TextList = Field(default_factory=list, description="additional consideration")
+
+
+class ImprovementExplanation(Schema):
+    improvements: TextList = Field(default_factory=list, description="explanation of an improvement")
+    legal_benefits: TextList = Field(default_factory=list, description="legal benefit of the changes")
+    enhancements: TextList = Field(default_factory=list, description="how clarity or enforceability improves")
+    considerations: TextList = Field(default_factory=list, description="potential trade-off or consideration")
+
+
+class ImplementationGuidance(Schema):
+    steps: TextList = Field(default_factory=list, description="implementation step, in order")
+    related_changes: TextList = Field(default_factory=list, description="required change to a related clause")
+    impacts: TextList = Field(default_factory=list, description="impact on another part of the document")
+    review_process: TextList = Field(default_factory=list, description="review or approval step")
+    documentation: TextList = Field(default_factory=list, description="additional documentation needed")
+
+
+# Summary
+
+class ExecutiveSummary(Schema):
+    overview: str = Field("", description="document overview")
+    key_points: TextList = Field(default_factory=list, description="key point")
+    critical_issues: TextList = Field(default_factory=list, description="critical issue")
+    risk_assessment: str = Field("", description="overall risk assessment")
+    compliance_status: str = Field("", description="overall compliance status")
+    next_steps: TextList = Field(default_factory=list, description="next step")
+
+
+class DetailedSummary(Schema):
+    structure: TextDict = Field(default_factory=dict, description="document structure and organization, keyed by aspect")
+    section_analysis: TextList = Field(default_factory=list, description="analysis of a major section")
+    legal_implications: TextList = Field(default_factory=list, description="legal implication or consideration")
+    technical_details: TextList = Field(default_factory=list, description="technical detail or specification")
+    operational_requirements: TextList = Field(default_factory=list, description="operational requirement")
+    implementation_considerations: TextList = Field(default_factory=list, description="implementation consideration")
+
+
+class Finding(Schema):
+    finding: str = Field(min_length=1, description="the finding")
+    category: str = Field("", description="risk, compliance, legal or business")
+    impact: str = Field("", description="its legal or business impact")
+    recommendation: str = Field("", description="what to do about it")
+
+
+class FindingList(Schema):
+    key_findings: items(Finding)
+
+
+class Recommendation(Schema):
+    recommendation: str = Field(min_length=1, description="the recommendation")
+    timeframe: str = Field("", description="immediate, short-term or long-term")
+    area: str = Field("", description="risk mitigation, compliance, drafting or implementation")
+    rationale: str = Field("", description="why it is recommended")
+
+
+class RecommendationList(Schema):
+    recommendations: items(Recommendation)
\ No newline at end of file
@@ -0,0 +1,162 @@
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# Headings are matched at the start of a line. Single-level numbers need a
+# trailing "." or ")" and a capitalised or quoted title so wrapped lines that
+# happen to start with a number ("30 days after ...") are not mistaken for
+# headings. Keyword headings must end the line or be followed by a title, so
+# a wrapped line reading "Section 7.2 of this Agreement ..." is not one.
+HEADING_PATTERN = re.compile(
+    r'^[ \t]*(?:'
+    r'(?P<keyword>ARTICLE|Article|SECTION|Section|CLAUSE|Clause)\s+(?P<keyword_number>\d{1,3}(?:\.\d{1,3})*|[IVXLC]{1,7})\b[.:]?'
+    r'(?=[ \t]*(?:\r?$|[-\u2013\u2014]|[A-Z("\'\u201c]))'
+    r'|(?P<annex>SCHEDULE|Schedule|EXHIBIT|Exhibit|ANNEX|Annex|APPENDIX|Appendix)\s+(?P<annex_number>[A-Z0-9]{1,3})\b[.:]?'
+    r'|(?P<multi>\d{1,3}(?:\.\d{1,3})+)\.?(?=\s+[A-Z("\'\u201c])'
+    r'|(?P<single>\d{1,3})[.)](?=\s+[A-Z("\'\u201c])'
+    r')[^\n]*',
+    re.MULTILINE
+)
+PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n')
+
+# Keywords are checked in order against the clause heading, so more specific
+# types come before the generic ones they contain ("termination" before "term")
+CLAUSE_TYPE_KEYWORDS: List[Tuple[str, Tuple[str, ...]]] = [
+    ('definition', ('definition', 'defined term', 'interpretation')),
+    ('confidentiality', ('confidential', 'non-disclosure', 'nondisclosure')),
+    ('termination', ('termination', 'terminate')),
+    ('payment', ('payment', 'fees', 'compensation', 'invoice', 'price')),
+    ('indemnification', ('indemn',)),
+    ('limitation of liability', ('limitation of liability', 'liability')),
+    ('warranty', ('warrant', 'representation')),
+    ('intellectual property', ('intellectual property', 'ownership', 'licen')),
+    ('governing law', ('governing law', 'jurisdiction', 'venue')),
+    ('dispute resolution', ('dispute', 'arbitration')),
+    ('force majeure', ('force majeure',)),
+    ('assignment', ('assignment', 'assign')),
+    ('notices', ('notice',)),
+    ('non-compete', ('non-compet', 'non-solicit')),
+    ('data protection', ('data protection', 'privacy', 'personal data')),
+    ('term', ('term', 'duration')),
+    ('miscellaneous', ('miscellaneous', 'general provisions', 'entire agreement', 'severab')),
+]
+
+
+@dataclass(frozen=True)
+class Clause:
+    """
+    A contiguous span of the document. `start`/`end` are character offsets
+    into the original text, so `text == document[start:end]`.
+    """
+    id: str
+    number: Optional[str]
+    heading: str
+    type: str
+    text: str
+    start: int
+    end: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['section'] = self.heading
+        return data
+
+
+def infer_clause_type(heading: str) -> str:
+    """
+    Classify a clause from the words in its heading.
+    """
+    heading = heading.lower()
+    for clause_type, keywords in CLAUSE_TYPE_KEYWORDS:
+        if any(re.search(r'\b' + re.escape(keyword), heading) for keyword in keywords):
+            return clause_type
+    return 'general'
+
+
+def _trimmed_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _heading_number(match: re.Match) -> Tuple[Optional[str], str]:
+    if match.group('keyword'):
+        prefix = 'art' if match.group('keyword').lower() == 'article' else 'sec'
+        return match.group('keyword_number'), prefix
+    if match.group('annex'):
+        return match.group('annex_number'), match.group('annex').lower()
+    return match.group('multi') or match.group('single'), 'sec'
+
+
+def segment_clauses(text: str) -> List[Clause]:
+    """
+    Split a document into clauses using numbered headings, article/section
+    markers and schedules, falling back to blank-line paragraphs when the
+    document has no recognisable headings.
+
+    IDs are derived from section numbers where possible (`sec-7.2`, `art-IV`,
+    `schedule-B`) so they stay stable across runs on the same text.
+    """
+    headings = list(HEADING_PATTERN.finditer(text))
+    spans: List[Tuple[int, int, Optional[re.Match]]] = []
+
+    if headings:
+        if headings[0].start() > 0:
+            spans.append((0, headings[0].start(), None))
+        for index, match in enumerate(headings):
+            end = headings[index + 1].start() if index + 1 < len(headings) else len(text)
+            spans.append((match.start(), end, match))
+    else:
+        position = 0
+        for paragraph_break in PARAGRAPH_BREAK.finditer(text):
+            spans.append((position, paragraph_break.start(), None))
+            position = paragraph_break.end()
+        spans.append((position, len(text), None))
+
+    clauses: List[Clause] = []
+    seen_ids: Dict[str, int] = {}
+    types_by_number: Dict[str, str] = {}
+    paragraph_count = 0
+    for span_start, span_end, match in spans:
+        start, end = _trimmed_span(text, span_start, span_end)
+        if start == end:
+            continue
+
+        clause_text = text[start:end]
+        first_line = clause_text.split('\n', 1)[0].strip()
+        if match is not None:
+            number, prefix = _heading_number(match)
+            clause_id = f"{prefix}-{number}"
+            heading = first_line[:200]
+        elif headings:
+            number, clause_id, heading = None, 'preamble', 'Preamble'
+        else:
+            paragraph_count += 1
+            number, clause_id, heading = None, f"para-{paragraph_count}", first_line[:80]
+
+        if clause_id in seen_ids:
+            seen_ids[clause_id] += 1
+            clause_id = f"{clause_id}-{seen_ids[clause_id]}"
+        else:
+            seen_ids[clause_id] = 1
+
+        clause_type = infer_clause_type(heading) if match is not None else 'general'
+        if clause_type == 'general' and number and '.' in number:
+            # Sub-clauses ("2.1 The Receiving Party ...") inherit their parent's type
+            clause_type = types_by_number.get(number.rsplit('.', 1)[0], clause_type)
+        if number:
+            types_by_number[number] = clause_type
+
+        clauses.append(Clause(
+            id=clause_id,
+            number=number,
+            heading=heading,
+            type=clause_type,
+            text=clause_text,
+            start=start,
+            end=end
+        ))
+
+    return clauses
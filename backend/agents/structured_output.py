@@ -0,0 +1,138 @@
+import json
+import re
+import threading
+import typing
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+T = TypeVar('T', bound=BaseModel)
+
+CODE_FENCE = re.compile(r'^```[a-zA-Z]*\s*|\s*```$')
+TRAILING_COMMA = re.compile(r',\s*([}\]])')
+
+
+class StructuredOutputError(Exception):
+    """
+    Raised when an LLM response still fails its schema after every repair.
+    """
+
+
+def extract_json(response: str) -> Any:
+    """
+    Parse the JSON object in `response`, tolerating a markdown code fence,
+    prose around the object and trailing commas.
+    """
+    text = response.strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    text = CODE_FENCE.sub('', text)
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end < start:
+        raise ValueError("No JSON object in response")
+    return json.loads(TRAILING_COMMA.sub(r'\1', text[start:end + 1]))
+
+
+def _shape(annotation: Any, description: str = '') -> Any:
+    """
+    Compact example of the JSON a type expects, used in prompts instead of a
+    full JSON Schema to keep them short.
+    """
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Annotated:
+        return _shape(args[0], description)
+    if origin is typing.Union:
+        return _shape(next(arg for arg in args if arg is not type(None)), description)
+    if origin is typing.Literal:
+        return '|'.join(map(str, args))
+    if origin in (list, List):
+        return [_shape(args[0] if args else str, description)]
+    if origin in (dict, Dict):
+        return {'<key>': description or 'string'}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return {
+            name: _shape(field.annotation, field.description or '')
+            for name, field in annotation.model_fields.items()
+        }
+    return description or 'string'
+
+
+@lru_cache(maxsize=None)
+def format_instructions(schema: Type[BaseModel]) -> str:
+    """
+    Prompt suffix asking for a JSON object shaped like `schema`.
+    """
+    return (
+        "Respond with only a JSON object of this shape (no markdown, no commentary; "
+        "use empty lists or strings where nothing applies):\n"
+        + json.dumps(_shape(schema), ensure_ascii=False)
+    )
+
+
+@lru_cache(maxsize=None)
+def answer_shape(schema: Type[BaseModel]) -> str:
+    return json.dumps(_shape(schema), ensure_ascii=False)
+
+
+def repair_prompt(prompt: str, response: str, error: Exception) -> str:
+    """
+    Follow-up prompt asking the model to fix an invalid answer.
+    """
+    problem = str(error).split('\n')[0] if not isinstance(error, ValidationError) else "; ".join(
+        f"{'.'.join(map(str, issue['loc'])) or 'response'}: {issue['msg']}" for issue in error.errors()[:5]
+    )
+    return f"""{prompt}
+
+Your previous answer was not valid ({problem}):
+{response[:2000]}
+
+Answer again with only the corrected JSON object."""
+
+
+class ParseStats:
+    """
+    Per-schema counters of structured-output outcomes.
+    """
+
+    FIELDS = ('parsed', 'repaired_locally', 'retried', 'failed')
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+        self._lock = threading.Lock()
+
+    def record(self, schema: Type[BaseModel], outcome: str, count: int = 1) -> None:
+        with self._lock:
+            self._counts[schema.__name__][outcome] += count
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._counts.items()}
+
+
+parse_stats = ParseStats()
+
+
+def parse_structured(response: str, schema: Type[T]) -> T:
+    """
+    Validate `response` against `schema`, counting the outcome. Raises
+    ValueError or ValidationError when it does not fit.
+    """
+    try:
+        result = schema.model_validate_json(response)
+    except ValidationError:
+        result = schema.model_validate(extract_json(response))
+        parse_stats.record(schema, 'repaired_locally')
+    parse_stats.record(schema, 'parsed')
+    return result
+
+
+def structured_output_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Parse counters of every schema used so far in this process.
+    """
+    return parse_stats.snapshot()
\ No newline at end of file
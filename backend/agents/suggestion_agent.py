@@ -1,5 +1,8 @@
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterable, Dict, List, Any, Optional, Tuple
 from .base_agent import BaseAgent
+from .concurrency import bounded_map_stream
+from .schemas import ClauseAlternative, ImplementationGuidance, ImprovementExplanation
+import asyncio
 
 class SuggestionAgent(BaseAgent):
     def __init__(self):
@@ -16,6 +19,11 @@ class SuggestionAgent(BaseAgent):
         """
         Generate safer alternatives for clauses that need improvement.
         """
+        # Streaming mode: suggest for each risky clause as soon as it is found
+        stream = (context or {}).get('risky_clause_stream')
+        if stream is not None:
+            return await self._process_stream(stream)
+
         if not context or 'risky_clauses' not in context:
             return {'error': 'No risky clauses provided in context'}
 
@@ -36,178 +44,112 @@ class SuggestionAgent(BaseAgent):
             'guidance': guidance
         }
 
+    def digest(self, results: Dict[str, Any]) -> List[str]:
+        return [
+            f"[{alternative['original_clause'].get('clause_id', 'unknown clause')}] rewrite proposed: "
+            + ('; '.join(alternative.get('changes', [])[:2]) or alternative.get('alternative_version', ''))
+            for alternative in results.get('alternatives', [])
+        ]
+
+    async def _process_stream(self, risky_clauses: AsyncIterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Take each risky clause through rewrite, explanation and guidance on
+        its own, so the first suggestion does not wait for the whole document.
+        """
+        async def suggest(clause: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]]:
+            alternative = await self._rewrite_clause(clause)
+            if alternative is None:
+                return None
+            explanation, guidance = await asyncio.gather(
+                self._explain_improvement(alternative),
+                self._guide_implementation(alternative)
+            )
+            return alternative, explanation, guidance
+
+        results = [result for result in await bounded_map_stream(suggest, risky_clauses, self.max_concurrency) if result]
+        return {
+            'alternatives': [alternative for alternative, _, _ in results],
+            'explanations': [explanation for _, explanation, _ in results],
+            'guidance': [guidance for _, _, guidance in results]
+        }
+
     async def _generate_alternatives(self, risky_clauses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        alternatives = []
-        
-        for clause in risky_clauses:
-            prompt = f"""
-            Rewrite the following risky clause to make it safer and more effective:
-
-            Original Clause:
-            {clause.get('clause_text', '')}
-
-            Risk/Issue:
-            {clause.get('risk', '')}
-
-            Please provide:
-            1. A safer alternative version
-            2. Key changes made
-            3. How the changes address the risk
-            4. Any additional considerations
-
-            Follow these guidelines:
-            - Use clear, unambiguous language
-            - Replace vague terms with specific ones
-            - Ensure balanced obligations and rights
-            - Maintain regulatory compliance
-            - Use legally enforceable language
-
-            Return the information in a structured format.
-            """
-            
-            response = await self._call_llm(prompt)
-            
-            # Parse the response and structure it
-            alternative = {
-                'original_clause': clause,
-                'alternative_version': '',
-                'changes': [],
-                'risk_addressed': '',
-                'considerations': []
-            }
-            
-            current_section = None
-            for line in response.split('\n'):
-                if line.strip():
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        key = key.strip().lower()
-                        value = value.strip()
-                        
-                        if 'alternative' in key:
-                            alternative['alternative_version'] = value
-                        elif 'change' in key:
-                            alternative['changes'].append(value)
-                        elif 'risk' in key:
-                            alternative['risk_addressed'] = value
-                        elif 'consideration' in key:
-                            alternative['considerations'].append(value)
-            
-            alternatives.append(alternative)
-        
-        return alternatives
+        alternatives = await self._map_concurrent(self._rewrite_clause, risky_clauses)
+        # A clause without a usable rewrite has nothing to explain or implement
+        return [alternative for alternative in alternatives if alternative is not None]
 
     async def _explain_improvements(self, alternatives: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        explanations = []
-        
-        for alternative in alternatives:
-            prompt = f"""
-            Explain the improvements in the following clause revision:
-
-            Original Clause:
-            {alternative['original_clause'].get('clause_text', '')}
-
-            Alternative Version:
-            {alternative['alternative_version']}
-
-            Changes Made:
-            {alternative['changes']}
-
-            Please provide:
-            1. Detailed explanation of each improvement
-            2. Legal benefits of the changes
-            3. How the changes enhance clarity and enforceability
-            4. Any potential trade-offs or considerations
-
-            Return the information in a structured format.
-            """
-            
-            response = await self._call_llm(prompt)
-            
-            # Parse the response and structure it
-            explanation = {
-                'alternative': alternative,
-                'improvements': [],
-                'legal_benefits': [],
-                'enhancements': [],
-                'considerations': []
-            }
-            
-            current_section = None
-            for line in response.split('\n'):
-                if line.strip():
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        key = key.strip().lower()
-                        value = value.strip()
-                        
-                        if 'improvement' in key:
-                            explanation['improvements'].append(value)
-                        elif 'benefit' in key:
-                            explanation['legal_benefits'].append(value)
-                        elif 'enhancement' in key:
-                            explanation['enhancements'].append(value)
-                        elif 'consideration' in key:
-                            explanation['considerations'].append(value)
-            
-            explanations.append(explanation)
-        
-        return explanations
+        return await self._map_concurrent(self._explain_improvement, alternatives)
 
     async def _generate_implementation_guidance(self, alternatives: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        guidance = []
-        
-        for alternative in alternatives:
-            prompt = f"""
-            Provide implementation guidance for the following clause revision:
-
-            Original Clause:
-            {alternative['original_clause'].get('clause_text', '')}
-
-            Alternative Version:
-            {alternative['alternative_version']}
-
-            Please provide:
-            1. Step-by-step implementation instructions
-            2. Required changes to related clauses
-            3. Potential impact on other parts of the document
-            4. Recommended review and approval process
-            5. Any additional documentation needed
-
-            Return the information in a structured format.
-            """
-            
-            response = await self._call_llm(prompt)
-            
-            # Parse the response and structure it
-            implementation = {
-                'alternative': alternative,
-                'steps': [],
-                'related_changes': [],
-                'impacts': [],
-                'review_process': [],
-                'documentation': []
-            }
-            
-            current_section = None
-            for line in response.split('\n'):
-                if line.strip():
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        key = key.strip().lower()
-                        value = value.strip()
-                        
-                        if 'step' in key:
-                            implementation['steps'].append(value)
-                        elif 'related' in key:
-                            implementation['related_changes'].append(value)
-                        elif 'impact' in key:
-                            implementation['impacts'].append(value)
-                        elif 'review' in key:
-                            implementation['review_process'].append(value)
-                        elif 'documentation' in key:
-                            implementation['documentation'].append(value)
-            
-            guidance.append(implementation)
-        
-        return guidance 
\ No newline at end of file
+        return await self._map_concurrent(self._guide_implementation, alternatives)
+
+    async def _rewrite_clause(self, clause: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        guidelines = '\n        '.join(f"- {guideline}" for guideline in self.rewriting_guidelines.values())
+        prompt = f"""
+        Rewrite the following risky clause to make it safer and more effective:
+
+        Original Clause:
+        {clause.get('clause_text', '')}
+
+        Risk/Issue:
+        {clause.get('risk', '')}
+
+        Please provide:
+        1. A safer alternative version
+        2. Key changes made
+        3. How the changes address the risk
+        4. Any additional considerations
+
+        Follow these guidelines:
+        {guidelines}
+        """
+
+        result = await self._call_llm_structured_or_none(prompt, ClauseAlternative)
+        if result is None:
+            return None
+        return {'original_clause': clause, **result.model_dump()}
+
+    async def _explain_improvement(self, alternative: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = f"""
+        Explain the improvements in the following clause revision:
+
+        Original Clause:
+        {alternative['original_clause'].get('clause_text', '')}
+
+        Alternative Version:
+        {alternative['alternative_version']}
+
+        Changes Made:
+        {alternative['changes']}
+
+        Please provide:
+        1. Detailed explanation of each improvement
+        2. Legal benefits of the changes
+        3. How the changes enhance clarity and enforceability
+        4. Any potential trade-offs or considerations
+        """
+
+        result = await self._call_llm_structured_or_none(prompt, ImprovementExplanation)
+        return {'alternative': alternative, **(result or ImprovementExplanation()).model_dump()}
+
+    async def _guide_implementation(self, alternative: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = f"""
+        Provide implementation guidance for the following clause revision:
+
+        Original Clause:
+        {alternative['original_clause'].get('clause_text', '')}
+
+        Alternative Version:
+        {alternative['alternative_version']}
+
+        Please provide:
+        1. Step-by-step implementation instructions
+        2. Required changes to related clauses
+        3. Potential impact on other parts of the document
+        4. Recommended review and approval process
+        5. Any additional documentation needed
+        """
+
+        result = await self._call_llm_structured_or_none(prompt, ImplementationGuidance)
+        return {'alternative': alternative, **(result or ImplementationGuidance()).model_dump()}
\ No newline at end of file
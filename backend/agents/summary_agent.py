@@ -1,5 +1,7 @@
 from typing import Dict, List, Any, Optional
 from .base_agent import BaseAgent
+from .document import DocumentChunk, LegalDocument
+from .schemas import DetailedSummary, ExecutiveSummary, FindingList, RecommendationList
 
 class SummaryAgent(BaseAgent):
     def __init__(self):
@@ -18,11 +20,14 @@ class SummaryAgent(BaseAgent):
         """
         Generate a comprehensive summary of the document analysis.
         """
+        # Condense documents that exceed the prompt budget
+        text = await self._condense(self._get_document(document_text, context))
+
         # Generate executive summary
-        executive_summary = await self._generate_executive_summary(document_text, context)
+        executive_summary = await self._generate_executive_summary(text, context)
         
         # Generate detailed summary
-        detailed_summary = await self._generate_detailed_summary(document_text, context)
+        detailed_summary = await self._generate_detailed_summary(text, context)
         
         # Generate key findings
         key_findings = await self._generate_key_findings(context)
@@ -37,6 +42,34 @@ class SummaryAgent(BaseAgent):
             'recommendations': recommendations
         }
 
+    async def _condense(self, document: LegalDocument, depth: int = 0) -> str:
+        """
+        Return the document text if it fits in one chunk, otherwise the
+        concatenated per-chunk summaries (reduced again if still too long).
+        """
+        chunks = document.chunks(self.chunk_tokens)
+        if len(chunks) <= 1:
+            return document.text
+
+        self.log_activity(f"Condensing {len(chunks)} chunks for the summary")
+        summaries = await self._map_concurrent(self._summarize_chunk, chunks)
+        condensed = "\n\n".join(summaries)
+        if depth < 2:
+            return await self._condense(LegalDocument(condensed), depth + 1)
+        return condensed
+
+    async def _summarize_chunk(self, chunk: DocumentChunk) -> str:
+        prompt = f"""
+        Summarize the following portion of a legal document in at most a few short paragraphs.
+        Keep every party, date, amount, duration, obligation, right and any unusual or risky term.
+        Refer to sections by their numbers where they are given.
+
+        Document portion:
+        {chunk.text}
+        """
+        
+        return await self._call_llm(prompt)
+
     async def _generate_executive_summary(self, text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         prompt = f"""
         Generate an executive summary of the following legal document analysis:
@@ -45,7 +78,7 @@ class SummaryAgent(BaseAgent):
         {text}
 
         Analysis context:
-        {context if context else 'No additional context provided'}
+        {self._analysis_digest(context)}
 
         Please provide:
         1. Document overview
@@ -54,42 +87,10 @@ class SummaryAgent(BaseAgent):
         4. Risk assessment
         5. Compliance status
         6. Next steps
-
-        Return the information in a structured format.
         """
-        
-        response = await self._call_llm(prompt)
-        
-        # Parse the response and structure it
-        summary = {
-            'overview': '',
-            'key_points': [],
-            'critical_issues': [],
-            'risk_assessment': '',
-            'compliance_status': '',
-            'next_steps': []
-        }
-        
-        for line in response.split('\n'):
-            if ':' in line:
-                key, value = line.split(':', 1)
-                key = key.strip().lower()
-                value = value.strip()
-                
-                if 'overview' in key:
-                    summary['overview'] = value
-                elif 'point' in key:
-                    summary['key_points'].append(value)
-                elif 'issue' in key:
-                    summary['critical_issues'].append(value)
-                elif 'risk' in key:
-                    summary['risk_assessment'] = value
-                elif 'compliance' in key:
-                    summary['compliance_status'] = value
-                elif 'step' in key:
-                    summary['next_steps'].append(value)
-        
-        return summary
+
+        result = await self._call_llm_structured_or_none(prompt, ExecutiveSummary)
+        return (result or ExecutiveSummary()).model_dump()
 
     async def _generate_detailed_summary(self, text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         prompt = f"""
@@ -99,7 +100,7 @@ class SummaryAgent(BaseAgent):
         {text}
 
         Analysis context:
-        {context if context else 'No additional context provided'}
+        {self._analysis_digest(context)}
 
         Please provide a comprehensive analysis covering:
         1. Document structure and organization
@@ -108,54 +109,21 @@ class SummaryAgent(BaseAgent):
         4. Technical details and specifications
         5. Operational requirements
         6. Implementation considerations
-
-        Return the information in a structured format.
         """
-        
-        response = await self._call_llm(prompt)
-        
-        # Parse the response and structure it
-        summary = {
-            'structure': {},
-            'section_analysis': [],
-            'legal_implications': [],
-            'technical_details': [],
-            'operational_requirements': [],
-            'implementation_considerations': []
-        }
-        
-        current_section = None
-        for line in response.split('\n'):
-            if line.strip():
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    key = key.strip().lower()
-                    value = value.strip()
-                    
-                    if 'structure' in key:
-                        summary['structure'][key] = value
-                    elif 'section' in key:
-                        summary['section_analysis'].append(value)
-                    elif 'implication' in key:
-                        summary['legal_implications'].append(value)
-                    elif 'technical' in key:
-                        summary['technical_details'].append(value)
-                    elif 'operational' in key:
-                        summary['operational_requirements'].append(value)
-                    elif 'implementation' in key:
-                        summary['implementation_considerations'].append(value)
-        
-        return summary
+
+        result = await self._call_llm_structured_or_none(prompt, DetailedSummary)
+        return (result or DetailedSummary()).model_dump()
 
     async def _generate_key_findings(self, context: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        if not context:
+        # Findings and recommendations are drawn from the earlier stages only
+        if not (context or {}).get('analysis_digest'):
             return []
 
         prompt = f"""
         Generate key findings from the following document analysis:
 
         Analysis context:
-        {context}
+        {self._analysis_digest(context)}
 
         Please provide:
         1. Critical findings
@@ -164,39 +132,21 @@ class SummaryAgent(BaseAgent):
         4. Legal implications
         5. Business impact
         6. Recommendations
-
-        Return the information in a structured format.
         """
-        
-        response = await self._call_llm(prompt)
-        
-        # Parse the response and structure it
-        findings = []
-        current_finding = {}
-        
-        for line in response.split('\n'):
-            if line.strip():
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    current_finding[key.strip().lower()] = value.strip()
-                elif current_finding:
-                    findings.append(current_finding)
-                    current_finding = {}
-        
-        if current_finding:
-            findings.append(current_finding)
-        
-        return findings
+
+        result = await self._call_llm_structured_or_none(prompt, FindingList)
+        return [finding.model_dump() for finding in result.key_findings] if result else []
 
     async def _generate_recommendations(self, context: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        if not context:
+        # Findings and recommendations are drawn from the earlier stages only
+        if not (context or {}).get('analysis_digest'):
             return []
 
         prompt = f"""
         Generate recommendations based on the following document analysis:
 
         Analysis context:
-        {context}
+        {self._analysis_digest(context)}
 
         Please provide:
         1. Immediate actions required
@@ -205,26 +155,7 @@ class SummaryAgent(BaseAgent):
         4. Risk mitigation strategies
         5. Compliance enhancements
         6. Implementation guidance
-
-        Return the information in a structured format.
         """
-        
-        response = await self._call_llm(prompt)
-        
-        # Parse the response and structure it
-        recommendations = []
-        current_recommendation = {}
-        
-        for line in response.split('\n'):
-            if line.strip():
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    current_recommendation[key.strip().lower()] = value.strip()
-                elif current_recommendation:
-                    recommendations.append(current_recommendation)
-                    current_recommendation = {}
-        
-        if current_recommendation:
-            recommendations.append(current_recommendation)
-        
-        return recommendations 
\ No newline at end of file
+
+        result = await self._call_llm_structured_or_none(prompt, RecommendationList)
+        return [recommendation.model_dump() for recommendation in result.recommendations] if result else []
\ No newline at end of file
@@ -1,5 +1,11 @@
-from typing import Dict, List, Any, Optional
+import asyncio
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional
 from .base_agent import BaseAgent
+from .checkpoints import CheckpointStore, document_hash, get_checkpoint_store
+from .concurrency import Channel
+from .digest import AnalysisDigest
+from .llm_client import DEFAULT_MODEL
+from .scheduler import PipelineStage, StageScheduler
 from .review_agent import ReviewAgent
 from .risk_analysis_agent import RiskAnalysisAgent
 from .clause_comparison_agent import ClauseComparisonAgent
@@ -7,6 +13,27 @@ from .suggestion_agent import SuggestionAgent
 from .inconsistency_agent import InconsistencyAgent
 from .compliance_agent import ComplianceAgent
 from .summary_agent import SummaryAgent
+import os
+
+# Receives progress events: {'event': 'stage_started' | 'item' | 'stage_completed' | 'stage_skipped', 'stage': ..., ...}
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+# Part of the checkpoint key; bump when a change to the stages or prompts
+# makes results saved by an older version unfit to resume from
+PIPELINE_VERSION = 1
+
+
+class AnalysisError(Exception):
+    """
+    Raised when a pipeline stage fails. `results` holds the stages that
+    completed before the failure, keyed by stage name.
+    """
+
+    def __init__(self, message: str, stage: Optional[str] = None, results: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.stage = stage
+        self.results = results or {}
+
 
 class SupervisorAgent(BaseAgent):
     def __init__(self):
@@ -20,75 +47,221 @@ class SupervisorAgent(BaseAgent):
             'compliance': ComplianceAgent(),
             'summary': SummaryAgent()
         }
+        # With streaming, suggestions start on each risky clause as soon as
+        # the risk stage finds it instead of waiting for the whole stage
+        self.streaming = os.getenv("PIPELINE_STREAMING", "false").lower() == "true"
+        if self.streaming:
+            suggestions = PipelineStage('suggestions', 'suggestion', 'suggestion generation', streams_from='risk')
+        else:
+            suggestions = PipelineStage(
+                'suggestions', 'suggestion', 'suggestion generation',
+                depends_on=('risk',),
+                condition=lambda results: bool(results['risk'].get('risky_clauses'))
+            )
+        # Each stage declares the stages whose results it reads; everything
+        # else only needs the document text and runs concurrently.
+        self.stages = [
+            PipelineStage('review', 'review', 'document review'),
+            PipelineStage('risk', 'risk', 'risk analysis'),
+            PipelineStage('clause', 'clause', 'clause comparison'),
+            PipelineStage('inconsistencies', 'inconsistency', 'inconsistency check'),
+            suggestions,
+            PipelineStage('compliance', 'compliance', 'compliance check', depends_on=('review',)),
+            PipelineStage(
+                'summary', 'summary', 'summary generation',
+                depends_on=('review', 'risk', 'clause', 'suggestions', 'inconsistencies', 'compliance')
+            )
+        ]
+        self.scheduler = StageScheduler(self.stages)
+        self.stages_by_name = {stage.name: stage for stage in self.stages}
+        # Later prompts see a bounded digest of earlier results, not the results themselves
+        self.digest_tokens = int(os.getenv("ANALYSIS_DIGEST_TOKENS", "1500"))
         self.log_activity("Initialized SupervisorAgent with all sub-agents", "SUCCESS")
 
-    async def process(self, document_text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def process(
+        self,
+        document_text: str,
+        context: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
         """
         Orchestrate the document analysis process by coordinating all agents.
+        Stages run as soon as the stages they depend on have finished.
+
+        `on_progress` is called when a stage starts and when it completes
+        (with its results) or is skipped; in streaming mode also with each item a stage
+        streams to the next one, e.g. every risky clause as it is found.
+
+        Each completed stage is checkpointed, so running the same document
+        again after a failure only runs the stages that did not complete.
+        On failure an AnalysisError carries the completed stages' results.
         """
         self.log_activity("Starting document analysis process")
-        results = {}
-        context = context or {}
+        context = dict(context or {})
+        user_context = {key: value for key, value in context.items() if key != 'document'}
+        request_context = [f"{key}: {value}" for key, value in user_context.items()]
+        # Segmentation and other derived views are built once and shared by all agents
+        context['document'] = self._get_document(document_text, context)
 
-        try:
-            # Step 1: Initial review and extraction
-            self.log_activity("Initiating document review phase")
-            review_results = await self.agents['review'].process(document_text, context)
-            results['review'] = review_results
-            context.update(review_results)
-            self.log_activity("Document review completed", "SUCCESS")
-
-            # Step 2: Risk analysis
-            self.log_activity("Starting risk analysis phase")
-            risk_results = await self.agents['risk'].process(document_text, context)
-            results['risk'] = risk_results
-            context.update(risk_results)
-            self.log_activity("Risk analysis completed", "SUCCESS")
-
-            # Step 3: Clause comparison
-            self.log_activity("Initiating clause comparison phase")
-            clause_results = await self.agents['clause'].process(document_text, context)
-            results['clause'] = clause_results
-            context.update(clause_results)
-            self.log_activity("Clause comparison completed", "SUCCESS")
-
-            # Step 4: Generate suggestions for risky clauses
-            if risk_results.get('risky_clauses'):
-                self.log_activity("Generating suggestions for risky clauses")
-                suggestion_results = await self.agents['suggestion'].process(
-                    document_text,
-                    {'risky_clauses': risk_results['risky_clauses']}
-                )
-                results['suggestions'] = suggestion_results
-                context.update(suggestion_results)
-                self.log_activity("Suggestions generation completed", "SUCCESS")
-
-            # Step 5: Check for inconsistencies
-            self.log_activity("Checking for document inconsistencies")
-            inconsistency_results = await self.agents['inconsistency'].process(document_text, context)
-            results['inconsistencies'] = inconsistency_results
-            context.update(inconsistency_results)
-            self.log_activity("Inconsistency check completed", "SUCCESS")
-
-            # Step 6: Compliance check
-            self.log_activity("Performing compliance check")
-            compliance_results = await self.agents['compliance'].process(document_text, context)
-            results['compliance'] = compliance_results
-            context.update(compliance_results)
-            self.log_activity("Compliance check completed", "SUCCESS")
-
-            # Step 7: Generate final summary
-            self.log_activity("Generating final document summary")
-            summary_results = await self.agents['summary'].process(document_text, context)
-            results['summary'] = summary_results
-            self.log_activity("Summary generation completed", "SUCCESS")
+        checkpoints = get_checkpoint_store()
+        checkpoint_key = document_hash(document_text, user_context)
+        version = self._pipeline_version()
+        restored = await self._load_checkpoints(checkpoints, checkpoint_key, version)
+        if restored:
+            self.log_activity(f"Resuming analysis with {len(restored)} completed stage(s) from checkpoints")
+        completed_results: Dict[str, Any] = {}
+        failed_stages: List[str] = []
 
-            self.log_activity("Document analysis process completed successfully", "SUCCESS")
-            return results
+        def report(event: str, stage: PipelineStage, **data: Any) -> None:
+            if on_progress is not None:
+                on_progress({'event': event, 'stage': stage.name, 'description': stage.description, **data})
+
+        # One stream per producing stage, shared with the stage consuming it
+        streams = {
+            stage.streams_from: Channel(
+                on_send=lambda item, producer=self.stages_by_name[stage.streams_from]: report('item', producer, item=item)
+            )
+            for stage in self.stages if stage.streams_from
+        }
+        # Resolved when a producing stage completes. If it fails instead, the
+        # scheduler cancels its consumer, whose results are then incomplete
+        producers_done = {name: asyncio.get_running_loop().create_future() for name in streams}
+        completed_count = 0
+
+        async def run_stage(stage: PipelineStage, completed: Dict[str, Any]) -> Dict[str, Any]:
+            stage_context = dict(context)
+            for dependency in stage.depends_on:
+                stage_context.update(completed.get(dependency, {}))
+            stream = streams.get(stage.name) or streams.get(stage.streams_from)
+            if stream is not None:
+                stage_context['risky_clause_stream'] = stream
+
+            nonlocal completed_count
+            if stage.name in restored:
+                stage_results = restored[stage.name]
+                if stage.name in streams:
+                    # Replay the restored stage's items for the stage streaming from it
+                    for item in stage_results.get('risky_clauses', []):
+                        stream.send(item)
+                    stream.close()
+                    producers_done[stage.name].set_result(None)
+                completed_results[stage.name] = stage_results
+                completed_count += 1
+                report('stage_completed', stage, completed=completed_count, total=len(self.stages), results=stage_results, resumed=True)
+                return stage_results
 
+            digest = AnalysisDigest(self.digest_tokens)
+            digest.add('Request context', request_context)
+            for dependency in stage.depends_on:
+                if dependency in completed:
+                    dependency_stage = self.stages_by_name[dependency]
+                    digest.add(
+                        dependency_stage.description.capitalize(),
+                        self.agents[dependency_stage.agent].digest(completed[dependency])
+                    )
+            stage_context['analysis_digest'] = digest
+
+            self.log_activity(f"Starting {stage.description}")
+            report('stage_started', stage)
+            try:
+                stage_results = await self.agents[stage.agent].process(document_text, stage_context)
+            except Exception:
+                failed_stages.append(stage.name)
+                raise
+            if stage.streams_from is not None:
+                await producers_done[stage.streams_from]
+            if stage.name in producers_done:
+                producers_done[stage.name].set_result(None)
+            self.log_activity(f"{stage.description.capitalize()} completed", "SUCCESS")
+            completed_results[stage.name] = stage_results
+            await self._save_checkpoint(checkpoints, checkpoint_key, version, stage.name, stage_results)
+            completed_count += 1
+            report('stage_completed', stage, completed=completed_count, total=len(self.stages), results=stage_results, resumed=False)
+            return stage_results
+
+        def skip_stage(stage: PipelineStage) -> None:
+            # Skipped stages count towards `completed` so progress reaches `total`
+            nonlocal completed_count
+            completed_count += 1
+            self.log_activity(f"Skipping {stage.description}")
+            report('stage_skipped', stage, completed=completed_count, total=len(self.stages))
+
+        try:
+            results = await self.scheduler.run(run_stage, on_skip=skip_stage)
+            self.log_activity("Document analysis process completed successfully", "SUCCESS")
         except Exception as e:
             self.log_activity(f"Error during document analysis: {str(e)}", "ERROR")
-            raise
+            partial = {stage.name: completed_results[stage.name] for stage in self.stages if stage.name in completed_results}
+            if not failed_stages:
+                raise AnalysisError(str(e), results=partial) from e
+            stage = self.stages_by_name[failed_stages[0]]
+            raise AnalysisError(f"{stage.description.capitalize()} failed: {str(e)}", stage.name, partial) from e
+
+        if checkpoints is not None:
+            try:
+                await checkpoints.clear(checkpoint_key, version)
+            except Exception as e:
+                self.log_activity(f"Could not clear checkpoints: {str(e)}", "WARNING")
+        return results
+
+    def _pipeline_version(self) -> str:
+        """
+        Checkpoints are only reused by the same pipeline version and model.
+        """
+        return f"{PIPELINE_VERSION}:{os.getenv('LLM_MODEL', DEFAULT_MODEL)}"
+
+    async def _load_checkpoints(self, checkpoints: Optional[CheckpointStore], checkpoint_key: str, version: str) -> Dict[str, Any]:
+        # Checkpoints only save work; a broken store must not fail the analysis
+        if checkpoints is None:
+            return {}
+        try:
+            return await checkpoints.load(checkpoint_key, version)
+        except Exception as e:
+            self.log_activity(f"Could not load checkpoints: {str(e)}", "WARNING")
+            return {}
+
+    async def _save_checkpoint(
+        self,
+        checkpoints: Optional[CheckpointStore],
+        checkpoint_key: str,
+        version: str,
+        stage: str,
+        results: Dict[str, Any]
+    ) -> None:
+        if checkpoints is None:
+            return
+        try:
+            await checkpoints.save(checkpoint_key, version, stage, results)
+        except Exception as e:
+            self.log_activity(f"Could not save {stage} checkpoint: {str(e)}", "WARNING")
+
+    async def stream_events(self, document_text: str, context: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the analysis and yield its progress events as they happen,
+        ending with a `complete` event carrying all results or an `error`
+        event carrying the stages that completed. Closing the iterator early cancels the analysis.
+        """
+        events: Channel = Channel()
+
+        async def run() -> None:
+            try:
+                results = await self.process(document_text, context, on_progress=events.send)
+                events.send({'event': 'complete', 'results': results})
+            except AnalysisError as e:
+                events.send({'event': 'error', 'error': str(e), 'stage': e.stage, 'results': e.results})
+            except Exception as e:
+                events.send({'event': 'error', 'error': str(e)})
+            finally:
+                events.close()
+
+        task = asyncio.ensure_future(run())
+        try:
+            async for event in events:
+                yield event
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
 
     async def process_specific_agent(self, agent_name: str, document_text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
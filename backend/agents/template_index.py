@@ -0,0 +1,111 @@
+import hashlib
+import math
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:  # faiss-cpu is in requirements.txt; numpy search is the fallback
+    faiss = None
+
+from .retrieval import tokenize
+
+EMBEDDING_DIM = 512
+# Above this many templates an HNSW graph keeps query time flat
+HNSW_MIN_TEMPLATES = 1000
+
+
+def embed_texts(texts: List[str], dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """
+    Local lexical embeddings: unigrams and bigrams hashed into `dim` signed
+    buckets with log term frequency, L2-normalised so inner product is cosine
+    similarity. Deterministic across processes and needs no network.
+    """
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+        for feature, count in Counter(features).items():
+            digest = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+            sign = 1.0 if digest >> 63 else -1.0
+            matrix[row, digest % dim] += sign * (1.0 + math.log(count))
+        norm = np.linalg.norm(matrix[row])
+        if norm > 0:
+            matrix[row] /= norm
+    return matrix
+
+
+def template_text(template: Dict[str, Any]) -> str:
+    return template.get('template_text') or template.get('text', '')
+
+
+def template_embedding_text(name: str, template: Dict[str, Any]) -> str:
+    """
+    The text a template is indexed under: its name, type and wording.
+    """
+    return " ".join([
+        name.replace('_', ' '),
+        str(template.get('name', '')),
+        str(template.get('type', '')),
+        template_text(template),
+        " ".join(map(str, template.get('required_elements', [])))
+    ])
+
+
+class TemplateIndex:
+    """
+    Vector index over clause templates for similarity-based matching.
+    """
+
+    def __init__(
+        self,
+        templates: Dict[str, Dict[str, Any]],
+        embeddings: Optional[np.ndarray] = None
+    ):
+        self.names = list(templates)
+        self.templates = [templates[name] for name in self.names]
+        if embeddings is None:
+            embeddings = embed_texts([template_embedding_text(name, templates[name]) for name in self.names])
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+        self.index = None
+        if faiss is not None and self.names:
+            dim = self.embeddings.shape[1]
+            if len(self.names) >= HNSW_MIN_TEMPLATES:
+                self.index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+            else:
+                self.index = faiss.IndexFlatIP(dim)
+            self.index.add(self.embeddings)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def search(self, queries: List[str], k: int = 3, threshold: float = 0.0) -> List[List[Tuple[str, Dict[str, Any], float]]]:
+        """
+        For each query return up to `k` (name, template, similarity) matches
+        scoring at least `threshold`, best first.
+        """
+        if not queries:
+            return []
+        if not self.names:
+            return [[] for _ in queries]
+
+        k = min(k, len(self.names))
+        vectors = embed_texts(queries, self.embeddings.shape[1])
+        if self.index is not None:
+            scores, indices = self.index.search(vectors, k)
+        else:
+            similarity = vectors @ self.embeddings.T
+            indices = np.argsort(-similarity, axis=1)[:, :k]
+            scores = np.take_along_axis(similarity, indices, axis=1)
+
+        results = []
+        for row_scores, row_indices in zip(scores, indices):
+            results.append([
+                (self.names[index], self.templates[index], float(score))
+                for score, index in zip(row_scores, row_indices)
+                if index >= 0 and score >= threshold
+            ])
+        return results
@@ -1,12 +1,19 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any
 import fitz  # PyMuPDF
 import docx
 import os
 from dotenv import load_dotenv
-from agents.supervisor_agent import SupervisorAgent
+from agents.supervisor_agent import AnalysisError, SupervisorAgent
+from agents.llm_client import close_llm_clients, llm_stats
+from agents.structured_output import structured_output_stats
+from agents.payload import dumps, normalize_results
+from agents.jobs import JobRunner, JobStore, QueueFullError
+from agents.knowledge_pack import preload_knowledge_pack
 import json
 from pathlib import Path
 import uvicorn
@@ -15,6 +22,11 @@ from docx import Document
 import logging
 from datetime import datetime
 
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # brotli-asgi is in requirements.txt; gzip alone is the fallback
+    BrotliMiddleware = None
+
 # Load environment variables
 load_dotenv()
 
@@ -37,9 +49,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Analysis payloads are large and compress well
+compression_min_bytes = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=compression_min_bytes)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=compression_min_bytes)
+
 # Initialize the supervisor agent
 supervisor = SupervisorAgent()
 
+# Background analyses run on a bounded worker pool backed by a SQLite job store
+job_runner = JobRunner(JobStore(), supervisor.process)
+
 class AnalysisRequest(BaseModel):
     document_text: str
     context: Optional[Dict[str, Any]] = None
@@ -47,8 +69,21 @@ class AnalysisRequest(BaseModel):
 class AnalysisResponse(BaseModel):
     status: str
     results: Dict[str, Any]
+    tables: Optional[Dict[str, Any]] = None
+    version: Optional[int] = None
     error: Optional[str] = None
 
+def analysis_response(results: Dict[str, Any], normalized: bool = False, error: Optional[str] = None) -> Response:
+    """
+    Serialize an analysis with orjson. With `normalized`, clauses, templates,
+    findings and alternatives are stored once in `tables` and referenced by
+    ID from `results`; otherwise `results` keeps the nested form.
+    """
+    body = {'status': 'error' if error else 'success', 'results': results, 'error': error}
+    if normalized and results:
+        body.update(normalize_results(results))
+    return Response(content=dumps(body), media_type="application/json")
+
 async def extract_text_from_pdf(file: UploadFile) -> str:
     """Extract text from a PDF file."""
     try:
@@ -86,42 +121,42 @@ async def extract_text_from_docx(file: UploadFile) -> str:
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing DOCX: {str(e)}")
 
+async def extract_text(file: UploadFile) -> str:
+    """Extract text from an uploaded PDF or DOCX file."""
+    if file.filename.endswith('.pdf'):
+        return await extract_text_from_pdf(file)
+    if file.filename.endswith(('.doc', '.docx')):
+        return await extract_text_from_docx(file)
+    raise HTTPException(
+        status_code=400,
+        detail="Unsupported file format. Please upload a PDF or DOCX file."
+    )
+
 @app.post("/analyze/document", response_model=AnalysisResponse)
 async def analyze_document(
     file: UploadFile = File(...),
-    context: Optional[Dict[str, Any]] = None
+    context: Optional[Dict[str, Any]] = None,
+    normalized: bool = False
 ):
     """
     Analyze a legal document (PDF or DOCX) and return the analysis results.
     """
     try:
         # Extract text based on file type
-        if file.filename.endswith('.pdf'):
-            text = await extract_text_from_pdf(file)
-        elif file.filename.endswith(('.doc', '.docx')):
-            text = await extract_text_from_docx(file)
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="Unsupported file format. Please upload a PDF or DOCX file."
-            )
+        text = await extract_text(file)
         
         # Process the document using the supervisor agent
         results = await supervisor.process(text, context)
         
-        return AnalysisResponse(
-            status="success",
-            results=results
-        )
+        return analysis_response(results, normalized)
+    except AnalysisError as e:
+        # Return the stages that completed; retrying resumes after them
+        return analysis_response(e.results, normalized, error=str(e))
     except Exception as e:
-        return AnalysisResponse(
-            status="error",
-            results={},
-            error=str(e)
-        )
+        return analysis_response({}, error=str(e))
 
 @app.post("/analyze/text", response_model=AnalysisResponse)
-async def analyze_text(request: AnalysisRequest):
+async def analyze_text(request: AnalysisRequest, normalized: bool = False):
     """
     Analyze text content directly and return the analysis results.
     """
@@ -129,16 +164,113 @@ async def analyze_text(request: AnalysisRequest):
         # Process the text using the supervisor agent
         results = await supervisor.process(request.document_text, request.context)
         
-        return AnalysisResponse(
-            status="success",
-            results=results
-        )
+        return analysis_response(results, normalized)
+    except AnalysisError as e:
+        return analysis_response(e.results, normalized, error=str(e))
     except Exception as e:
-        return AnalysisResponse(
-            status="error",
-            results={},
-            error=str(e)
-        )
+        return analysis_response({}, error=str(e))
+
+def sse_event(event: Dict[str, Any]) -> bytes:
+    """Format a progress event as a server-sent event."""
+    return b"event: " + event['event'].encode() + b"\ndata: " + dumps(event) + b"\n\n"
+
+def analysis_event_stream(text: str, context: Optional[Dict[str, Any]], normalized: bool) -> StreamingResponse:
+    """
+    Stream the analysis as server-sent events: `stage_started` and
+    `stage_completed` (with that stage's results) or `stage_skipped` per
+    stage, `item` per streamed clause, then `complete` with all results or
+    `error` with the stages that completed.
+    """
+    async def events() -> AsyncIterator[bytes]:
+        async for event in supervisor.stream_events(text, context):
+            if event['event'] in ('complete', 'error') and event.get('results') and normalized:
+                event.update(normalize_results(event['results']))
+            yield sse_event(event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # An explicit encoding keeps the compression middleware from buffering events
+        headers={"Cache-Control": "no-cache", "Content-Encoding": "identity", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/analyze/document/stream")
+async def analyze_document_stream(
+    file: UploadFile = File(...),
+    context: Optional[Dict[str, Any]] = None,
+    normalized: bool = False
+):
+    """
+    Analyze a legal document (PDF or DOCX), streaming progress and each
+    stage's results as server-sent events.
+    """
+    text = await extract_text(file)
+    return analysis_event_stream(text, context, normalized)
+
+@app.post("/analyze/text/stream")
+async def analyze_text_stream(request: AnalysisRequest, normalized: bool = False):
+    """
+    Analyze text content, streaming progress and each stage's results as
+    server-sent events.
+    """
+    return analysis_event_stream(request.document_text, request.context, normalized)
+
+async def submit_job(text: str, context: Optional[Dict[str, Any]], filename: Optional[str] = None) -> Dict[str, Any]:
+    try:
+        job_id = await job_runner.submit(text, context, filename)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=f"Job queue is full: {str(e)}")
+    return {"id": job_id, "status": "queued"}
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    context: Optional[Dict[str, Any]] = None
+):
+    """
+    Queue a document (PDF or DOCX) for analysis and return the job ID at once.
+    """
+    text = await extract_text(file)
+    return await submit_job(text, context, file.filename)
+
+@app.post("/jobs/text", status_code=202)
+async def create_text_job(request: AnalysisRequest):
+    """
+    Queue text content for analysis and return the job ID at once.
+    """
+    return await submit_job(request.document_text, request.context)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, normalized: bool = False):
+    """
+    Status of a job, with its analysis results once it has succeeded (or
+    the stages that completed, if it failed).
+    """
+    job = await job_runner.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    if normalized and job['results']:
+        job.update(normalize_results(job['results']))
+    return Response(content=dumps(job), media_type="application/json")
+
+@app.on_event("startup")
+async def startup() -> None:
+    """
+    Build or load the knowledge pack off the event loop, then start the
+    background job workers.
+    """
+    await preload_knowledge_pack()
+    job_runner.start()
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    """
+    Stop the job workers, returning their unfinished jobs to the queue, and
+    release the shared LLM connection pools.
+    """
+    await job_runner.stop()
+    job_runner.store.close()
+    await close_llm_clients()
 
 @app.get("/health")
 async def health_check():
@@ -147,6 +279,14 @@ async def health_check():
     """
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    """
+    LLM client counters (cache hits, rate limiter waits and retries),
+    structured-output parse counters and job queue depth.
+    """
+    return {"llm": llm_stats(), "structured_output": structured_output_stats(), "jobs": await job_runner.stats()}
+
 def print_startup_message():
     print("\n" + "="*80)
     print("\033[1mLegal Document Analyzer API\033[0m")
@@ -163,7 +303,11 @@ def print_startup_message():
     print("\n\033[1mAPI Endpoints:\033[0m")
     print("  • POST /analyze/document - Upload and analyze documents")
     print("  • POST /analyze/text - Analyze text directly")
+    print("  • POST /analyze/document/stream, POST /analyze/text/stream - Stream progress and stage results (SSE)")
+    print("  • POST /jobs, POST /jobs/text - Queue an analysis in the background")
+    print("  • GET /jobs/{id} - Job status and results")
     print("  • GET /health - Health check endpoint")
+    print("  • GET /metrics - LLM cache, rate limiter, client counters and job queue depth")
     print("\n\033[1mServer Status:\033[0m")
     print(f"  • Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"  • Running on: http://127.0.0.1:8000")
@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Tests import `main` and `agents` the way uvicorn does, from backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Keep job and checkpoint stores out of backend/.cache
+_cache_dir = tempfile.mkdtemp(prefix="legal-ai-tests-")
+os.environ.setdefault("JOB_STORE_PATH", os.path.join(_cache_dir, "jobs.sqlite3"))
+os.environ.setdefault("CHECKPOINT_PATH", os.path.join(_cache_dir, "checkpoints.sqlite3"))
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("GROQ_API_KEY", "test")
\ No newline at end of file
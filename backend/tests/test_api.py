@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+
+import main
+
+RESULTS = {
+    'risk': {
+        'risky_clauses': [
+            {'clause_id': 'sec-1', 'risk': 'Unlimited liability', 'clause_text': 'The Supplier is liable for all losses.'}
+        ],
+        'risk_analysis': [],
+        'recommendations': []
+    }
+}
+
+
+def analyze_text(monkeypatch, **params):
+    async def process(document_text, context=None, on_progress=None):
+        return RESULTS
+
+    monkeypatch.setattr(main.supervisor, 'process', process)
+    response = TestClient(main.app).post('/analyze/text', json={'document_text': 'text'}, params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_analyze_text_returns_nested_results_by_default(monkeypatch):
+    body = analyze_text(monkeypatch)
+
+    assert body['status'] == 'success'
+    assert body['results'] == RESULTS
+    assert 'tables' not in body
+
+
+def test_analyze_text_normalizes_on_request(monkeypatch):
+    body = analyze_text(monkeypatch, normalized='true')
+
+    assert body['results']['risk']['risky_clauses'] == ['risk-1']
+    assert body['tables']['findings']['risk-1']['risk'] == 'Unlimited liability'
\ No newline at end of file
@@ -0,0 +1,46 @@
+import asyncio
+
+from agents.checkpoints import CheckpointStore, document_hash
+
+
+def test_document_hash_covers_text_and_context():
+    assert document_hash('text') == document_hash('text', {})
+    assert document_hash('text') != document_hash('other text')
+    assert document_hash('text', {'role': 'buyer'}) != document_hash('text', {'role': 'seller'})
+
+
+def test_saved_stages_load_per_document_and_version(tmp_path):
+    store = CheckpointStore(path=tmp_path / 'checkpoints.sqlite3', ttl=60)
+
+    async def main():
+        await store.save('doc', 'v1', 'clause', {'clauses': [1, 2]})
+        await store.save('doc', 'v1', 'risk', ['high'])
+        await store.save('doc', 'v2', 'clause', {'clauses': []})
+        await store.save('other', 'v1', 'clause', None)
+        return await store.load('doc', 'v1'), await store.load('doc', 'v2')
+
+    try:
+        v1, v2 = asyncio.run(main())
+    finally:
+        store.close()
+
+    assert v1 == {'clause': {'clauses': [1, 2]}, 'risk': ['high']}
+    assert v2 == {'clause': {'clauses': []}}
+
+
+def test_expired_checkpoints_are_ignored_and_cleared(tmp_path):
+    store = CheckpointStore(path=tmp_path / 'checkpoints.sqlite3', ttl=60)
+    store._save('old', 'v1', 'clause', b'[]', 0.0)
+    store._save('doc', 'v1', 'clause', b'[]', 1000.0)
+    store._save('keep', 'v1', 'clause', b'[]', 1000.0)
+
+    try:
+        assert store._load('old', 'v1', 1000.0) == {}
+        assert store._load('doc', 'v1', 1000.0) == {'clause': []}
+
+        store._clear('doc', 'v1', 1000.0)
+        rows = store._conn.execute("SELECT document_hash FROM checkpoints").fetchall()
+    finally:
+        store.close()
+
+    assert rows == [('keep',)]
\ No newline at end of file
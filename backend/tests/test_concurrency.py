@@ -0,0 +1,23 @@
+import asyncio
+
+import pytest
+
+from agents.concurrency import bounded_map_stream
+
+
+def test_bounded_map_stream_raises_real_error_after_cancelled_call():
+    async def func(item):
+        if item == 0:
+            raise asyncio.CancelledError()
+        if item == 1:
+            raise ValueError("bad clause")
+        return item
+
+    async def items():
+        for item in range(4):
+            yield item
+            # Let the earlier calls finish before the next item arrives
+            await asyncio.sleep(0.01)
+
+    with pytest.raises(ValueError, match="bad clause"):
+        asyncio.run(bounded_map_stream(func, items(), limit=4))
\ No newline at end of file
@@ -0,0 +1,55 @@
+from agents.conflict_index import ConflictIndex
+from agents.document import LegalDocument
+
+TEXT = (
+    '1. Definitions\n'
+    '"Business Day" means a day on which banks are open in London.\n'
+    '"Business Day" means any day other than a Saturday or Sunday.\n'
+    '"Services" means the services in Schedule A.\n'
+    '2. Termination\n'
+    'Either party may terminate this Agreement on 30 days notice. '
+    'The Supplier shall pay a fee of $500 within 10 days, and a late fee of $50 within 20 days.\n'
+    '3. Breach\n'
+    'Subject to Section 2, a party may terminate this Agreement on 60 days notice.\n'
+    '4. Confidentiality\n'
+    'Confidential information is protected for 5 years.\n'
+)
+
+
+def candidates_by_subject():
+    return {candidate.subject: candidate for candidate in ConflictIndex.build(LegalDocument(TEXT)).candidates()}
+
+
+def test_conflicting_definitions_are_reported():
+    definition = candidates_by_subject()['Business Day']
+
+    assert definition.type == 'definition'
+    assert definition.clause_ids == ['sec-1']
+    assert [value for value, _, _ in definition.sites] == ['Business Day', 'Business Day']
+
+
+def test_different_values_for_one_subject_are_reported():
+    candidates = candidates_by_subject()
+    notice = candidates['notice duration']
+
+    assert notice.type == 'temporal'
+    assert [(value, clause_id) for value, clause_id, _ in notice.sites] == [('30 days', 'sec-2'), ('60 days', 'sec-3')]
+    assert notice.cross_referenced
+    # Termination shares the sentences, so the same pair is reported once
+    assert 'termination duration' not in candidates
+
+
+def test_values_within_one_sentence_or_without_an_obligation_are_not_conflicts():
+    candidates = candidates_by_subject()
+
+    assert 'payment money' not in candidates
+    assert 'confidentiality duration' not in candidates
+    assert set(candidates) == {'Business Day', 'notice duration'}
+
+
+def test_candidate_dict_describes_every_site():
+    data = candidates_by_subject()['notice duration'].to_dict()
+
+    assert data['location'] == 'sec-2, sec-3'
+    assert data['source'] == 'conflict_index'
+    assert data['elements'].startswith('"30 days" (sec-2: "Either party may terminate this Agreement on 30 days notice.")')
\ No newline at end of file
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from agents.entities import extract_entities
+from agents.review_agent import ReviewAgent
+
+
+def values(text, entity_type):
+    return [entity.value for entity in extract_entities(text).get(entity_type, [])]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Signed on 2024-03-05.', '2024-03-05'),
+    ('Signed on 03/05/24.', '2024-03-05'),
+    ('Signed on 25/12/2023.', '2023-12-25'),
+    ('Signed on Jan 5, 2024.', '2024-01-05'),
+    ('Signed on the 5th day of January, 2024.', '2024-01-05'),
+])
+def test_dates_are_normalized(text, expected):
+    assert values(text, 'date') == [expected]
+
+
+def test_invalid_dates_are_skipped():
+    assert values('Due 02/30/2024.', 'date') == []
+
+
+def test_amounts_durations_and_percentages():
+    text = 'A fee of $1,250.50, a cap of EUR 2 million and 500 rupees, payable within thirty (30) business days at 1.5% interest.'
+    entities = extract_entities(text)
+
+    assert [entity.value for entity in entities['money']] == [
+        {'amount': 1250.5, 'currency': 'USD'},
+        {'amount': 2e6, 'currency': 'EUR'},
+        {'amount': 500.0, 'currency': 'INR'},
+    ]
+    assert [entity.value for entity in entities['duration']] == [{'amount': 30, 'unit': 'day', 'qualifier': 'business'}]
+    assert [entity.value for entity in entities['percentage']] == [1.5]
+    money = entities['money'][0]
+    assert text[money.start:money.end] == money.text == '$1,250.50'
+
+
+def test_definitions_run_to_the_end_of_the_sentence():
+    text = '"Services" means the consulting services described in Schedule A. "Fees" means the amounts payable.'
+
+    assert values(text, 'defined_term') == [
+        {'term': 'Services', 'definition': 'the consulting services described in Schedule A.'},
+        {'term': 'Fees', 'definition': 'the amounts payable.'},
+    ]
+
+
+@pytest.mark.parametrize('name', [
+    'Acme Holdings Ltd.',
+    'Acme Inc.',
+    'Acme Trading Co.',
+    'Acme Corp.',
+    'Acme Ventures L.L.C.',
+    'Acme Europe N.V.',
+])
+def test_alias_referent_keeps_company_abbreviations(name):
+    text = f'This Agreement is made on 1 March 2024. It is between {name} (the "Supplier") and Beta Pvt. Ltd. (the "Customer").'
+
+    assert values(text, 'defined_term') == [
+        {'term': 'Supplier', 'refers_to': name},
+        {'term': 'Customer', 'refers_to': 'Beta Pvt. Ltd.'},
+    ]
+
+
+def test_alias_referent_stops_at_the_previous_sentence():
+    text = 'The parties agree as follows. Acme Inc. (hereinafter referred to as the "Supplier") shall deliver.'
+
+    assert values(text, 'defined_term') == [{'term': 'Supplier', 'refers_to': 'Acme Inc.'}]
+
+
+def test_review_merges_defined_and_extracted_key_terms(monkeypatch):
+    text = (
+        '1. Definitions\n'
+        '"Services" means the consulting services described in Schedule A.\n'
+        '2. Liability\n'
+        'Neither party is liable for indirect damages.\n'
+    )
+    agent = ReviewAgent()
+    requested = []
+
+    async def extract_sections(document, sections):
+        requested.append(sections)
+        return {
+            'parties': [],
+            'obligations': [],
+            'key_terms': [
+                {'term': 'services', 'definition': 'duplicate of a defined term'},
+                {'term': 'Indirect damages', 'definition': 'losses that do not flow directly from a breach'},
+            ]
+        }
+
+    monkeypatch.setattr(agent, '_extract_sections', extract_sections)
+    results = asyncio.run(agent.process(text))
+
+    assert 'key_terms' in requested[0]
+    assert [term['term'] for term in results['key_terms']] == ['Services', 'Indirect damages']
+    assert results['key_terms'][0]['definition'] == 'the consulting services described in Schedule A.'
\ No newline at end of file
@@ -0,0 +1,136 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from agents.jobs import JobRunner, JobStore, QueueFullError
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(path=tmp_path / 'jobs.sqlite3', max_queued=3, max_attempts=2, stale_after=10)
+    yield store
+    store.close()
+
+
+def test_claim_takes_oldest_queued_job_once(store):
+    first = store._create('first', {'role': 'buyer'}, 'a.pdf')
+    second = store._create('second', None, None)
+
+    job = store._claim(1000.0)
+    assert (job['id'], job['document_text'], job['context'], job['attempts']) == (first, 'first', {'role': 'buyer'}, 0)
+    assert store._claim(1000.0)['id'] == second
+    assert store._claim(1000.0) is None
+    assert store._counts() == {'queued': 0, 'running': 2, 'succeeded': 0, 'failed': 0}
+
+
+def test_full_queue_rejects_jobs(store):
+    for _ in range(3):
+        store._create('text', None, None)
+
+    with pytest.raises(QueueFullError):
+        store._create('text', None, None)
+
+
+def test_stale_running_job_is_reclaimed_until_attempts_run_out(store):
+    job_id = store._create('text', None, None)
+    store._claim(1000.0)
+
+    # Heartbeats keep it running; once they stop it is claimed again
+    assert store._claim(1005.0) is None
+    assert store._claim(1011.0)['id'] == job_id
+    assert store._claim(1022.0) is None
+
+    job = store._get(job_id)
+    assert (job['status'], job['attempts'], job['error']) == ('failed', 2, 'Worker stopped too many times')
+
+
+def test_jobs_survive_a_restart(tmp_path):
+    path = tmp_path / 'jobs.sqlite3'
+    store = JobStore(path=path, stale_after=10)
+    running = store._create('running', None, None)
+    store._claim(1000.0)
+    queued = store._create('queued', None, None)
+    store.close()
+
+    # The old process's running job is abandoned, its queued job still waits
+    store = JobStore(path=path, stale_after=10)
+    try:
+        assert store._claim(1001.0)['id'] == queued
+        assert store._claim(1005.0) is None
+        job = store._claim(1011.0)
+    finally:
+        store.close()
+
+    assert (job['id'], job['attempts']) == (running, 1)
+
+
+def test_purge_drops_only_old_finished_jobs(store):
+    old = store._create('old', None, None)
+    recent = store._create('recent', None, None)
+    queued = store._create('queued', None, None)
+    store._finish(old, 'succeeded', b'{}', None)
+    store._finish(recent, 'failed', None, 'boom')
+    store._conn.execute("UPDATE jobs SET finished_at = 0 WHERE id = ?", (old,))
+    store.retention = 60
+
+    assert store._purge(1000.0) == 1
+    assert store._get(old) is None
+    assert store._get(recent)['status'] == 'failed'
+    assert store._get(queued)['status'] == 'queued'
+
+
+def test_runner_completes_jobs_and_survives_store_errors(store, monkeypatch):
+    async def process(document_text, context):
+        if document_text == 'bad':
+            raise ValueError('cannot analyze')
+        return {'summary': document_text}
+
+    claim = store.claim
+    errors = []
+
+    async def flaky_claim():
+        if not errors:
+            errors.append(1)
+            raise sqlite3.OperationalError('database is locked')
+        return await claim()
+
+    monkeypatch.setattr(store, 'claim', flaky_claim)
+
+    async def main():
+        runner = JobRunner(store, process, workers=1, poll_interval=0.01)
+        runner.start()
+        good = await runner.submit('good')
+        bad = await runner.submit('bad')
+        for _ in range(200):
+            if (await store.counts())['queued'] == 0 and not runner._running:
+                break
+            await asyncio.sleep(0.01)
+        await runner.stop()
+        return await store.get(good), await store.get(bad)
+
+    good, bad = asyncio.run(main())
+
+    assert errors
+    assert (good['status'], good['results']) == ('succeeded', {'summary': 'good'})
+    assert (bad['status'], bad['error']) == ('failed', 'cannot analyze')
+
+
+def test_stopping_the_runner_requeues_its_jobs(store):
+    async def main():
+        began = asyncio.Event()
+
+        async def process(document_text, context):
+            began.set()
+            await asyncio.sleep(60)
+
+        runner = JobRunner(store, process, workers=1, poll_interval=0.01)
+        runner.start()
+        job_id = await runner.submit('slow')
+        await asyncio.wait_for(began.wait(), 1)
+        await runner.stop()
+        return await store.get(job_id)
+
+    job = asyncio.run(main())
+
+    assert (job['status'], job['attempts']) == ('queued', 0)
\ No newline at end of file
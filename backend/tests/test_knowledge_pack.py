@@ -0,0 +1,45 @@
+import asyncio
+import json
+import os
+import time
+
+from agents.knowledge_pack import KnowledgePackRegistry
+
+
+def write_sources(data_dir, template_text):
+    for source in ('clause_templates', 'compliance_rules'):
+        (data_dir / source).mkdir(parents=True, exist_ok=True)
+    (data_dir / 'clause_templates' / 'nda.json').write_text(json.dumps({'name': 'NDA', 'template_text': template_text}))
+    (data_dir / 'compliance_rules' / 'gdpr.json').write_text(json.dumps({'name': 'GDPR', 'aliases': ['General Data Protection Regulation']}))
+
+
+def test_loaded_pack_has_its_index_built(tmp_path):
+    write_sources(tmp_path / 'data', "The Recipient shall keep Confidential Information secret.")
+    registry = KnowledgePackRegistry(tmp_path / 'data', tmp_path / 'pack', check_interval=0)
+
+    asyncio.run(registry.preload())
+    pack = registry._pack
+
+    assert pack._template_index is not None
+    assert pack.rules_for('the General Data Protection Regulation')['name'] == 'GDPR'
+    # A second registry reads the written pack instead of compiling it
+    assert KnowledgePackRegistry(tmp_path / 'data', tmp_path / 'pack').current().fingerprint == pack.fingerprint
+
+
+def test_reload_swaps_in_a_pack_with_its_index_built(tmp_path):
+    data_dir = tmp_path / 'data'
+    write_sources(data_dir, "The Recipient shall keep Confidential Information secret.")
+    registry = KnowledgePackRegistry(data_dir, tmp_path / 'pack', check_interval=0)
+    first = registry.current()
+
+    template = data_dir / 'clause_templates' / 'nda.json'
+    write_sources(data_dir, "Either party may terminate this Agreement on thirty days written notice.")
+    os.utime(template, ns=(time.time_ns(), time.time_ns() + 1_000_000_000))
+    registry.current()
+    deadline = time.monotonic() + 5
+    while registry._pack is first and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert registry._pack is not first
+    assert registry._pack._template_index is not None
+    assert 'terminate' in registry._pack.templates['nda']['template_text']
\ No newline at end of file
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from agents import llm_cache
+from agents.llm_cache import LLMResponseCache, make_cache_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LLMResponseCache(path=tmp_path / 'llm_cache.sqlite3', max_memory_entries=2, max_disk_entries=2, ttl=60)
+    yield cache
+    cache.close()
+
+
+def accessed_at(cache, key):
+    return cache._conn.execute("SELECT accessed_at FROM llm_cache WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_cache_key_covers_model_params_and_prompt():
+    key = make_cache_key('model', 'prompt', temperature=0.0)
+
+    assert key == make_cache_key('model', 'prompt', temperature=0.0)
+    assert key != make_cache_key('other', 'prompt', temperature=0.0)
+    assert key != make_cache_key('model', 'prompt', temperature=0.7)
+    assert key != make_cache_key('model', 'other prompt', temperature=0.0)
+
+
+def test_hits_come_from_memory_then_disk(cache):
+    async def main():
+        await cache.set('a', 'A')
+        await cache.set('b', 'B')
+        await cache.set('c', 'C')
+        # 'a' left the memory tier but is still on disk
+        return await cache.get('c'), await cache.get('a'), await cache.get('missing')
+
+    assert asyncio.run(main()) == ('C', 'A', None)
+    stats = cache.snapshot()
+    assert (stats['memory_hits'], stats['disk_hits'], stats['misses']) == (1, 1, 1)
+    assert stats['memory_entries'] == 2
+
+
+def test_expired_entries_are_misses(cache, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: clock[0])
+
+    async def main():
+        await cache.set('a', 'A')
+        clock[0] += 61
+        return await cache.get('a')
+
+    assert asyncio.run(main()) is None
+    assert cache._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 0
+
+
+def test_trim_keeps_entries_recently_hit_in_memory(cache, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: clock[0])
+
+    async def main():
+        await cache.set('a', 'A')
+        clock[0] += 1
+        await cache.set('b', 'B')
+        clock[0] += 1
+        # Served from memory; only recorded on disk when the batch is written
+        await cache.get('a')
+        assert accessed_at(cache, 'a') == 1000.0
+        clock[0] += 1
+        await cache.set('c', 'C')
+
+    asyncio.run(main())
+    with cache._disk_lock:
+        cache._trim(clock[0])
+
+    keys = {key for key, in cache._conn.execute("SELECT key FROM llm_cache")}
+    assert keys == {'a', 'c'}
+    assert accessed_at(cache, 'a') == 1002.0
+
+
+def test_memory_hits_are_written_in_batches(cache, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: clock[0])
+    monkeypatch.setattr(llm_cache, 'TOUCH_BATCH_SIZE', 2)
+
+    async def main():
+        await cache.set('a', 'A')
+        await cache.set('b', 'B')
+        clock[0] += 1
+        await cache.get('a')
+        assert accessed_at(cache, 'a') == 1000.0
+        await cache.get('b')
+
+    asyncio.run(main())
+    assert (accessed_at(cache, 'a'), accessed_at(cache, 'b')) == (1001.0, 1001.0)
\ No newline at end of file
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import pytest
+
+from agents.llm_client import get_llm_client, llm_stats
+from agents.rate_limiter import RateLimiter, TokenBucket, backoff_delay
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(capacity=10, rate=2)
+    bucket.updated = 100.0
+    bucket.consume(10)
+
+    assert bucket.delay(4, 100.0) == 2.0
+    assert bucket.delay(4, 101.0) == 1.0
+    assert bucket.delay(4, 102.0) == 0.0
+    # Requests above capacity wait for a full bucket, not forever
+    assert bucket.delay(50, 102.0) == 3.0
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(attempt, cap=5.0) <= min(5.0, 2 ** attempt) for attempt in range(10))
+
+
+def test_callers_wait_for_the_token_budget():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+
+    async def main():
+        await limiter.acquire(6000)
+        return await limiter.acquire(10)
+
+    waited = asyncio.run(main())
+
+    assert 0.05 <= waited < 1
+    assert limiter.snapshot()['requests'] == 2
+    assert limiter.snapshot()['queued_requests'] == 1
+
+
+def test_reconcile_charges_the_difference():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+    limiter.reconcile(estimated_tokens=100, actual_tokens=6100)
+
+    assert limiter.tokens.level == pytest.approx(0, abs=1)
+
+
+def test_throttle_holds_back_every_caller():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+
+    async def main():
+        limiter.throttle(0.1)
+        return await asyncio.gather(limiter.acquire(1), limiter.acquire(1))
+
+    started = time.monotonic()
+    asyncio.run(main())
+
+    assert time.monotonic() - started >= 0.1
+    assert limiter.snapshot()['throttled_responses'] == 1
+
+
+def test_limiter_and_clients_work_across_event_loops():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+
+    async def main():
+        # Throttled, so callers queue on the loop's lock
+        limiter.throttle(0.01)
+        await asyncio.gather(*(limiter.acquire(1) for _ in range(3)))
+        client = get_llm_client('test-model')
+        assert get_llm_client('test-model') is client
+        assert 'test-model' in llm_stats()
+        return client
+
+    first = asyncio.run(main())
+    second = asyncio.run(main())
+
+    assert first is not second
+    assert limiter.snapshot()['requests'] == 6
\ No newline at end of file
@@ -0,0 +1,63 @@
+import pytest
+
+from agents.document import LegalDocument
+
+TEXT = (
+    '1. Definitions\n'
+    'Terms are defined here and in Schedule A.\n'
+    '2. Services\n'
+    'The Supplier provides the services subject to Section 4.2(a) and Clause 3.\n'
+    '3. Fees\n'
+    'Fees are payable as set out in Section 2.\n'
+    '4. Data Protection\n'
+    '4.1 Processing\n'
+    'Each party complies with Article 28 of the GDPR and Article 32 GDPR.\n'
+    '4.2 Security\n'
+    'See Article 6 of Regulation (EU) 2016/679 and Section 230 of the Communications Decency Act.\n'
+    '4.3 Breaches\n'
+    'Sections 4.1 through 4.3 survive, as do Sections 1 to 3.\n'
+    '5. Miscellaneous\n'
+    'Schedules A-C and Section 9 form part of this Agreement.\n'
+    'Schedule A\n'
+    'Service levels.\n'
+)
+
+
+@pytest.fixture(scope='module')
+def graph():
+    return LegalDocument(TEXT).references
+
+
+def test_references_resolve_to_clauses(graph):
+    assert [clause.id for clause in graph.targets('sec-2')] == ['sec-4.2', 'sec-3']
+    assert [clause.id for clause in graph.referrers('sec-2')] == ['sec-3', 'sec-4.3']
+    assert graph.refers_to('sec-1', 'schedule-A')
+    assert graph.resolve('Section 4.2(b)') == 'sec-4.2'
+    assert graph.resolve('Section 4.9') == 'sec-4'
+    assert graph.resolve('Exhibit A') == 'schedule-A'
+    assert graph.resolve('Chapter 1') is None
+
+
+def test_external_law_references_are_ignored(graph):
+    assert graph.outgoing.get('sec-4.1', []) == []
+    assert graph.outgoing.get('sec-4.2', []) == []
+
+
+def test_ranges_are_expanded(graph):
+    assert [reference.label for reference in graph.outgoing['sec-4.3']] == [
+        'Section 4.1', 'Section 4.2', 'Section 4.3', 'Section 1', 'Section 2', 'Section 3'
+    ]
+    assert [reference.label for reference in graph.outgoing['sec-5'][:3]] == ['Schedule A', 'Schedule B', 'Schedule C']
+
+
+def test_only_missing_sections_are_dangling(graph):
+    assert [reference.label for reference in graph.dangling] == ['Schedule B', 'Schedule C', 'Section 9']
+    reference = graph.dangling[-1]
+    assert (reference.source, reference.target) == ('sec-5', None)
+    assert TEXT[reference.start:reference.end] == reference.text == 'Section 9'
+
+
+def test_shouted_references_are_not_mistaken_for_acronyms():
+    text = '1. Term\nTERMINATION IS GOVERNED BY SECTION 2 ABOVE.\n2. Termination\nEither party may terminate.\n'
+
+    assert LegalDocument(text).references.refers_to('sec-1', 'sec-2')
\ No newline at end of file
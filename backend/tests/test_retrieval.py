@@ -0,0 +1,74 @@
+import math
+from collections import Counter
+
+import pytest
+
+from agents.document import DocumentChunk, LegalDocument
+from agents.retrieval import BM25Index, tokenize
+
+TEXTS = [
+    'The Supplier processes personal data on behalf of the Customer.',
+    'Fees are payable within thirty days of the invoice date.',
+    'Personal data breaches are notified to the Customer without undue delay; personal data is encrypted.',
+    'This Agreement is governed by the laws of England.',
+]
+
+
+def chunk(index, text, start=0):
+    return DocumentChunk(id=f'chunk-{index}', text=text, start=start, end=start + len(text), segments=())
+
+
+def brute_force_scores(texts, query, k1=1.5, b=0.75):
+    documents = [Counter(tokenize(text)) for text in texts]
+    average = sum(sum(counts.values()) for counts in documents) / len(documents)
+    scores = []
+    for counts in documents:
+        length = sum(counts.values())
+        score = 0.0
+        for term in set(tokenize(query)):
+            containing = sum(1 for other in documents if term in other)
+            if not counts[term]:
+                continue
+            idf = math.log(1 + (len(documents) - containing + 0.5) / (containing + 0.5))
+            score += idf * counts[term] * (k1 + 1) / (counts[term] + k1 * (1 - b + b * length / average))
+        scores.append(score)
+    return scores
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize('The Supplier shall notify, within 30 days.') == ['supplier', 'notify', 'within', '30', 'days']
+
+
+@pytest.mark.parametrize('query', ['personal data breach notification', 'invoice fees', 'governing law', 'unrelated words'])
+def test_search_ranks_by_bm25(query):
+    index = BM25Index([chunk(number, text) for number, text in enumerate(TEXTS)])
+    expected = sorted(
+        ((number, score) for number, score in enumerate(brute_force_scores(TEXTS, query)) if score > 0),
+        key=lambda item: (-item[1], item[0])
+    )
+
+    results = index.search(query, k=len(TEXTS))
+
+    assert [result.id for result, _ in results] == [f'chunk-{number}' for number, _ in expected]
+    assert [score for _, score in results] == pytest.approx([score for _, score in expected])
+
+
+def test_relevant_text_fits_the_budget_in_document_order():
+    chunks = []
+    start = 0
+    for number, text in enumerate(TEXTS):
+        chunks.append(chunk(number, text, start))
+        start += len(text) + 1
+    index = BM25Index(chunks)
+
+    excerpt = index.relevant_text('personal data customer', max_tokens=45)
+
+    assert excerpt == f'{TEXTS[0]}\n[...]\n{TEXTS[2]}'
+    assert index.relevant_text('nothing matches', max_tokens=20) == TEXTS[0]
+
+
+def test_document_builds_one_index_per_chunk_size():
+    document = LegalDocument('1. Data\n' + TEXTS[0] + '\n2. Fees\n' + TEXTS[1] + '\n')
+
+    assert document.index(1000) is document.index(1000)
+    assert document.index(1000) is not document.index(10)
\ No newline at end of file
@@ -0,0 +1,51 @@
+import math
+import re
+
+import pytest
+
+from agents.risk_scanner import PhraseMatcher, RiskScanner
+from agents.segmentation import segment_clauses
+
+PHRASES = ['may', 'best efforts', 'efforts', 'sole discretion', 'discretion', 'terminate', 'terminate for convenience', 'he', 'she']
+
+
+def brute_force(phrases, text):
+    matches = []
+    for phrase in set(phrase.lower() for phrase in phrases):
+        pattern = re.compile(r'(?<![a-z0-9])' + re.escape(phrase) + r'(?![a-z0-9])')
+        matches += [(match.start(), match.end(), phrase) for match in pattern.finditer(text.lower())]
+    return sorted(matches)
+
+
+@pytest.mark.parametrize('text', [
+    'The Supplier may, at its sole discretion, terminate for convenience.',
+    'The MAYOR shall use Best Efforts; she may not terminate. Efforts!',
+    'Shepherd heard she said he may; mayhem.',
+    '',
+])
+def test_matches_equal_a_brute_force_scan(text):
+    assert sorted(PhraseMatcher(PHRASES).finditer(text)) == brute_force(PHRASES, text)
+
+
+def test_matches_are_case_insensitive_and_deduplicated():
+    matcher = PhraseMatcher(['Sole Discretion', 'sole discretion', ' '])
+
+    assert matcher.phrases == ['sole discretion']
+    assert list(matcher.finditer('In its SOLE DISCRETION.')) == [(7, 22, 'sole discretion')]
+
+
+def test_clauses_are_scored_from_their_own_indicators():
+    text = (
+        '1. Services\n'
+        'The Supplier shall use best efforts. The Supplier shall report. The Supplier shall invoice.\n'
+        '2. Payment\n'
+        'Fees are payable monthly.\n'
+    )
+    scanner = RiskScanner({'best efforts': 3.0, 'shall': 0.5})
+
+    services, payment = scanner.score_clauses(text, segment_clauses(text))
+
+    assert services.clause_id == 'sec-1'
+    assert services.indicators == {'best efforts': 1, 'shall': 3}
+    assert services.score == pytest.approx(3.0 + 0.5 * (1 + math.log(3)))
+    assert (payment.score, payment.indicators) == (0, {})
\ No newline at end of file
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from agents.scheduler import PipelineStage, StageScheduler
+
+
+def stage(name, *depends_on, **options):
+    return PipelineStage(name, name, name, depends_on=depends_on, **options)
+
+
+def run(scheduler, runner, **options):
+    return asyncio.run(scheduler.run(runner, **options))
+
+
+def test_stages_start_once_their_dependencies_finish():
+    events = []
+
+    async def runner(current, results):
+        events.append(('start', current.name))
+        await asyncio.sleep(0.01)
+        events.append(('end', current.name))
+        return {'inputs': sorted(results)}
+
+    scheduler = StageScheduler([stage('summary', 'a', 'b'), stage('a'), stage('b'), stage('c', 'a')])
+    results = run(scheduler, runner)
+
+    assert list(results) == ['summary', 'a', 'b', 'c']
+    # Independent stages run concurrently
+    assert events[:2] == [('start', 'a'), ('start', 'b')]
+    assert events.index(('start', 'summary')) > max(events.index(('end', 'a')), events.index(('end', 'b')))
+    assert set(results['summary']['inputs']) >= {'a', 'b'}
+
+
+def test_condition_skips_stage_and_reports_it():
+    skipped = []
+
+    async def runner(current, results):
+        return {'risky_clauses': []}
+
+    scheduler = StageScheduler([
+        stage('risk'),
+        stage('suggestions', 'risk', condition=lambda results: bool(results['risk']['risky_clauses'])),
+        stage('summary', 'suggestions')
+    ])
+    results = run(scheduler, runner, on_skip=lambda current: skipped.append(current.name))
+
+    assert list(results) == ['risk', 'summary']
+    assert skipped == ['suggestions']
+
+
+@pytest.mark.parametrize("stages, message", [
+    ([stage('a', 'missing')], "unknown stage 'missing'"),
+    ([stage('a', 'b'), stage('b', 'a')], "dependency cycle"),
+    ([stage('a'), stage('a')], "must be unique"),
+    ([stage('a', streams_from='missing')], "streams from unknown stage"),
+    ([stage('a'), stage('b', 'a', streams_from='a')], "cannot both depend on and stream from"),
+])
+def test_invalid_pipelines_are_rejected(stages, message):
+    with pytest.raises(ValueError, match=message):
+        StageScheduler(stages)
+
+
+def test_failure_cancels_dependents_but_lets_independent_stages_finish():
+    finished, cancelled = [], []
+
+    async def runner(current, results):
+        try:
+            if current.name == 'risk':
+                await asyncio.sleep(0.01)
+                raise RuntimeError('provider down')
+            await asyncio.sleep(0.05 if current.name in ('review', 'suggestions') else 0)
+        except asyncio.CancelledError:
+            cancelled.append(current.name)
+            raise
+        finished.append(current.name)
+        return {}
+
+    scheduler = StageScheduler([
+        stage('review'),
+        stage('risk'),
+        stage('suggestions', streams_from='risk'),
+        stage('compliance', 'risk'),
+        stage('summary', 'review')
+    ])
+    with pytest.raises(RuntimeError, match='provider down'):
+        run(scheduler, runner)
+
+    # review was already running when risk failed; summary had not started
+    assert finished == ['review']
+    assert cancelled == ['suggestions']
+
+
+def test_dependents_include_streaming_and_transitive_stages():
+    scheduler = StageScheduler([
+        stage('risk'),
+        stage('suggestions', streams_from='risk'),
+        stage('summary', 'suggestions'),
+        stage('review')
+    ])
+
+    assert scheduler.dependents('risk') == {'suggestions', 'summary'}
+    assert scheduler.dependents('review') == set()
@@ -0,0 +1,31 @@
+from agents.segmentation import segment_clauses
+
+
+def clause_ids(text):
+    return [clause.id for clause in segment_clauses(text)]
+
+
+def test_numbered_headings_with_quoted_terms_are_split():
+    text = (
+        '1. Definitions\n'
+        '1.1 "Services" means the consulting services described in Schedule A.\n'
+        '1.2 “Fees” means the amounts payable under clause 4.\n'
+        "1.3 'Term' has the meaning given in clause 2.\n"
+        '2. Term\n'
+        'This Agreement runs for two years.\n'
+    )
+
+    assert clause_ids(text) == ['sec-1', 'sec-1.1', 'sec-1.2', 'sec-1.3', 'sec-2']
+
+
+def test_keyword_reference_on_wrapped_line_is_not_a_heading():
+    text = (
+        'Section 7.2 Termination\n'
+        'Either party may terminate this Agreement on notice. The obligations in\n'
+        'Section 7.2 of this Agreement survive termination, as do those in\n'
+        'Section 8 hereof.\n'
+        'Section 8 - Survival\n'
+        'ARTICLE IV\n'
+    )
+
+    assert clause_ids(text) == ['sec-7.2', 'sec-8', 'art-IV']
\ No newline at end of file
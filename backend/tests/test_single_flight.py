@@ -0,0 +1,74 @@
+import asyncio
+
+from agents.concurrency import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def main():
+        flight = SingleFlight()
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'answer'
+
+        results = await asyncio.gather(*(flight.do('k', work) for _ in range(3)))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert results == ['answer'] * 3
+    assert len(calls) == 1
+    assert flight.coalesced == 2
+    assert len(flight) == 0
+
+
+def test_error_reaches_every_caller():
+    async def main():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError('provider down')
+
+        return await asyncio.gather(flight.do('k', work), flight.do('k', work), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+def test_cancelling_one_caller_leaves_the_others_running():
+    async def main():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return 'answer'
+
+        first = asyncio.ensure_future(flight.do('k', work))
+        second = asyncio.ensure_future(flight.do('k', work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(main()) == ('answer', True)
+
+
+def test_caller_after_last_waiter_cancelled_starts_new_work():
+    async def main():
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        first = asyncio.ensure_future(flight.do('k', work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        return await flight.do('k', work), first.cancelled()
+
+    assert asyncio.run(main()) == (2, True)
\ No newline at end of file
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from agents.checkpoints import document_hash, get_checkpoint_store
+from agents.supervisor_agent import AnalysisError, SupervisorAgent
+
+
+def test_skipped_stage_still_completes_progress(monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_ENABLED", "false")
+    supervisor = SupervisorAgent()
+    for name, agent in supervisor.agents.items():
+        async def process(document_text, context=None, name=name):
+            # No risky clauses, so the suggestion stage is skipped
+            return {'risky_clauses': []} if name == 'risk' else {name: 'done'}
+        monkeypatch.setattr(agent, 'process', process)
+
+    events = []
+    results = asyncio.run(supervisor.process("1. Term. This Agreement runs for two years.", on_progress=events.append))
+
+    assert 'suggestions' not in results
+    progress = [event for event in events if event['event'] in ('stage_completed', 'stage_skipped')]
+    assert [event['stage'] for event in progress if event['event'] == 'stage_skipped'] == ['suggestions']
+    assert len(progress) == len(supervisor.stages)
+    assert progress[-1]['completed'] == progress[-1]['total'] == len(supervisor.stages)
+
+def test_failed_producer_keeps_independent_work_but_not_its_consumer(monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_ENABLED", "true")
+    monkeypatch.setenv("PIPELINE_STREAMING", "true")
+    supervisor = SupervisorAgent()
+    document_text = "1. Liability. The Supplier is liable for all losses."
+
+    async def review(document_text, context=None):
+        await asyncio.sleep(0.05)
+        return {'parties': ['Supplier']}
+
+    async def risk(document_text, context=None):
+        stream = context['risky_clause_stream']
+        stream.send({'clause_id': 'sec-1'})
+        # Failing while finding clauses closes the stream early
+        stream.close()
+        await asyncio.sleep(0.01)
+        raise RuntimeError('provider down')
+
+    async def suggestion(document_text, context=None):
+        return {'alternatives': [clause async for clause in context['risky_clause_stream']]}
+
+    async def instant(document_text, context=None):
+        return {}
+
+    for name, agent in supervisor.agents.items():
+        monkeypatch.setattr(agent, 'process', {'review': review, 'risk': risk, 'suggestion': suggestion}.get(name, instant))
+
+    with pytest.raises(AnalysisError) as error:
+        asyncio.run(supervisor.process(document_text))
+
+    assert error.value.stage == 'risk'
+    assert set(error.value.results) == {'review', 'clause', 'inconsistencies'}
+    saved = asyncio.run(get_checkpoint_store().load(document_hash(document_text, {}), supervisor._pipeline_version()))
+    assert set(saved) == {'review', 'clause', 'inconsistencies'}
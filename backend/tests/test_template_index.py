@@ -0,0 +1,56 @@
+import random
+
+import numpy as np
+import pytest
+
+from agents import template_index
+from agents.template_index import TemplateIndex, embed_texts, template_embedding_text
+
+WORDS = (
+    "party confidential information disclose terminate notice payment invoice liability indemnify "
+    "warranty licence assign governing law court dispute arbitration days written consent breach"
+).split()
+
+
+def make_templates(count, seed=7):
+    rng = random.Random(seed)
+    return {
+        f"template_{index}": {'name': f"Template {index}", 'template_text': " ".join(rng.choices(WORDS, k=25))}
+        for index in range(count)
+    }
+
+
+def brute_force(templates, queries, k):
+    names = list(templates)
+    matrix = embed_texts([template_embedding_text(name, templates[name]) for name in names])
+    similarity = embed_texts(queries) @ matrix.T
+    return [[(names[index], float(row[index])) for index in np.argsort(-row, kind='stable')[:k]] for row in similarity]
+
+
+@pytest.mark.parametrize("use_faiss", [True, False])
+def test_search_matches_brute_force_cosine_ranking(monkeypatch, use_faiss):
+    if use_faiss and template_index.faiss is None:
+        pytest.skip("faiss not installed")
+    if not use_faiss:
+        monkeypatch.setattr(template_index, 'faiss', None)
+
+    templates = make_templates(60)
+    queries = [" ".join(random.Random(seed).choices(WORDS, k=12)) for seed in range(10)]
+    index = TemplateIndex(templates)
+    expected = brute_force(templates, queries, k=5)
+
+    for matches, wanted in zip(index.search(queries, k=5), expected):
+        assert [score for _, _, score in matches] == pytest.approx([score for _, score in wanted], abs=1e-5)
+        # Names may only differ where scores tie
+        for (name, _, score), (wanted_name, wanted_score) in zip(matches, wanted):
+            assert name == wanted_name or score == pytest.approx(wanted_score, abs=1e-6)
+
+
+def test_search_applies_threshold_and_k():
+    templates = make_templates(10)
+    name = 'template_3'
+    [matches] = TemplateIndex(templates).search([templates[name]['template_text']], k=2, threshold=0.5)
+
+    assert matches[0][0] == name
+    assert len(matches) <= 2
+    assert all(score >= 0.5 for _, _, score in matches)
\ No newline at end of file